@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Check that chunk_validation.validate_chunks makes the same decision for every
+chunk as the original per-character rules from ingest_pdf.main.
+Each sample group (good report text, binary, zero-width / soft-hyphen, PDF
+structure, edge cases and a random mix) must satisfy
+    validate_chunks(texts) == [reference_reason(t) for t in texts]
+and must exercise the rejection reasons it is meant to cover.
+Exits non-zero on the first failing group:
+    python check_chunk_validation.py        (npm run check:chunk-validation)
+"""
+import random
+import sys
+
+from chunk_validation import PDF_MARKERS, validate_chunks
+
+
+def reference_reason(text):
+    """The original per-character rules from ingest_pdf.main"""
+    if not isinstance(text, str):
+        return 'not_string'
+    if not text.strip() or len(text.strip()) < 10:
+        return 'too_short'
+    if any(pattern in text for pattern in PDF_MARKERS):
+        return 'pdf_structure'
+    binary_chars = sum(1 for c in text if ord(c) < 32 and c not in '\n\r\t ')
+    if binary_chars > len(text) * 0.1:
+        return 'binary'
+    printable_chars = sum(1 for c in text if c.isprintable() or c in '\n\r\t')
+    if printable_chars < len(text) * 0.8:
+        return 'not_printable'
+    alnum_chars = sum(1 for c in text if c.isalnum())
+    if alnum_chars < 20:
+        return 'low_alnum'
+    try:
+        text.encode('utf-8').decode('utf-8')
+    except UnicodeError:
+        return 'unicode'
+    return None
+
+
+GOOD = [
+    "The roof sheeting over the rear verandah is corroded and several fixings are loose.",
+    "Cracking was observed in the brickwork above the laundry window; monitor for movement.",
+    "Switchboard:\n\tNo RCD protection to the lighting circuits.\r\nRecommend an electrician.",
+    "Subfloor ventilation is inadequate and timber stumps show signs of termite activity.",
+    "Façade render has delaminated near the downpipe — Électricité inspection recommended.",
+    "屋根の雨漏りが確認されました。早急な修理が必要です。天井に染みがあります。",
+    "Ремонт кровли требуется: обнаружены протечки и повреждения водостоков на фасаде.",
+]
+
+# Control characters just under, at and over the 10% threshold, plus raw bytes
+BINARY = [
+    "\x00\x01\x02\x03\x04\x05\x06\x07\x08\x0b" * 4,
+    "Roof flashing cracked" + "\x00" * 3 + " and leaking near the chimney stack",
+    "A" * 90 + "\x01" * 10,
+    "A" * 89 + "\x01" * 11,
+    "Gutter" + "\x1b[0m" * 20 + " overflow at the north elevation",
+    "".join(chr(b) for b in range(256)),
+    bytes(range(64)).decode('latin-1') + " moisture staining to the ceiling",
+]
+
+# Zero-width and soft-hyphen characters are not printable but not control characters
+INVISIBLE = [
+    "\u200b\u00ad" * 20 + "roof gutter flashing cracked",
+    "bal\u00adus\u00adtrade non\u00adcom\u00adpli\u00adant at the front stairs and landing",
+    "\ufeffMoisture readings were elevated in the bathroom wall cavity and skirting",
+    "\u200b" * 5 + "Timber decking boards are rotted and need replacing throughout",
+    "\u200c\u200d\u2060" * 30 + "subfloor",
+    "\u00ad" * 25 + "Switchboard requires upgrade to current standard with RCDs",
+]
+
+# PDF object syntax that leaked into extracted text
+PDF_STRUCTURE = [
+    "%PDF-1.7\n%\xe2\xe3\xcf\xd3\n1 0 obj\n<< /Type /Catalog >>",
+    "12 0 obj\n<< /Filter /FlateDecode /Length 512 >>\nstream\nx\x9c\x03\x00endstream\nendobj",
+    "Roof inspection notes endobj trailing fragment from the page content",
+    "stream\nBT /F1 12 Tf 72 712 Td (Roof sheeting corroded) Tj ET\nendstream",
+    "stream of water from the downpipe has eroded the garden bed near the slab",
+    "4 0 obj <</Type /Page /Parent 2 0 R /MediaBox [0 0 612 792]>>",
+    "/Length 1024 of the boundary fence is leaning and needs restumping",
+    "The object of this report is to describe obj\nerved defects in the dwelling",
+]
+
+EDGE = [
+    None, 42, b"bytes are not text", "", "   \n\t ", "short", "123456789",
+    "   \n\t " + "-" * 40 + " 12 ",
+    "Roof. Ok. Yes. No. -- 1 2 3 .. ,, ;; !!",
+    "Cracked eaves lining over the carport and front entry area\ud800",
+    "\udfffSubfloor timber framing shows signs of rot near the laundry",
+]
+
+
+def random_mix(n, seed=0):
+    """Good report text mixed with binary, PDF-structure and borderline junk"""
+    rng = random.Random(seed)
+    words = ("roof gutter flashing cracked leaking switchboard breaker footing subfloor timber termite "
+             "moisture ventilation balustrade compliance Électricité façade 屋根 ремонт").split()
+    pdf_bits = ['%PDF-1.7', '12 0 obj\n<<', 'endobj', '/Type /Page', '/Length 512', 'stream\n', 'endstream']
+    corpus = []
+    for _ in range(n):
+        kind = rng.random()
+        size = rng.choice([5, 15, 40, 300, 1000])
+        text = " ".join(rng.choice(words) for _ in range(size // 6 + 1))[:size]
+        if kind < 0.15:
+            text = "".join(chr(rng.randrange(0, 256)) for _ in range(size))
+        elif kind < 0.25:
+            pos = rng.randrange(len(text) + 1)
+            text = text[:pos] + rng.choice(pdf_bits) + text[pos:]
+        elif kind < 0.35:
+            # Sprinkle control characters around the 10% threshold
+            chars = list(text)
+            for _ in range(int(len(chars) * rng.uniform(0.05, 0.15))):
+                chars[rng.randrange(len(chars))] = chr(rng.randrange(0, 32))
+            text = "".join(chars)
+        elif kind < 0.40:
+            text = text + '\ud800'
+        elif kind < 0.45:
+            text = "\u200b\u00ad" * (size // 4) + text[: size // 2]
+        elif kind < 0.50:
+            text = "   \n\t " + "-" * rng.randrange(5, 60) + " 12 "
+        corpus.append(text)
+    return corpus
+
+
+# Group name, samples, reasons the group must produce at least once
+GROUPS = [
+    ("good", GOOD, {None}),
+    ("binary", BINARY, {'binary'}),
+    ("zero_width_soft_hyphen", INVISIBLE, {'not_printable', None}),
+    ("pdf_structure", PDF_STRUCTURE, {'pdf_structure', None}),
+    ("edge", EDGE, {'not_string', 'too_short', 'low_alnum', 'unicode'}),
+    ("random_mix", random_mix(5000), {None, 'too_short', 'pdf_structure', 'binary', 'not_printable', 'unicode'}),
+]
+
+
+def check(name, texts, covers):
+    expected = [reference_reason(t) for t in texts]
+    actual = validate_chunks(texts)
+    assert actual == expected, "%s: %s" % (name, [
+        {"index": i, "text": repr(texts[i])[:60], "expected": e, "actual": a}
+        for i, (e, a) in enumerate(zip(expected, actual)) if e != a][:5])
+    missing = covers - set(expected)
+    assert not missing, "%s: no sample rejected as %s" % (name, sorted(map(str, missing)))
+    # The same texts one at a time, so batching cannot hide a per-chunk difference
+    for i, text in enumerate(texts[:200]):
+        assert validate_chunks([text]) == [expected[i]], "%s[%d] alone: %s" % (name, i, repr(text)[:60])
+    return len(texts)
+
+
+def main():
+    total = 0
+    for name, texts, covers in GROUPS:
+        total += check(name, texts, covers)
+    everything = [t for _, texts, _ in GROUPS for t in texts]
+    total += check("all_groups", everything, set())
+    print("chunk validation: %d decisions match the reference rules" % total)
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except AssertionError as e:
+        print("chunk validation mismatch: %s" % e, file=sys.stderr)
+        sys.exit(1)
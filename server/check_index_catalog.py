@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Check that chunk reads survive the index catalog evicting their report:
+threads keep reading through a ReportHandle (as a cross-report query does
+after taking it from the catalog) while other threads load reports into a
+catalog too small to hold two, and a ChunkStore keeps answering get() while
+another thread closes it. Every read must return the stored text.
+Exits non-zero on the first failure:
+    python check_index_catalog.py           (npm run check:index-catalog)
+"""
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import faiss
+import numpy as np
+
+import index_catalog
+import index_policy
+from chunk_store import ChunkStore
+
+CHUNKS = 2000
+SECONDS = 2.0
+
+
+def chunk_text(report_name, i):
+    return f"{report_name} chunk {i}: " + "roof gutter flashing " * (i % 7 + 1)
+
+
+def make_report(index_dir, report_name, dim=16):
+    store = ChunkStore(report_name, index_dir)
+    store.append([{"text": chunk_text(report_name, i), "start": i, "end": i + 1} for i in range(CHUNKS)])
+    store.close()
+    index = faiss.IndexFlatIP(dim)
+    index.add(np.random.default_rng(0).standard_normal((CHUNKS, dim)).astype('float32'))
+    faiss.write_index(index, index_catalog.index_path(report_name))
+
+
+def hammer(readers, disrupt, seconds=SECONDS):
+    """Run reader(stop) threads and disrupt(stop) until time is up; returns the errors raised"""
+    stop = threading.Event()
+    errors = []
+
+    def run(target):
+        try:
+            target(stop)
+        except Exception as e:
+            errors.append(repr(e))
+            stop.set()
+
+    threads = [threading.Thread(target=run, args=(reader,)) for reader in readers]
+    threads.append(threading.Thread(target=run, args=(disrupt,)))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def check_store_close_during_get(index_dir):
+    store = ChunkStore("direct", index_dir)
+    store.append([{"text": chunk_text("direct", i), "start": i, "end": i + 1} for i in range(CHUNKS)])
+
+    def reader(stop):
+        rng = random.Random()
+        while not stop.is_set():
+            i = rng.randrange(CHUNKS)
+            chunk = store.get(i)
+            assert chunk is not None and chunk["text"] == chunk_text("direct", i), "chunk %d: %r" % (i, chunk)
+
+    def closer(stop):
+        while not stop.is_set():
+            store.close()
+
+    errors = hammer([reader] * 4, closer)
+    assert not errors, "store closed during get(): %s" % errors[:3]
+
+
+def check_eviction_during_reads():
+    names = ["report_a", "report_b", "report_c"]
+    for name in names:
+        make_report(index_catalog.INDEX_DIR, name)
+    # Room for one report: every load evicts the previous one
+    catalog = index_catalog.IndexCatalog(max_bytes=1)
+
+    def reader_for(name):
+        def reader(stop):
+            rng = random.Random()
+            while not stop.is_set():
+                handle = catalog.get(name)
+                for _ in range(200):
+                    i = rng.randrange(CHUNKS)
+                    chunk = handle.chunk(i)
+                    assert chunk is not None and chunk["text"] == chunk_text(name, i), \
+                        "%s chunk %d: %r" % (name, i, chunk)
+        return reader
+
+    def loader(stop):
+        while not stop.is_set():
+            for name in names:
+                catalog.get(name)
+
+    errors = hammer([reader_for(name) for name in names for _ in range(2)], loader)
+    assert not errors, "read failed after eviction: %s" % errors[:3]
+    assert catalog.counts["evictions"] > 0, "no evictions happened"
+
+
+def main():
+    tmp_dir = tempfile.mkdtemp(prefix='kilik-catalog-check-')
+    saved = index_catalog.INDEX_DIR, index_policy.INDEX_DIR
+    try:
+        index_catalog.INDEX_DIR = index_policy.INDEX_DIR = tmp_dir
+        check_store_close_during_get(tmp_dir)
+        check_eviction_during_reads()
+    finally:
+        index_catalog.INDEX_DIR, index_policy.INDEX_DIR = saved
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    print("index catalog: chunk reads survive eviction")
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except AssertionError as e:
+        print("index catalog check failed: %s" % e, file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Check the shared issue classifier on plural, past-tense and -ing sentences,
+on words that only contain a keyword ("mislead", "fixture"), and against a
+separate whole-word search for every keyword form on synthetic sentences.
+Exits non-zero on the first failure:
+    python check_issue_classifier.py        (npm run check:issue-classifier)
+"""
+import sys
+
+from issue_classifier import IssueClassifier, _per_keyword, _synthetic_sentences, get_classifier, load_keywords
+from simple_summarizer import simple_extract_issues
+
+# Sentence, expected severity (None: not an issue)
+SENTENCES = [
+    ("Repairs needed.", "Minor"),
+    ("Several defects were found in the rear deck.", "Minor"),
+    ("Issues with the drainage were noted.", "Minor"),
+    ("Gutters were repaired and downpipes replaced last year.", "Minor"),
+    ("The broken tiles need replacing before winter.", "Minor"),
+    ("The flashing is fixed but the valley keeps leaking.", "Minor"),
+    ("Water damaged the ceiling in the laundry.", "Major"),
+    ("Electrical hazards present; repairs required.", "Major"),
+    ("Fire hazards and code violations need fixing.", "Major"),
+    ("Safety concerns were raised about the balustrade.", "Major"),
+    ("Lead paint on the window frames is damaged.", "Major"),
+    ("The path leading to the garage has problems.", "Minor"),
+    ("Trim molding around the door is damaged.", "Minor"),
+    ("It is recommended to monitor the crack.", None),
+    ("Misleading label on the switchboard door.", None),
+    ("The light fixture in the hall works as expected.", None),
+    ("The leading edge of the roof sheet is straight.", None),
+]
+
+
+def check_sentences():
+    classifier = get_classifier()
+    for sentence, expected in SENTENCES:
+        assert classifier.severity(sentence) == expected, "%r: %s, expected %s" % (
+            sentence, classifier.severity(sentence), expected)
+    issues = simple_extract_issues(" ".join(sentence for sentence, _ in SENTENCES))
+    found = [(issue["description"], issue["severity"]) for issue in issues]
+    wanted = [(sentence, expected) for sentence, expected in SENTENCES if expected is not None]
+    assert found == wanted, "simple_summarizer: %s" % [f for f in found if f not in wanted][:3]
+
+
+def check_override_keeps_named_forms():
+    # A form left out of the generated inflections still matches when a list names it
+    classifier = IssueClassifier({"issue": ["leading", "repair"], "major": [], "minor": []})
+    assert classifier.classify("Leading edge lifted.") == {"issue"}, "named form not matched"
+
+
+def check_against_per_keyword(count=5000):
+    classifier = get_classifier()
+    per_keyword = _per_keyword(load_keywords())
+    for sentence in _synthetic_sentences(count):
+        assert classifier.classify(sentence) == per_keyword(sentence), "%r: %s != %s" % (
+            sentence, classifier.classify(sentence), per_keyword(sentence))
+
+
+def main():
+    check_sentences()
+    check_override_keeps_named_forms()
+    check_against_per_keyword()
+    print("issue classifier: %d sentences classified as expected" % len(SENTENCES))
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except AssertionError as e:
+        print("issue classifier check failed: %s" % e, file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Check that pruning an LRU cache directory (lru_directory.py) never takes a
+temp file from a write in progress: writer threads keep writing into a
+directory over its cap while another thread prunes, temp files are neither
+counted nor evicted, and only stale ones are removed.
+Exits non-zero on the first failure:
+    python check_lru_directory.py           (npm run check:lru-directory)
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from lru_directory import STALE_TMP_AGE, TMP_MARKER, LRUDirectory
+
+MB = 1024 * 1024
+
+
+def check_concurrent_writes(root):
+    directory = LRUDirectory(root, 4 * MB, 'check')
+    errors = []
+
+    def writer(n):
+        data = os.urandom(MB)
+        for i in range(40):
+            try:
+                directory.write(os.path.join(root, f'{n}-{i}.bin'), data)
+            except OSError as e:
+                errors.append(repr(e))
+
+    def pruner():
+        for _ in range(400):
+            directory.prune()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(6)]
+    threads.append(threading.Thread(target=pruner))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, "writes failed while pruning: %s" % errors[:3]
+
+
+def check_temp_files(root):
+    directory = LRUDirectory(root, 3 * MB, 'check')
+    now = time.time()
+    for i in range(4):
+        path = os.path.join(root, f'old-{i}.bin')
+        with open(path, 'wb') as f:
+            f.write(b'x' * MB)
+        os.utime(path, (now - 100 + i, now - 100 + i))
+    # A write in progress, older than every cached file, and one abandoned long ago
+    live = os.path.join(root, f'new.bin{TMP_MARKER}123.456')
+    stale = os.path.join(root, f'dead.bin{TMP_MARKER}789.1')
+    for path, age in ((live, 1000), (stale, STALE_TMP_AGE + 60)):
+        with open(path, 'wb') as f:
+            f.write(b'y' * 2 * MB)
+        os.utime(path, (now - age, now - age))
+
+    removed = directory.prune()
+    assert os.path.exists(live), "pruning removed a temp file of a write in progress"
+    assert not os.path.exists(stale), "pruning kept a stale temp file"
+    # 4 MB of cache files against a 3 MB cap: the two least recently used go, temp files aside
+    assert removed == 2, "removed %d cache files, expected 2" % removed
+    left = sorted(n for n in os.listdir(root) if TMP_MARKER not in n)
+    assert left == ['old-2.bin', 'old-3.bin'], "kept %s" % left
+
+
+def main():
+    for check in (check_concurrent_writes, check_temp_files):
+        root = tempfile.mkdtemp(prefix='kilik-lru-check-')
+        try:
+            check(root)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+    print("lru directory: pruning leaves writes in progress alone")
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except AssertionError as e:
+        print("lru directory check failed: %s" % e, file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Check that lsa_summarizer ranks sentences by content: sentences about the
+report's main topics must outrank filler (boilerplate, or one-off words that
+belong to no topic) and stay out of the summary, and on reports of any length
+the scores must be spread out rather than all about 1.
+Exits non-zero on the first failure:
+    python check_lsa_summarizer.py          (npm run check:lsa-summarizer)
+"""
+import random
+import sys
+
+from lsa_summarizer import rank_sentences, split_sentences, summarize, synthetic_report
+
+ON_TOPIC = [
+    "Water is leaking through the roof where the flashing around the chimney has cracked.",
+    "The roof flashing is cracked and the gutter overflows into the eaves during rain.",
+    "Leaking roof tiles and a cracked valley gutter have caused water staining in the ceiling.",
+    "Roof leak at the rear valley: flashing cracked, gutter blocked, ceiling water damaged.",
+    "Moisture readings were high in the ceiling below the cracked roof flashing and leaking gutter.",
+    "The gutter and downpipe leak, and water from the roof runs behind the cracked flashing.",
+]
+
+FILLER = [
+    "The weather was fine on the day of the inspection.",
+    "The inspector arrived at nine and was met by the agent.",
+    "Access was available to all rooms at the time of the visit.",
+    "This report was prepared for the client named on the cover page.",
+    "Furniture and stored goods may have concealed some parts of the floor.",
+    "Photographs were taken where it seemed useful to do so.",
+]
+
+
+def check_on_topic_outranks_filler():
+    sentences = ON_TOPIC + FILLER
+    random.Random(0).shuffle(sentences)
+    scores = rank_sentences(sentences)
+    topical = min(float(scores[i]) for i, s in enumerate(sentences) if s in ON_TOPIC)
+    filler = max(float(scores[i]) for i, s in enumerate(sentences) if s in FILLER)
+    assert topical > filler, "best filler %.3f >= worst on-topic %.3f" % (filler, topical)
+    summary, _ = summarize(" ".join(sentences), count=3)
+    assert all(s in ON_TOPIC for s in summary), "filler in summary %r" % summary
+
+
+def check_filler_stays_out_of_the_top(words):
+    """A synthetic report with one filler sentence of one-off words per five topical ones"""
+    rng = random.Random(words)
+    one_off = ["zq%d" % i for i in range(5000)]
+    sentences = split_sentences(synthetic_report(words))
+    filler = {" ".join(rng.sample(one_off, 12)).capitalize() + "." for _ in range(len(sentences) // 5)}
+    sentences += sorted(filler)
+    rng.shuffle(sentences)
+    scores = rank_sentences(sentences)
+    top = sorted(range(len(sentences)), key=lambda i: -scores[i])[:len(sentences) // 10]
+    leaked = [sentences[i] for i in top if sentences[i] in filler]
+    assert not leaked, "%d sentences: %d filler in the top tenth" % (len(sentences), len(leaked))
+    summary, _ = summarize(" ".join(sentences), count=5)
+    assert not filler & set(summary), "%d sentences: filler in summary" % len(sentences)
+
+
+def check_scores_spread(words):
+    sentences = split_sentences(synthetic_report(words))
+    scores = rank_sentences(sentences)
+    low, high = float(scores.min()), float(scores.max())
+    assert high > 1.5 * low, "%d sentences: scores %.3f..%.3f do not tell sentences apart" % (
+        len(sentences), low, high)
+
+
+def main():
+    check_on_topic_outranks_filler()
+    for words in (500, 2000, 10000):
+        check_filler_stays_out_of_the_top(words)
+        check_scores_spread(words)
+    print("lsa summarizer: on-topic sentences outrank filler")
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except AssertionError as e:
+        print("lsa summarizer check failed: %s" % e, file=sys.stderr)
+        sys.exit(1)
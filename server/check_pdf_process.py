@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Check that parallel extraction in pdf_process gives the serial output,
+"imageStats" included, on generated PDFs with more than MAX_IMAGES photos:
+a logo placed on every page (one xref), small icons, the same photo embedded
+again as another image object on later pages, and near-duplicates split
+across range boundaries (pdf_process.dedup_check).
+Exits non-zero on the first mismatch:
+    python check_pdf_process.py             (npm run check:pdf-process)
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+import pdf_process
+from pdf_process import MAX_IMAGES, _extract_pdf, _pattern_image, dedup_check, fitz
+
+
+def generate(path, pages, seed=0):
+    rng = random.Random(seed)
+    doc = fitz.open()
+    logo = None
+    photos = []
+    for page_num in range(pages):
+        page = doc.new_page()
+        if logo is None:
+            logo = page.insert_image(fitz.Rect(10, 10, 170, 130), stream=_pattern_image(rng.getrandbits(64)))
+        else:
+            page.insert_image(fitz.Rect(10, 10, 170, 130), xref=logo)
+        if page_num % 3 == 0:
+            icon = pdf_process.Image.new("RGB", (24, 24), (page_num % 256, 40, 90))
+            buffered = pdf_process.BytesIO()
+            icon.save(buffered, format="PNG")
+            page.insert_image(fitz.Rect(500, 10, 524, 34), stream=buffered.getvalue())
+        for slot in range(2):
+            if photos and page_num % 7 == 6 and slot == 0:
+                # The same photo embedded again: re-encoded, so it becomes a new
+                # image object (PyMuPDF reuses the xref of an identical stream)
+                buffered = pdf_process.BytesIO()
+                pdf_process.Image.open(pdf_process.BytesIO(photos[rng.randrange(len(photos))])).save(
+                    buffered, format="PNG", compress_level=1)
+                stream = buffered.getvalue()
+            else:
+                stream = _pattern_image(rng.getrandbits(64))
+                photos.append(stream)
+            page.insert_image(fitz.Rect(50, 150 + 300 * slot, 410, 440 + 300 * slot), stream=stream)
+    doc.save(path)
+    doc.close()
+
+
+def check_workers_match(pages, workers):
+    tmp_dir = tempfile.mkdtemp(prefix='kilik-pdf-check-')
+    try:
+        path = os.path.join(tmp_dir, 'report.pdf')
+        generate(path, pages)
+        serial = _extract_pdf(path, False, 1, None)
+        assert not serial.get("error"), serial.get("error")
+        assert serial["imageStats"]["kept"] == MAX_IMAGES, "%d pages: only %d images kept" % (
+            pages, serial["imageStats"]["kept"])
+        for count in workers:
+            parallel = _extract_pdf(path, False, count, None)
+            assert parallel.get("error") is None, parallel.get("error")
+            assert parallel["imageStats"] == serial["imageStats"], "%d pages, %d workers: %s != serial %s" % (
+                pages, count, parallel["imageStats"], serial["imageStats"])
+            assert parallel == serial, "%d pages, %d workers: output differs from serial" % (pages, count)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main():
+    for pages in (40, 64, 120):
+        check_workers_match(pages, (2, 4))
+    for workers in (2, 3, 4):
+        report = dedup_check(workers)
+        assert report["identical"], "dedup check, %d workers: %s" % (workers, report)
+    print("pdf process: parallel extraction matches the serial output")
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except AssertionError as e:
+        print("pdf process check failed: %s" % e, file=sys.stderr)
+        sys.exit(1)
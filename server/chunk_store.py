@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Append-only chunk store that replaces faiss_indices/<report>_meta.json.
+
+Each report has two files next to its index:
+    <report>.chunks    - UTF-8 chunk texts, concatenated, append-only
+    <report>.chunkidx  - 16-byte header + one fixed-width record per FAISS id
+                         (offset, length, flags, start, end)
+Row N of the table is FAISS id N, so a lookup by id is one memory-mapped
+record read plus one slice of the text blob, and an ingest only appends its
+new chunks instead of rewriting the whole file. Removing a chunk only sets
+a flag on its record; ids are never reused. Chunks cut along PDF structure
+(structured_chunker.py) also keep their page numbers in the flags word.
+
+One-time migration of existing JSON metadata:
+    python chunk_store.py migrate --all
+    python chunk_store.py migrate <reportName> [<reportName> ...]
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+
+import numpy as np
+
+INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'faiss_indices')
+
+MAGIC = b'KCHK'
+FORMAT_VERSION = 1
+RECORD = np.dtype([
+    ('offset', '<u8'),
+    ('length', '<u4'),
+    ('flags', '<u4'),
+    ('start', '<i8'),
+    ('end', '<i8'),
+])
+HEADER = struct.Struct('<4sII4x')  # magic, format version, record size, padding
+HEADER_SIZE = HEADER.size
+
+# Record flags
+FLAG_EMPTY = 1  # no chunk behind this id (padding, or removed by a re-ingest)
+# Bits 16-31 hold the 1-based page a chunk starts on, bits 8-15 how many pages
+# later it ends; 0 means unknown (plain text ingests)
+PAGE_SHIFT = 16
+PAGE_SPAN_SHIFT = 8
+FLAG_BITS = 0xFF
+
+
+def page_flags(page, page_end=None):
+    """Flags word bits recording a chunk's page range"""
+    if not page or page < 0:
+        return 0
+    span = max(0, min(0xFF, (page_end or page) - page))
+    return (min(int(page), 0xFFFF) << PAGE_SHIFT) | (span << PAGE_SPAN_SHIFT)
+
+
+def safe_print_err(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def store_paths(report_name, index_dir=INDEX_DIR):
+    base = os.path.join(index_dir, report_name)
+    return f"{base}.chunks", f"{base}.chunkidx"
+
+
+def legacy_meta_path(report_name, index_dir=INDEX_DIR):
+    return os.path.join(index_dir, f"{report_name}_meta.json")
+
+
+def exists(report_name, index_dir=INDEX_DIR):
+    return os.path.exists(store_paths(report_name, index_dir)[1])
+
+
+class ChunkStore:
+    """Random access by FAISS id over one report's chunk files"""
+
+    def __init__(self, report_name, index_dir=INDEX_DIR):
+        self.report_name = report_name
+        self.blob_path, self.table_path = store_paths(report_name, index_dir)
+        self._table = None
+        self._blob = None
+        self._blob_file = None
+        self._count = 0
+        self._lock = threading.Lock()
+
+    # -- reading -------------------------------------------------------
+
+    def _open(self):
+        """(Re)map both files if they grew since they were last mapped"""
+        if not os.path.exists(self.table_path):
+            self._count = 0
+            return
+        count = (os.path.getsize(self.table_path) - HEADER_SIZE) // RECORD.itemsize
+        if self._table is not None and count == self._count:
+            return
+        self._close()
+        with open(self.table_path, 'rb') as f:
+            _check_header(f.read(HEADER_SIZE), self.table_path)
+        self._count = max(0, count)
+        if self._count:
+            self._table = np.memmap(self.table_path, dtype=RECORD, mode='r',
+                                    offset=HEADER_SIZE, shape=(self._count,))
+        if os.path.getsize(self.blob_path) > 0:
+            self._blob_file = open(self.blob_path, 'rb')
+            self._blob = mmap.mmap(self._blob_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        with self._lock:
+            self._open()
+            return self._count
+
+    def get(self, chunk_id):
+        """Chunk dict {"id", "text", "start", "end"[, "page", "page_end"]} for a FAISS id, or None"""
+        with self._lock:
+            if self._table is None or not 0 <= chunk_id < self._count:
+                self._open()
+            if not 0 <= chunk_id < self._count:
+                return None
+            rec = self._table[chunk_id]
+            if rec['flags'] & FLAG_EMPTY:
+                return None
+            offset, length = int(rec['offset']), int(rec['length'])
+            text = self._blob[offset:offset + length].decode('utf-8') if length else ""
+            chunk = {"id": int(chunk_id), "text": text, "start": int(rec['start']), "end": int(rec['end'])}
+            flags = int(rec['flags'])
+            if flags >> PAGE_SHIFT:
+                chunk["page"] = flags >> PAGE_SHIFT
+                chunk["page_end"] = chunk["page"] + ((flags >> PAGE_SPAN_SHIFT) & 0xFF)
+            return chunk
+
+    def get_many(self, chunk_ids):
+        return [self.get(i) for i in chunk_ids]
+
+    def live_ids(self):
+        """Ids of every record that still holds a chunk"""
+        with self._lock:
+            self._open()
+            if not self._count:
+                return np.zeros(0, dtype='int64')
+            return np.flatnonzero((self._table['flags'] & FLAG_EMPTY) == 0).astype('int64')
+
+    def iter_chunks(self):
+        for i in range(len(self)):
+            chunk = self.get(i)
+            if chunk is not None:
+                yield chunk
+
+    def close(self):
+        """
+        Unmap both files (the store reopens them on the next read). Safe while
+        other threads read: the catalog closes stores it evicts, and a query
+        may still hold the evicted handle.
+        """
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._blob is not None:
+            self._blob.close()
+            self._blob = None
+        if self._blob_file is not None:
+            self._blob_file.close()
+            self._blob_file = None
+        self._table = None
+
+    # -- writing -------------------------------------------------------
+
+    def append(self, chunks):
+        """
+        Append chunks ({"text", "start", "end"[, "page", "page_end"]}) and return the ids they were stored under.
+        Texts are flushed before the records that point at them, so a crash can at
+        worst leave unreferenced bytes in the blob or a torn last record (dropped on open).
+        """
+        os.makedirs(os.path.dirname(self.table_path), exist_ok=True)
+        first_id = self._prepare_table()
+        records = np.zeros(len(chunks), dtype=RECORD)
+        parts = []
+        with open(self.blob_path, 'ab') as blob:
+            offset = blob.seek(0, os.SEEK_END)
+            for i, chunk in enumerate(chunks):
+                text = chunk.get("text")
+                if text is None:
+                    records[i] = (offset, 0, FLAG_EMPTY, 0, 0)
+                    continue
+                data = text.encode('utf-8')
+                records[i] = (offset, len(data), page_flags(chunk.get("page"), chunk.get("page_end")),
+                              chunk.get("start", 0), chunk.get("end", 0))
+                parts.append(data)
+                offset += len(data)
+            blob.write(b''.join(parts))
+            blob.flush()
+            os.fsync(blob.fileno())
+        with open(self.table_path, 'ab') as table:
+            table.write(records.tobytes())
+            table.flush()
+            os.fsync(table.fileno())
+        return list(range(first_id, first_id + len(chunks)))
+
+    def delete(self, chunk_ids):
+        """Mark chunks as removed; their records and text bytes stay in place"""
+        self._update_records(chunk_ids, flags=FLAG_EMPTY)
+
+    def set_spans(self, chunk_ids, starts, ends, pages=None):
+        """
+        Rewrite the start/end offsets of existing chunks (same text found at a new
+        position); pages is a (page, page_end) pair per chunk, or None to keep them
+        """
+        fields = {"start": starts, "end": ends}
+        if pages is not None:
+            fields["pages"] = [page_flags(page, page_end) for page, page_end in pages]
+        self._update_records(chunk_ids, **fields)
+
+    def _update_records(self, chunk_ids, **fields):
+        chunk_ids = np.asarray(chunk_ids, dtype='int64')
+        if not len(chunk_ids):
+            return
+        with self._lock:
+            self._close()
+            table = np.memmap(self.table_path, dtype=RECORD, mode='r+', offset=HEADER_SIZE)
+            for name, value in fields.items():
+                if name == 'flags':
+                    table['flags'][chunk_ids] |= value
+                elif name == 'pages':
+                    table['flags'][chunk_ids] = (table['flags'][chunk_ids] & FLAG_BITS) | \
+                        np.asarray(value, dtype='<u4')
+                else:
+                    table[name][chunk_ids] = value
+            table.flush()
+            del table
+
+    def truncate(self, count):
+        """Forget every id >= count (their text stays in the blob as unreferenced bytes)"""
+        with self._lock:
+            self._close()
+            self._prepare_table()
+            with open(self.table_path, 'r+b') as f:
+                f.truncate(HEADER_SIZE + count * RECORD.itemsize)
+
+    def _prepare_table(self):
+        """Create the table if needed and drop a torn trailing record; returns the next id"""
+        if not os.path.exists(self.table_path):
+            with open(self.table_path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, FORMAT_VERSION, RECORD.itemsize))
+            open(self.blob_path, 'ab').close()
+            return 0
+        size = os.path.getsize(self.table_path)
+        extra = (size - HEADER_SIZE) % RECORD.itemsize
+        if extra:
+            safe_print_err(f'Dropping torn record at end of {self.table_path}')
+            with open(self.table_path, 'r+b') as f:
+                f.truncate(size - extra)
+            size -= extra
+        return (size - HEADER_SIZE) // RECORD.itemsize
+
+
+def _check_header(raw, path):
+    if len(raw) != HEADER_SIZE:
+        raise ValueError(f'{path}: truncated header')
+    magic, version, record_size = HEADER.unpack(raw)
+    if magic != MAGIC or record_size != RECORD.itemsize:
+        raise ValueError(f'{path}: not a chunk table')
+    if version != FORMAT_VERSION:
+        raise ValueError(f'{path}: unsupported chunk table version {version}')
+
+
+def migrate_report(report_name, index_dir=INDEX_DIR, keep_json=True):
+    """
+    Convert <report>_meta.json into a chunk store. Entries keep their list position
+    as id, which is how query_chunks.py resolved FAISS ids against the JSON list.
+    Returns the number of chunks migrated.
+    """
+    meta_path = legacy_meta_path(report_name, index_dir)
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+
+    store = ChunkStore(report_name, index_dir)
+    if os.path.exists(store.table_path):
+        raise FileExistsError(f'{store.table_path} already exists')
+    for position, entry in enumerate(meta):
+        if entry.get("id", position) != position:
+            safe_print_err(f'{report_name}: entry {position} has id {entry.get("id")}, storing it as {position}')
+    store.append(meta)
+    store.close()
+    if not keep_json:
+        os.remove(meta_path)
+    return len(meta)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chunk store maintenance')
+    sub = parser.add_subparsers(dest='command', required=True)
+    migrate = sub.add_parser('migrate', help='Convert <report>_meta.json files into chunk stores')
+    migrate.add_argument('reports', nargs='*', help='Report names to migrate')
+    migrate.add_argument('--all', action='store_true', help='Migrate every report with a _meta.json file')
+    migrate.add_argument('--index-dir', default=INDEX_DIR)
+    migrate.add_argument('--delete-json', action='store_true', help='Remove the JSON file after migrating')
+    args = parser.parse_args()
+
+    reports = list(args.reports)
+    if args.all:
+        reports += [n[:-len('_meta.json')] for n in sorted(os.listdir(args.index_dir)) if n.endswith('_meta.json')]
+    if not reports:
+        parser.error('give report names or --all')
+
+    results = {}
+    code = 0
+    for report in reports:
+        try:
+            if exists(report, args.index_dir):
+                results[report] = {"skipped": "chunk store already exists"}
+                continue
+            count = migrate_report(report, args.index_dir, keep_json=not args.delete_json)
+            results[report] = {"migrated": count}
+        except Exception as e:
+            safe_print_err(f'Migration failed for {report}: {e}')
+            results[report] = {"error": str(e)}
+            code = 1
+    print(json.dumps(results))
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
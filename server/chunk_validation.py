@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Chunk validation for ingest_pdf.py.
+Applies the ingest accept/reject rules to every chunk of a document at once:
+all texts are encoded together into one array of code points, each code point
+is classified with one table lookup (control, printable, alphanumeric, lone
+surrogate), and per-chunk counts come from np.add.reduceat. PDF structure
+markers are found with a single precompiled regex.
+
+Rules, in order (the first failing rule is the chunk's rejection reason):
+    not_string     text is not a str
+    too_short      fewer than 10 characters after stripping
+    pdf_structure  contains a PDF object marker ('%PDF-', 'endobj', ...)
+    binary         more than 10% control characters (other than \\n \\r \\t)
+    not_printable  less than 80% printable characters
+    low_alnum      fewer than 20 alphanumeric characters
+    unicode        cannot round-trip through UTF-8 (lone surrogates)
+
+check_chunk_validation.py checks these decisions against the original
+per-character implementation (npm run check:chunk-validation).
+"""
+import re
+
+import numpy as np
+
+PDF_MARKERS = ['%PDF-', 'obj\n<<', 'endobj', '/Type ', '/Length ']
+PDF_MARKER_RE = re.compile('|'.join(re.escape(m) for m in PDF_MARKERS))
+
+MIN_STRIPPED_LENGTH = 10
+MAX_BINARY_RATIO = 0.1
+MIN_PRINTABLE_RATIO = 0.8
+MIN_ALNUM_CHARS = 20
+
+# Per-code-point class bits
+BINARY, PRINTABLE, ALNUM, SURROGATE = 1, 2, 4, 8
+
+
+def _char_flags(c):
+    cp = ord(c)
+    flags = 0
+    if cp < 32 and c not in '\n\r\t ':
+        flags |= BINARY
+    if c.isprintable() or c in '\n\r\t':
+        flags |= PRINTABLE
+    if c.isalnum():
+        flags |= ALNUM
+    if 0xD800 <= cp <= 0xDFFF:
+        flags |= SURROGATE
+    return flags
+
+
+_ASCII_FLAGS = np.array([_char_flags(chr(c)) for c in range(128)], dtype=np.uint8)
+
+
+def _code_point_flags(cps):
+    if len(cps) == 0 or cps.max() < 128:
+        return _ASCII_FLAGS[cps]
+    flags = np.zeros(len(cps), dtype=np.uint8)
+    ascii_mask = cps < 128
+    flags[ascii_mask] = _ASCII_FLAGS[cps[ascii_mask]]
+    # Non-ASCII: classify each distinct code point once
+    high = ~ascii_mask
+    uniq, inverse = np.unique(cps[high], return_inverse=True)
+    flags[high] = np.array([_char_flags(chr(c)) for c in uniq.tolist()], dtype=np.uint8)[inverse]
+    return flags
+
+
+def validate_chunks(texts):
+    """
+    Return one rejection reason per text (None for accepted texts),
+    with the same decisions as the original per-chunk loop in ingest_pdf.py.
+    """
+    reasons = [None] * len(texts)
+    candidates = []
+    for i, text in enumerate(texts):
+        if not isinstance(text, str):
+            reasons[i] = 'not_string'
+        elif len(text.strip()) < MIN_STRIPPED_LENGTH:
+            reasons[i] = 'too_short'
+        elif PDF_MARKER_RE.search(text):
+            reasons[i] = 'pdf_structure'
+        else:
+            candidates.append(i)
+    if not candidates:
+        return reasons
+
+    selected = [texts[i] for i in candidates]
+    lengths = np.array([len(t) for t in selected], dtype=np.int64)
+    # Every candidate is non-empty, so reduceat segments are well defined
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    # One code point per element; surrogatepass keeps lone surrogates so they can be detected
+    cps = np.frombuffer("".join(selected).encode('utf-32-le', 'surrogatepass'), dtype='<u4')
+    flags = _code_point_flags(cps)
+
+    def counts(bit):
+        return np.add.reduceat((flags & bit).astype(bool), starts, dtype=np.int64)
+
+    binary_counts = counts(BINARY)
+    printable_counts = counts(PRINTABLE)
+    alnum_counts = counts(ALNUM)
+    surrogate_counts = counts(SURROGATE)
+
+    for j, i in enumerate(candidates):
+        n = lengths[j]
+        if binary_counts[j] > n * MAX_BINARY_RATIO:
+            reasons[i] = 'binary'
+        elif printable_counts[j] < n * MIN_PRINTABLE_RATIO:
+            reasons[i] = 'not_printable'
+        elif alnum_counts[j] < MIN_ALNUM_CHARS:
+            reasons[i] = 'low_alnum'
+        elif surrogate_counts[j]:
+            reasons[i] = 'unicode'
+    return reasons
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Packs retrieved chunks into the summarization prompt. Chunks overlap by 200
+characters (chunk_text), so the top hits for a query often repeat text.
+Hits of the same report whose [start, end) spans overlap or touch are merged
+into one excerpt, duplicate texts are dropped, and the excerpts are added best
+score first until the token budget is used; the excerpt that crosses the
+budget is trimmed at a word boundary rather than left out.
+
+Tokens are estimated as characters / 4, the usual figure for English text
+with the OpenAI-style tokenizers DeepInfra serves.
+
+    KILIK_CONTEXT_TOKENS   prompt budget for excerpts (2000, about the old 8000-character cap)
+
+Compare with the old packing for a real query:
+    python context_packer.py <report> "<query>" [--max-chunks 10] [--budget 2000]
+"""
+import argparse
+import json
+import os
+import sys
+
+CONTEXT_TOKENS = int(os.environ.get('KILIK_CONTEXT_TOKENS', '2000'))
+# Never trim an excerpt to less than this; leave the space unused instead
+MIN_PARTIAL_TOKENS = 50
+
+
+def estimate_tokens(text):
+    return (len(text) + 3) // 4
+
+
+def _has_span(chunk):
+    start, end = chunk.get("start"), chunk.get("end")
+    return start is not None and end is not None and end - start == len(chunk["text"]) and end > start
+
+
+def merge_spans(chunks):
+    """
+    Merge overlapping/adjacent chunks of the same report into excerpts
+    {"text", "start", "end", "score", "ids", "report"[, "page", "page_end"]};
+    score is the best (lowest distance) of the merged hits. Chunks without usable offsets
+    (legacy metadata) are kept as they are, minus exact duplicates.
+    """
+    excerpts = []
+    by_report = {}
+    for chunk in chunks:
+        if _has_span(chunk):
+            by_report.setdefault(chunk.get("report"), []).append(chunk)
+        else:
+            excerpts.append(_excerpt(chunk))
+
+    for report, spans in by_report.items():
+        current = None
+        for chunk in sorted(spans, key=lambda c: (c["start"], c["end"])):
+            if current is not None and chunk["start"] <= current["end"]:
+                overlap = current["end"] - chunk["start"]
+                # Offsets are only trusted when the shared text really matches
+                contained = chunk["end"] <= current["end"] and \
+                    current["text"][chunk["start"] - current["start"]:][:len(chunk["text"])] == chunk["text"]
+                extends = chunk["end"] > current["end"] and \
+                    chunk["text"][:overlap] == current["text"][len(current["text"]) - overlap:]
+                if contained or extends:
+                    if extends:
+                        current["text"] += chunk["text"][overlap:]
+                        current["end"] = chunk["end"]
+                        if chunk.get("page_end"):
+                            current["page_end"] = max(current.get("page_end") or 0, chunk["page_end"])
+                            current.setdefault("page", chunk.get("page"))
+                    if chunk["score"] < current["score"]:
+                        current["score"] = chunk["score"]
+                        current["best_offset"] = chunk["start"] - current["start"]
+                    current["ids"].append(chunk["id"])
+                    continue
+            if current is not None:
+                excerpts.append(current)
+            current = _excerpt(chunk)
+        if current is not None:
+            excerpts.append(current)
+
+    # Identical text found at different offsets (repeated boilerplate) is sent once
+    unique = []
+    seen_texts = set()
+    for excerpt in sorted(excerpts, key=lambda e: e["score"]):
+        key = (excerpt["report"], excerpt["text"])
+        if key in seen_texts:
+            continue
+        seen_texts.add(key)
+        unique.append(excerpt)
+    return unique
+
+
+def _excerpt(chunk):
+    excerpt = {"text": chunk["text"], "start": chunk.get("start"), "end": chunk.get("end"),
+               "score": chunk["score"], "ids": [chunk["id"]], "report": chunk.get("report"), "best_offset": 0}
+    if chunk.get("page"):
+        excerpt["page"] = chunk["page"]
+        excerpt["page_end"] = chunk.get("page_end", chunk["page"])
+    return excerpt
+
+
+def _trim(text, tokens, focus=0):
+    """
+    Cut text to about `tokens` at word boundaries, keeping the window that
+    starts at `focus` (the best hit of a merged excerpt) where possible.
+    """
+    limit = tokens * 4
+    if len(text) <= limit:
+        return text
+    begin = max(0, min(focus, len(text) - limit))
+    if begin:
+        space = text.find(" ", begin, begin + limit // 2)
+        begin = space + 1 if space >= 0 else begin
+    end = begin + limit - 8  # room for the ellipses
+    cut = text.rfind(" ", begin, end)
+    end = cut if cut > begin + limit // 2 else end
+    return ("... " if begin else "") + text[begin:end].strip() + (" ..." if end < len(text) else "")
+
+
+def pack(chunks, budget=None):
+    """
+    Excerpts that fit the token budget, most relevant first, and stats:
+    {"chunks", "merged", "excerpts", "tokens", "raw_tokens", "dropped", "trimmed"}
+    (merged: chunks folded into another excerpt or dropped as duplicates).
+    """
+    budget = CONTEXT_TOKENS if budget is None else budget
+    excerpts = merge_spans(chunks)
+    packed = []
+    used = 0
+    trimmed = 0
+    for excerpt in excerpts:
+        remaining = budget - used
+        tokens = estimate_tokens(excerpt["text"])
+        if tokens <= remaining:
+            packed.append(excerpt)
+            used += tokens
+        elif remaining >= MIN_PARTIAL_TOKENS:
+            excerpt = dict(excerpt, text=_trim(excerpt["text"], remaining, excerpt.get("best_offset", 0)),
+                           trimmed=True)
+            packed.append(excerpt)
+            used += estimate_tokens(excerpt["text"])
+            trimmed += 1
+            break
+        else:
+            break
+    stats = {
+        "chunks": len(chunks),
+        "merged": len(chunks) - len(excerpts),
+        "excerpts": len(packed),
+        "tokens": used,
+        "raw_tokens": sum(estimate_tokens(c["text"]) for c in chunks),
+        "dropped": len(excerpts) - len(packed),
+        "trimmed": trimmed,
+    }
+    return packed, stats
+
+
+def render(excerpts):
+    """Prompt context for packed excerpts"""
+    parts = []
+    for i, excerpt in enumerate(excerpts):
+        header = f"Excerpt {i+1}"
+        if excerpt.get("report"):
+            header += f" [Report: {excerpt['report']}]"
+        if excerpt.get("page"):
+            last = excerpt.get("page_end") or excerpt["page"]
+            header += f" (page {excerpt['page']})" if last == excerpt["page"] else \
+                f" (pages {excerpt['page']}-{last})"
+        parts.append(f"{header}:\n{excerpt['text']}")
+    return "\n\n".join(parts)
+
+
+def legacy_pack(chunks, max_context_length=8000):
+    """The previous packing (chunks in rank order up to 8000 characters), for comparison"""
+    parts = []
+    total_length = 0
+    for i, chunk in enumerate(chunks):
+        chunk_text = f"Chunk {i+1}:\n{chunk['text']}"
+        if total_length + len(chunk_text) > max_context_length:
+            break
+        parts.append(chunk_text)
+        total_length += len(chunk_text)
+    return "\n\n".join(parts), len(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare context packing for a query against a report')
+    parser.add_argument('report')
+    parser.add_argument('query')
+    parser.add_argument('--max-chunks', type=int, default=10)
+    parser.add_argument('--budget', type=int, default=CONTEXT_TOKENS)
+    args = parser.parse_args()
+
+    from query_chunks import query_faiss_index
+    chunks, error = query_faiss_index(args.query, args.report, args.max_chunks, use_cache=False)
+    if error:
+        print(json.dumps({"error": error}))
+        return 2
+    legacy, legacy_count = legacy_pack(chunks)
+    legacy_chars = sum(len(c["text"]) for c in chunks[:legacy_count])
+    excerpts, stats = pack(chunks, args.budget)
+    covered = sum(len(e["text"]) for e in excerpts)
+    print(json.dumps({
+        "legacy": {"chunks_sent": legacy_count, "chunks_dropped": len(chunks) - legacy_count,
+                   "tokens": estimate_tokens(legacy), "text_chars": legacy_chars},
+        "packed": dict(stats, prompt_tokens=estimate_tokens(render(excerpts)), text_chars=covered),
+    }, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
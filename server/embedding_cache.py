@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Persistent embedding cache shared by every report.
+Inspection reports from the same template repeat long boilerplate blocks
+(disclaimers, scope, standard recommendations); ingest_pdf.py looks chunks up
+here first and only calls model.encode for cache misses.
+
+Entries are keyed by (model name, SHA-256 of the whitespace-normalized text).
+Vectors live in a float32 slot file that is memory-mapped, with a SQLite table
+mapping key -> slot under server/cache/embeddings/. The cache is bounded by
+KILIK_EMBEDDING_CACHE_MB (default 256); when full, the least recently used
+entries are evicted and their slots reused.
+"""
+import os
+import re
+import sys
+import time
+import sqlite3
+import hashlib
+import threading
+
+import numpy as np
+
+from query_cache import CACHE_DIR
+
+DEFAULT_MAX_BYTES = int(float(os.environ.get('KILIK_EMBEDDING_CACHE_MB', '256')) * 1024 * 1024)
+# Fraction of the capacity freed at once when the cache is full
+EVICT_FRACTION = 0.05
+# Slot file growth step, in rows
+GROW_ROWS = 4096
+# Keys per "key IN (...)" query, under SQLite's bound-variable limit
+KEY_BATCH = 500
+
+
+def safe_print_err(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def text_key(text):
+    return hashlib.sha256(" ".join(text.split()).encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, model_name, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+        self.dir = os.path.join(cache_dir, 'embeddings')
+        self.db_path = os.path.join(self.dir, f'{slug}.sqlite')
+        self.vec_path = os.path.join(self.dir, f'{slug}.f32')
+        self.max_bytes = max_bytes
+        self.dim = None
+        self._vectors = None
+        self._rows = 0
+        self._conn = None
+        self._lock = threading.RLock()
+        self.counts = {"hits": 0, "misses": 0, "evictions": 0}
+
+    # -- storage -------------------------------------------------------
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(self.dir, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS entries ('
+                         ' key TEXT PRIMARY KEY, slot INTEGER NOT NULL UNIQUE,'
+                         ' last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)')
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)')
+            conn.execute('CREATE TABLE IF NOT EXISTS free_slots (slot INTEGER PRIMARY KEY)')
+            conn.commit()
+            row = conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+            self.dim = row[0] if row else None
+            self._conn = conn
+        return self._conn
+
+    @property
+    def capacity(self):
+        return max(1, self.max_bytes // (self.dim * 4)) if self.dim else 0
+
+    def _map(self, min_rows=0):
+        """Memory-map the slot file, growing it to hold at least `min_rows` rows"""
+        row_bytes = self.dim * 4
+        size = os.path.getsize(self.vec_path) if os.path.exists(self.vec_path) else 0
+        rows = size // row_bytes
+        if rows < min_rows:
+            rows = min(self.capacity, max(min_rows, rows + GROW_ROWS))
+            with open(self.vec_path, 'ab') as f:
+                f.truncate(rows * row_bytes)
+        if self._vectors is None or rows != self._rows:
+            self._vectors = np.memmap(self.vec_path, dtype='float32', mode='r+', shape=(rows, self.dim)) if rows else None
+            self._rows = rows
+        return self._vectors
+
+    # -- lookups -------------------------------------------------------
+
+    def lookup(self, keys):
+        """Return {key: vector} for the keys that are cached"""
+        if not keys:
+            return {}
+        with self._lock:
+            conn = self._db()
+            if self.dim is None:
+                return {}
+            found = {}
+            unique = list(set(keys))
+            for start in range(0, len(unique), KEY_BATCH):
+                batch = unique[start:start + KEY_BATCH]
+                marks = ",".join("?" * len(batch))
+                found.update(conn.execute(f'SELECT key, slot FROM entries WHERE key IN ({marks})', batch).fetchall())
+            if not found:
+                return {}
+            vectors = self._map()
+            result = {k: np.array(vectors[slot]) for k, slot in found.items() if vectors is not None and slot < self._rows}
+            now = time.time()
+            conn.executemany('UPDATE entries SET last_used = ?, hits = hits + 1 WHERE key = ?',
+                             [(now, k) for k in result])
+            conn.commit()
+            return result
+
+    def store(self, keys, vectors):
+        """Insert vectors for keys not cached yet, evicting least recently used entries when full"""
+        vectors = np.asarray(vectors, dtype='float32')
+        if not len(keys):
+            return
+        with self._lock:
+            conn = self._db()
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)", (self.dim,))
+                conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('next_slot', 0)")
+                conn.commit()
+            elif vectors.shape[1] != self.dim:
+                safe_print_err(f'Embedding cache dim {self.dim} != {vectors.shape[1]}, not caching')
+                return
+
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                pending = {}
+                for key, vec in zip(keys, vectors):
+                    pending.setdefault(key, vec)
+                candidates = list(pending)
+                for start in range(0, len(candidates), KEY_BATCH):
+                    batch = candidates[start:start + KEY_BATCH]
+                    marks = ",".join("?" * len(batch))
+                    for (key,) in conn.execute(f'SELECT key FROM entries WHERE key IN ({marks})', batch).fetchall():
+                        del pending[key]
+                if not pending:
+                    conn.commit()
+                    return
+                slots = self._allocate(conn, len(pending))
+                mapped = self._map(max(slots) + 1)
+                now = time.time()
+                for slot, (key, vec) in zip(slots, pending.items()):
+                    mapped[slot] = vec
+                mapped.flush()
+                # Rows are committed after their vectors are written, so readers never see a slot early
+                conn.executemany('INSERT INTO entries (key, slot, last_used) VALUES (?, ?, ?)',
+                                 [(key, slot, now) for slot, key in zip(slots, pending)])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def _allocate(self, conn, n):
+        """Pick n slots: freed slots first, then fresh ones, evicting LRU entries if needed"""
+        slots = [row[0] for row in conn.execute('SELECT slot FROM free_slots LIMIT ?', (n,)).fetchall()]
+        if slots:
+            conn.executemany('DELETE FROM free_slots WHERE slot = ?', [(s,) for s in slots])
+        next_slot = conn.execute("SELECT value FROM meta WHERE name = 'next_slot'").fetchone()[0]
+        while len(slots) < n and next_slot < self.capacity:
+            slots.append(next_slot)
+            next_slot += 1
+        conn.execute("UPDATE meta SET value = ? WHERE name = 'next_slot'", (next_slot,))
+        if len(slots) < n:
+            want = max(n - len(slots), int(self.capacity * EVICT_FRACTION))
+            victims = conn.execute('SELECT key, slot FROM entries ORDER BY last_used LIMIT ?', (want,)).fetchall()
+            conn.executemany('DELETE FROM entries WHERE key = ?', [(k,) for k, _ in victims])
+            self.counts["evictions"] += len(victims)
+            freed = [slot for _, slot in victims]
+            take = n - len(slots)
+            slots.extend(freed[:take])
+            conn.executemany('INSERT OR IGNORE INTO free_slots (slot) VALUES (?)', [(s,) for s in freed[take:]])
+        return slots
+
+    # -- encoding ------------------------------------------------------
+
+    def encode(self, texts, load_model):
+        """
+        Embed `texts`, calling load_model().encode only for cache misses.
+        Returns (float32 array, {"hits": ..., "misses": ...}) for this call.
+        """
+        keys = [text_key(t) for t in texts]
+        try:
+            cached = self.lookup(keys)
+        except sqlite3.Error as e:
+            safe_print_err(f'Embedding cache read failed: {e}')
+            cached = {}
+
+        missing = {}
+        for i, key in enumerate(keys):
+            if key not in cached:
+                missing.setdefault(key, i)
+        hits = len(texts) - sum(1 for k in keys if k not in cached)
+        stats = {"hits": hits, "misses": len(texts) - hits}
+
+        if missing:
+            model = load_model()
+            fresh = model.encode([texts[i] for i in missing.values()], show_progress_bar=False, convert_to_numpy=True)
+            fresh = np.array(fresh, dtype='float32')
+            try:
+                self.store(list(missing), fresh)
+            except (sqlite3.Error, OSError) as e:
+                safe_print_err(f'Embedding cache write failed: {e}')
+            cached.update(zip(missing, fresh))
+
+        with self._lock:
+            self.counts["hits"] += stats["hits"]
+            self.counts["misses"] += stats["misses"]
+        return np.stack([cached[k] for k in keys]).astype('float32'), stats
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        total = counts["hits"] + counts["misses"]
+        counts["hit_ratio"] = round(counts["hits"] / total, 4) if total else 0.0
+        return counts
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(model_name):
+    """Process-wide EmbeddingCache for a model"""
+    with _caches_lock:
+        cache = _caches.get(model_name)
+        if cache is None:
+            cache = _caches[model_name] = EmbeddingCache(model_name)
+        return cache
+
+
+def enabled():
+    return os.environ.get('KILIK_EMBEDDING_CACHE', '1') not in ('0', 'false', 'off')
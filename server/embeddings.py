@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Shared loader for the sentence-transformers embedding model.
+The model is loaded once per process and reused, so a long-lived worker
+(see worker.py) only pays the torch/sentence_transformers import and the
+model load on its first request.
+"""
+import threading
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_model(name=MODEL_NAME):
+    """Return the (cached) SentenceTransformer for `name`"""
+    model = _models.get(name)
+    if model is not None:
+        return model
+    with _models_lock:
+        model = _models.get(name)
+        if model is None:
+            # Imported lazily: thin clients that forward to the worker never need torch
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(name)
+            _models[name] = model
+    return model
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Exact float32 side store for reports whose index is quantized (index_policy.py).
+<report>.vectors holds a 16-byte header and one row of float32 per FAISS id,
+so row N is the exact embedding of chunk N. Queries against a compressed
+index fetch a few times k candidates, then re-rank them here; the file is
+memory-mapped, so only the candidate rows are paged in and resident memory
+stays at the size of the compressed index.
+"""
+import os
+import struct
+import threading
+
+import numpy as np
+
+from chunk_store import INDEX_DIR
+
+MAGIC = b'KVEC'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sII4x')  # magic, format version, dim, padding
+HEADER_SIZE = HEADER.size
+
+
+def vectors_path(report_name, index_dir=INDEX_DIR):
+    return os.path.join(index_dir, f"{report_name}.vectors")
+
+
+def exists(report_name, index_dir=INDEX_DIR):
+    return os.path.exists(vectors_path(report_name, index_dir))
+
+
+class ExactVectors:
+    def __init__(self, report_name, index_dir=INDEX_DIR):
+        self.path = vectors_path(report_name, index_dir)
+        self.dim = None
+        self._rows = None
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        """(Re)map the file if it grew since it was last mapped"""
+        if not os.path.exists(self.path):
+            self._count = 0
+            return
+        with open(self.path, 'rb') as f:
+            magic, version, dim = HEADER.unpack(f.read(HEADER_SIZE))
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f'{self.path}: not an exact vector file')
+        count = (os.path.getsize(self.path) - HEADER_SIZE) // (dim * 4)
+        if self._rows is not None and count == self._count:
+            return
+        self.dim = dim
+        self._count = count
+        self._rows = np.memmap(self.path, dtype='<f4', mode='r', offset=HEADER_SIZE,
+                               shape=(count, dim)) if count else None
+
+    def __len__(self):
+        with self._lock:
+            self._open()
+            return self._count
+
+    def get(self, ids):
+        """Rows for ids, plus a mask of the ids that have a stored vector"""
+        ids = np.asarray(ids, dtype='int64')
+        with self._lock:
+            self._open()
+            if self._rows is None:
+                return np.zeros((len(ids), self.dim or 0), dtype='float32'), np.zeros(len(ids), dtype=bool)
+            present = (ids >= 0) & (ids < self._count)
+            rows = np.zeros((len(ids), self.dim), dtype='float32')
+            rows[present] = self._rows[ids[present]]
+            # Gaps in the file read back as zero rows; real embeddings are unit length
+            present &= rows.any(axis=1)
+            return rows, present
+
+    def write(self, ids, vectors):
+        """Store vectors at their ids' rows (the file grows as needed)"""
+        ids = np.asarray(ids, dtype='int64')
+        vectors = np.ascontiguousarray(vectors, dtype='<f4')
+        if not len(ids):
+            return
+        with self._lock:
+            if not os.path.exists(self.path):
+                with open(self.path, 'wb') as f:
+                    f.write(HEADER.pack(MAGIC, FORMAT_VERSION, vectors.shape[1]))
+            self._rows = None
+            self._open()
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f'{self.path}: dim {self.dim} != {vectors.shape[1]}')
+            row_bytes = self.dim * 4
+            order = np.argsort(ids, kind='stable')
+            with open(self.path, 'r+b') as f:
+                # One write per run of consecutive ids
+                start = 0
+                while start < len(order):
+                    end = start + 1
+                    while end < len(order) and ids[order[end]] == ids[order[end - 1]] + 1:
+                        end += 1
+                    f.seek(HEADER_SIZE + int(ids[order[start]]) * row_bytes)
+                    f.write(vectors[order[start:end]].tobytes())
+                    start = end
+                f.flush()
+                os.fsync(f.fileno())
+            self._rows = None
+
+    def rerank(self, query, ids, approx_distances, k):
+        """Re-rank one query's candidates with their exact vectors; returns (distances, ids), best k first"""
+        ids = np.asarray(ids, dtype='int64')
+        valid = ids >= 0
+        rows, present = self.get(ids[valid])
+        return rerank(query, ids[valid], np.asarray(approx_distances)[valid], k, rows, present)
+
+    def close(self):
+        with self._lock:
+            self._rows = None
+            self._count = 0
+
+
+def rerank(query, ids, approx_distances, k, rows, present=None):
+    """
+    Exact squared L2 distances of candidate `ids` (with vectors `rows`), best k first.
+    Candidates without a stored vector (present False) keep their approximate distance.
+    """
+    distances = np.array(approx_distances, dtype='float32')
+    present = np.ones(len(ids), dtype=bool) if present is None else present
+    if present.any():
+        diff = rows[present] - np.asarray(query, dtype='float32').reshape(1, -1)
+        distances[present] = np.einsum('ij,ij->i', diff, diff)
+    order = np.argsort(distances, kind='stable')[:k]
+    return distances[order], np.asarray(ids)[order]
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store for images extracted by pdf_process.py, so the JSON
+output can carry references instead of base64 data URIs.
+
+    <dir>/v<N>/<aa>/<sha256>.jpg    the encoded JPEG (pdf_process.encode_image)
+    <dir>/v<N>/<aa>/<sha256>.skip   the image was rejected (too small / too large)
+
+Entries are keyed by the SHA-256 of the image bytes embedded in the PDF, so a
+repeated image (or a re-processed PDF) is found without decoding or resizing
+it again. N is the encoding version; bump ENCODING_VERSION when encode_image
+changes its output. The store is pruned to KILIK_IMAGE_STORE_MB (1024),
+least recently used first (lru_directory.py).
+
+    KILIK_IMAGE_DIR   store location (default: <KILIK_CACHE_DIR>/images)
+"""
+import os
+
+from lru_directory import lru_directory
+from query_cache import CACHE_DIR
+
+ENCODING_VERSION = 1
+IMAGE_DIR = os.environ.get('KILIK_IMAGE_DIR') or os.path.join(CACHE_DIR, 'images')
+MAX_BYTES = int(os.environ.get('KILIK_IMAGE_STORE_MB', '1024')) * 1024 * 1024
+
+MISS = object()
+
+
+class ImageStore:
+    def __init__(self, root=None, max_bytes=MAX_BYTES):
+        self.root = os.path.join(os.path.abspath(root or IMAGE_DIR), f"v{ENCODING_VERSION}")
+        self.files = lru_directory(self.root, max_bytes, 'Image store')
+
+    def _path(self, digest, ext):
+        return os.path.join(self.root, digest[:2], f"{digest}.{ext}")
+
+    def lookup(self, digest):
+        """Reference for a stored image, None if it was rejected before, or MISS"""
+        path = self._path(digest, 'jpg')
+        try:
+            ref = self._ref(digest, path)
+        except FileNotFoundError:
+            return None if os.path.exists(self._path(digest, 'skip')) else MISS
+        self.files.touch(path)
+        return ref
+
+    def put(self, digest, data):
+        """Store encoded JPEG bytes (None records a rejected image); returns the reference or None"""
+        path = self._path(digest, 'jpg' if data is not None else 'skip')
+        self.files.write(path, data or b'')
+        return self._ref(digest, path) if data is not None else None
+
+    @staticmethod
+    def _ref(digest, path):
+        from PIL import Image
+        size = os.path.getsize(path)
+        # Only the JPEG header is parsed here, not the pixels
+        with Image.open(path) as image:
+            width, height = image.size
+        return {"id": digest, "path": path, "width": width, "height": height, "bytes": size}
+
+    def prune(self):
+        """Delete least recently used images until the store fits its cap; returns the count removed"""
+        return self.files.prune()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Catalog of the per-report FAISS indexes in server/faiss_indices.
+Indexes are opened memory-mapped and read-only, so the first query against
+a cold report costs page faults instead of a full file read, and the OS can
+drop clean pages under memory pressure. Open handles are kept in an LRU
+bounded by bytes (KILIK_INDEX_CACHE_MB, default 512). Chunk texts come from
+the memory-mapped chunk store (chunk_store.py); reports that still only
+have a legacy <report>_meta.json load it on first access.
+
+Writers (ingest_pdf.py) replace index files atomically, so a mapped handle
+keeps reading the old inode until the catalog notices the new version.
+"""
+import os
+import sys
+import json
+import threading
+from collections import OrderedDict
+
+import faiss
+
+from chunk_store import ChunkStore
+import chunk_store
+import exact_vectors
+import index_policy
+import query_cache
+
+INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'faiss_indices')
+DEFAULT_MAX_BYTES = int(float(os.environ.get('KILIK_INDEX_CACHE_MB', '512')) * 1024 * 1024)
+
+# IO_FLAG_MMAP_IFC also maps the codes of flat indexes (faiss >= 1.8); older builds only map IVF lists
+MMAP_FLAGS = getattr(faiss, 'IO_FLAG_MMAP_IFC', faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def safe_print_err(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def index_path(report_name):
+    return os.path.join(INDEX_DIR, f"{report_name}.index")
+
+
+def meta_path(report_name):
+    return os.path.join(INDEX_DIR, f"{report_name}_meta.json")
+
+
+def list_reports(prefix=""):
+    """Names of all reports with an index on disk, optionally filtered by prefix"""
+    try:
+        names = os.listdir(INDEX_DIR)
+    except OSError:
+        return []
+    return sorted(n[:-len('.index')] for n in names if n.endswith('.index') and n.startswith(prefix))
+
+
+def read_index_mmap(path):
+    """Open an index memory-mapped; falls back to a full read for index types that cannot be mapped"""
+    try:
+        return faiss.read_index(path, MMAP_FLAGS)
+    except RuntimeError as e:
+        safe_print_err(f'mmap read failed for {path} ({e}), reading into memory')
+        return faiss.read_index(path)
+
+
+def has_chunks(report_name):
+    return chunk_store.exists(report_name, INDEX_DIR) or os.path.exists(meta_path(report_name))
+
+
+class ReportHandle:
+    """An open report index plus lazy access to its chunk texts"""
+
+    def __init__(self, report_name, version):
+        self.report_name = report_name
+        self.version = version
+        self.policy = index_policy.Policy.for_report(report_name)
+        # nprobe / efSearch come from the current policy, not the values saved with the index
+        self.index = index_policy.configure_search(read_index_mmap(index_path(report_name)), self.policy)
+        # Exact vectors to re-rank results of a quantized index
+        self.exact = None
+        if self.policy.rerank and exact_vectors.exists(report_name, INDEX_DIR):
+            self.exact = exact_vectors.ExactVectors(report_name, INDEX_DIR)
+        self.index_bytes = os.path.getsize(index_path(report_name))
+        self.store = ChunkStore(report_name, INDEX_DIR) if chunk_store.exists(report_name, INDEX_DIR) else None
+        self._metadata = None
+        self.meta_bytes = 0
+        self._meta_lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return self.index_bytes + self.meta_bytes
+
+    @property
+    def metadata(self):
+        """Parsed legacy JSON metadata (only used when the report has no chunk store)"""
+        if self._metadata is None:
+            with self._meta_lock:
+                if self._metadata is None:
+                    path = meta_path(self.report_name)
+                    with open(path, 'r', encoding='utf-8') as f:
+                        self._metadata = json.load(f)
+                    self.meta_bytes = os.path.getsize(path)
+        return self._metadata
+
+    def search(self, queries, k):
+        return index_policy.search(self.index, queries, k, self.policy, self.exact)
+
+    def chunk(self, idx):
+        """Chunk {"id", "text", "start", "end"} for FAISS id `idx`, or None"""
+        if self.store is not None:
+            return self.store.get(idx)
+        metadata = self.metadata
+        if 0 <= idx < len(metadata):
+            return metadata[idx]
+        return None
+
+
+class IndexCatalog:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._handles = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self.counts = {"hits": 0, "loads": 0, "evictions": 0}
+
+    def get(self, report_name):
+        """Return the current ReportHandle for a report, or None if it has no index"""
+        if not os.path.exists(index_path(report_name)) or not has_chunks(report_name):
+            return None
+        version = query_cache.index_version(index_path(report_name))
+
+        with self._lock:
+            handle = self._handles.get(report_name)
+            if handle is not None and handle.version == version:
+                self._handles.move_to_end(report_name)
+                self.counts["hits"] += 1
+                return handle
+            load_lock = self._load_locks.setdefault(report_name, threading.Lock())
+
+        # One loader per report; other threads wait for it rather than mapping the file twice
+        with load_lock:
+            with self._lock:
+                handle = self._handles.get(report_name)
+                if handle is not None and handle.version == version:
+                    self._handles.move_to_end(report_name)
+                    self.counts["hits"] += 1
+                    return handle
+            handle = ReportHandle(report_name, version)
+            with self._lock:
+                self._handles[report_name] = handle
+                self._handles.move_to_end(report_name)
+                self.counts["loads"] += 1
+                self._evict()
+        return handle
+
+    def _evict(self):
+        total = sum(h.nbytes for h in self._handles.values())
+        # Always keep the most recently used handle, even if it alone exceeds the budget
+        while total > self.max_bytes and len(self._handles) > 1:
+            _, handle = self._handles.popitem(last=False)
+            total -= handle.nbytes
+            if handle.store is not None:
+                handle.store.close()
+            if handle.exact is not None:
+                handle.exact.close()
+            self.counts["evictions"] += 1
+
+    def discard(self, report_name):
+        with self._lock:
+            self._handles.pop(report_name, None)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, open=len(self._handles),
+                        resident_bytes=sum(h.nbytes for h in self._handles.values()),
+                        max_bytes=self.max_bytes)
+
+
+catalog = IndexCatalog()
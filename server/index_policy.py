@@ -0,0 +1,592 @@
+#!/usr/bin/env python3
+"""
+Index type policy for report indexes.
+Small reports keep an exact IndexIDMap2(IndexFlatL2). Once a report holds
+KILIK_ANN_THRESHOLD vectors (default 20000) it is rebuilt as an approximate
+index, IVF-Flat (default) or HNSW, chosen with KILIK_ANN_KIND.
+
+All vectors are L2-normalized before they are added or searched, so L2
+distance ranks exactly like cosine similarity (d^2 = 2 - 2cos) and scores stay
+comparable whatever the index type.
+
+Parameters (environment, or the Policy fields of the same name):
+    KILIK_INDEX_KIND      auto | flat | ivf | hnsw     (auto)
+    KILIK_ANN_THRESHOLD   vectors before auto switches to ANN (20000)
+    KILIK_ANN_KIND        ivf | hnsw                   (ivf)
+    KILIK_IVF_NLIST       IVF lists, 0 = 4 * sqrt(n)   (0)
+    KILIK_IVF_NPROBE      lists visited per search      (32)
+    KILIK_HNSW_M          HNSW graph degree             (32)
+    KILIK_HNSW_EF_SEARCH  HNSW search beam width        (128)
+
+    KILIK_INDEX_ENCODING  float32 | fp16 | sq8 | pq    (float32)
+    KILIK_PQ_M            PQ sub-quantizers (bytes per vector) (48)
+    KILIK_INDEX_RERANK    keep exact vectors and re-rank quantized results (0)
+    KILIK_RERANK_FACTOR   candidates fetched per result when re-ranking (4)
+Per-report settings in faiss_indices/<report>.policy.json override these.
+
+IVF indexes keep external ids natively (with a hashtable direct map so
+chunks can be removed and reconstructed). HNSW cannot remove vectors, so
+removals rebuild the graph from the remaining vectors. Quantized indexes
+(fp16 2x, sq8 4x, pq 32x smaller at the defaults) can keep exact vectors in
+a memory-mapped side store (exact_vectors.py) used to re-rank candidates.
+
+Recall@k vs latency of the ANN settings against the exact index:
+    python index_policy.py benchmark --report <reportName>
+    python index_policy.py benchmark --synthetic 100000
+Memory and recall of each encoding (with and without re-ranking):
+    python index_policy.py encodings --synthetic 50000 [--kind ivf]
+Change a report's encoding and rebuild its index:
+    python index_policy.py convert <reportName> --encoding sq8 --rerank
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from dataclasses import dataclass, field, replace
+
+import faiss
+import numpy as np
+
+import chunk_store
+
+INDEX_DIR = chunk_store.INDEX_DIR
+
+ENCODINGS = ('float32', 'fp16', 'sq8', 'pq')
+SQ_TYPES = {'fp16': faiss.ScalarQuantizer.QT_fp16, 'sq8': faiss.ScalarQuantizer.QT_8bit}
+PQ_NBITS = 8
+# Below this many vectors PQ codebooks cannot be trained; sq8 is used instead
+PQ_MIN_VECTORS = 1024
+
+HNSW_EF_CONSTRUCTION = 80
+# IVF needs about this many training points per list to train well
+TRAIN_POINTS_PER_LIST = 39
+# k-means gains little from more than this many points per list
+MAX_TRAIN_POINTS_PER_LIST = 64
+# An IVF index is retrained once it outgrows its list count by this factor
+NLIST_REBUILD_FACTOR = 4
+
+
+def safe_print_err(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+@dataclass
+class Policy:
+    kind: str = field(default_factory=lambda: os.environ.get('KILIK_INDEX_KIND', 'auto'))
+    threshold: int = field(default_factory=lambda: _env_int('KILIK_ANN_THRESHOLD', 20000))
+    ann_kind: str = field(default_factory=lambda: os.environ.get('KILIK_ANN_KIND', 'ivf'))
+    nlist: int = field(default_factory=lambda: _env_int('KILIK_IVF_NLIST', 0))
+    nprobe: int = field(default_factory=lambda: _env_int('KILIK_IVF_NPROBE', 32))
+    hnsw_m: int = field(default_factory=lambda: _env_int('KILIK_HNSW_M', 32))
+    ef_search: int = field(default_factory=lambda: _env_int('KILIK_HNSW_EF_SEARCH', 128))
+    encoding: str = field(default_factory=lambda: os.environ.get('KILIK_INDEX_ENCODING', 'float32'))
+    pq_m: int = field(default_factory=lambda: _env_int('KILIK_PQ_M', 48))
+    rerank: bool = field(default_factory=lambda: os.environ.get('KILIK_INDEX_RERANK', '0') in ('1', 'true', 'on'))
+    rerank_factor: int = field(default_factory=lambda: _env_int('KILIK_RERANK_FACTOR', 4))
+
+    @classmethod
+    def for_report(cls, report_name):
+        """Global policy with the report's own settings (<report>.policy.json) on top"""
+        policy = cls()
+        for name, value in load_report_settings(report_name).items():
+            if name in policy.__dataclass_fields__:
+                setattr(policy, name, value)
+        return policy
+
+    def kind_for(self, n):
+        """Index kind wanted for a report of n vectors"""
+        if self.kind in ('flat', 'ivf', 'hnsw'):
+            return self.kind
+        return self.ann_kind if n >= self.threshold else 'flat'
+
+    def encoding_for(self, n):
+        """Vector encoding wanted for n vectors (PQ needs enough data to train its codebooks)"""
+        if self.encoding not in ENCODINGS:
+            safe_print_err(f'Unknown index encoding {self.encoding!r}, using float32')
+            return 'float32'
+        if self.encoding == 'pq' and n < PQ_MIN_VECTORS:
+            return 'sq8'
+        return self.encoding
+
+    def nlist_for(self, n):
+        nlist = self.nlist or int(4 * math.sqrt(max(n, 1)))
+        # Never more lists than the data can train
+        return max(1, min(nlist, n // TRAIN_POINTS_PER_LIST or 1, 65536))
+
+    def pq_m_for(self, dim):
+        """Largest number of PQ sub-quantizers <= pq_m that divides dim"""
+        return next(m for m in range(max(1, min(self.pq_m, dim)), 0, -1) if dim % m == 0)
+
+
+def settings_path(report_name):
+    return os.path.join(INDEX_DIR, f"{report_name}.policy.json")
+
+
+def load_report_settings(report_name):
+    try:
+        with open(settings_path(report_name), 'r', encoding='utf-8') as f:
+            settings = json.load(f)
+        return settings if isinstance(settings, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_report_settings(report_name, **settings):
+    """Merge settings into the report's policy file (None removes a setting)"""
+    current = load_report_settings(report_name)
+    current.update(settings)
+    current = {k: v for k, v in current.items() if v is not None}
+    tmp_path = f"{settings_path(report_name)}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(current, f, indent=2)
+    os.replace(tmp_path, settings_path(report_name))
+    return current
+
+
+def normalize(vectors):
+    """float32 copy of `vectors` with unit-length rows"""
+    vectors = np.array(vectors, dtype='float32', copy=True, ndmin=2)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def _inner(index):
+    return faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+
+
+def index_kind(index):
+    if isinstance(index, faiss.IndexIVF):
+        return 'ivf'
+    if isinstance(_inner(index), faiss.IndexHNSW):
+        return 'hnsw'
+    return 'flat'
+
+
+def _codec_encoding(codec):
+    if isinstance(codec, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return {SQ_TYPES['fp16']: 'fp16', SQ_TYPES['sq8']: 'sq8'}.get(codec.sq.qtype, 'sq')
+    if isinstance(codec, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        return 'pq'
+    return 'float32'
+
+
+def index_encoding(index):
+    """How the index stores its vectors: float32, fp16, sq8 or pq"""
+    if isinstance(index, faiss.IndexIVF):
+        return _codec_encoding(index)
+    inner = _inner(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        return _codec_encoding(faiss.downcast_index(inner.storage))
+    return _codec_encoding(inner)
+
+
+def describe(index):
+    return index_kind(index), index_encoding(index)
+
+
+def new_index(dim):
+    """Empty exact index; ingest grows it and `apply` converts it when it gets large"""
+    return faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
+
+
+def index_ids(index):
+    """External ids of every vector in the index"""
+    if isinstance(index, faiss.IndexIVF):
+        return ivf_contents(index, vectors=False)[0]
+    return faiss.vector_to_array(index.id_map).astype('int64')
+
+
+def ivf_contents(ivf, vectors=True):
+    """(ids, vectors) of an IVF index, read list by list (vectors are decoded for quantized lists)"""
+    invlists = ivf.invlists
+    all_ids, all_vecs = [], []
+    for list_no in range(ivf.nlist):
+        size = invlists.list_size(list_no)
+        if not size:
+            continue
+        ptr = invlists.get_ids(list_no)
+        all_ids.append(faiss.rev_swig_ptr(ptr, size).copy())
+        invlists.release_ids(list_no, ptr)
+        if vectors and isinstance(ivf, faiss.IndexIVFFlat):
+            ptr = invlists.get_codes(list_no)
+            codes = faiss.rev_swig_ptr(ptr, size * invlists.code_size).copy()
+            invlists.release_codes(list_no, ptr)
+            all_vecs.append(codes.view('float32').reshape(size, ivf.d))
+    ids = np.concatenate(all_ids).astype('int64') if all_ids else np.zeros(0, dtype='int64')
+    if not vectors:
+        return ids, None
+    if isinstance(ivf, faiss.IndexIVFFlat):
+        vecs = np.concatenate(all_vecs) if all_vecs else np.zeros((0, ivf.d), dtype='float32')
+    else:
+        vecs = ivf.reconstruct_batch(ids) if len(ids) else np.zeros((0, ivf.d), dtype='float32')
+    return ids, vecs
+
+
+def index_contents(index, exact=None):
+    """
+    (ids, vectors) of every entry, in no particular order. Vectors come from the
+    exact side store when it has all of them, otherwise they are decoded from
+    the index (approximate for quantized encodings).
+    """
+    if exact is not None:
+        ids = index_ids(index)
+        rows, present = exact.get(ids)
+        if present.all():
+            return ids, rows
+    if isinstance(index, faiss.IndexIVF):
+        return ivf_contents(index)
+    ids = faiss.vector_to_array(index.id_map).astype('int64')
+    if not len(ids):
+        return ids, np.zeros((0, index.d), dtype='float32')
+    return ids, index.index.reconstruct_n(0, index.ntotal)
+
+
+def _train(index, vectors, max_points):
+    if index.is_trained or not len(vectors):
+        return
+    if len(vectors) > max_points:
+        vectors = vectors[np.random.default_rng(0).choice(len(vectors), max_points, replace=False)]
+    index.train(vectors)
+
+
+def build_index(kind, ids, vectors, policy=None):
+    """Build an index of `kind` holding (ids, normalized vectors), encoded as the policy says"""
+    policy = policy or Policy()
+    dim = vectors.shape[1]
+    ids = np.ascontiguousarray(ids, dtype='int64')
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    encoding = policy.encoding_for(len(ids))
+    pq_m = policy.pq_m_for(dim)
+    max_train = max(PQ_MIN_VECTORS, len(vectors) // 4)
+    if kind == 'ivf':
+        nlist = policy.nlist_for(len(ids))
+        quantizer = faiss.IndexFlatL2(dim)
+        if encoding in SQ_TYPES:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, SQ_TYPES[encoding], faiss.METRIC_L2)
+        elif encoding == 'pq':
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, PQ_NBITS)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_L2)
+        _train(index, vectors, max(nlist * MAX_TRAIN_POINTS_PER_LIST, PQ_MIN_VECTORS if encoding == 'pq' else 0))
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        index.nprobe = min(policy.nprobe, nlist)
+    elif kind == 'hnsw':
+        if encoding in SQ_TYPES:
+            inner = faiss.IndexHNSWSQ(dim, SQ_TYPES[encoding], policy.hnsw_m)
+        elif encoding == 'pq':
+            inner = faiss.IndexHNSWPQ(dim, pq_m, policy.hnsw_m)
+        else:
+            inner = faiss.IndexHNSWFlat(dim, policy.hnsw_m)
+        inner.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        inner.hnsw.efSearch = policy.ef_search
+        _train(inner, vectors, max_train)
+        index = faiss.IndexIDMap2(inner)
+    else:
+        if encoding in SQ_TYPES:
+            inner = faiss.IndexScalarQuantizer(dim, SQ_TYPES[encoding], faiss.METRIC_L2)
+        elif encoding == 'pq':
+            inner = faiss.IndexPQ(dim, pq_m, PQ_NBITS)
+        else:
+            inner = faiss.IndexFlatL2(dim)
+        _train(inner, vectors, max_train)
+        index = faiss.IndexIDMap2(inner)
+    if len(ids):
+        index.add_with_ids(vectors, ids)
+    return index
+
+
+def add_vectors(index, vectors, ids, policy=None):
+    """Add normalized vectors; an untrained index is rebuilt (and trained) with them"""
+    if not index.is_trained:
+        old_ids, old_vecs = index_contents(index)
+        return build_index(index_kind(index), np.concatenate([old_ids, ids]),
+                           np.concatenate([old_vecs, vectors]), policy)
+    index.add_with_ids(np.ascontiguousarray(vectors, dtype='float32'), np.ascontiguousarray(ids, dtype='int64'))
+    return index
+
+
+def remove_vectors(index, ids, policy=None, exact=None):
+    """Remove ids from the index; returns the (possibly rebuilt) index"""
+    ids = np.asarray(ids, dtype='int64')
+    if not len(ids):
+        return index
+    if index_kind(index) == 'hnsw':
+        old_ids, old_vecs = index_contents(index, exact)
+        keep = ~np.isin(old_ids, ids)
+        return build_index('hnsw', old_ids[keep], normalize(old_vecs[keep]), policy)
+    if isinstance(index, faiss.IndexIVF):
+        # The hashtable direct map only supports removal through an id array
+        index.remove_ids(faiss.IDSelectorArray(len(ids), faiss.swig_ptr(ids)))
+    else:
+        index.remove_ids(faiss.IDSelectorBatch(ids))
+    return index
+
+
+def apply(index, policy=None, exact=None):
+    """
+    Convert the index to the kind and encoding the policy wants for its size
+    (rebuilding it from the exact side store if there is one, else from its own
+    vectors), or return it unchanged.
+    """
+    policy = policy or Policy()
+    want = (policy.kind_for(index.ntotal), policy.encoding_for(index.ntotal))
+    have = describe(index)
+    if want == have and not (have[0] == 'ivf' and _ivf_outgrown(index, policy)):
+        return configure_search(index, policy)
+    safe_print_err(f'Rebuilding {"/".join(have)} index of {index.ntotal} vectors as {"/".join(want)}')
+    ids, vectors = index_contents(index, exact)
+    return build_index(want[0], ids, normalize(vectors) if len(ids) else vectors, policy)
+
+
+def backfill_exact(index, exact):
+    """Fill a new exact side store from the index (decoded vectors if the index is already quantized)"""
+    if os.path.exists(exact.path) or not index.ntotal:
+        return
+    if index_encoding(index) != 'float32':
+        safe_print_err('Exact vectors requested for a quantized index; storing decoded vectors')
+    ids, vectors = index_contents(index)
+    exact.write(ids, normalize(vectors))
+
+
+def _ivf_outgrown(index, policy):
+    return (index.ntotal > index.nlist * TRAIN_POINTS_PER_LIST * NLIST_REBUILD_FACTOR
+            and policy.nlist_for(index.ntotal) > index.nlist)
+
+
+def configure_search(index, policy=None):
+    """Set the query-time knobs (nprobe / efSearch) from the policy"""
+    policy = policy or Policy()
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = min(policy.nprobe, index.nlist)
+    elif index_kind(index) == 'hnsw':
+        _inner(index).hnsw.efSearch = policy.ef_search
+    return index
+
+
+def search(index, queries, k, policy=None, exact=None):
+    """
+    Search the index; with an exact side store and a quantized index, fetch
+    rerank_factor * k candidates and re-rank them with their exact vectors.
+    """
+    policy = policy or Policy()
+    if exact is None or index_encoding(index) == 'float32':
+        return index.search(queries, k)
+    fetch = min(index.ntotal, k * max(1, policy.rerank_factor))
+    distances, ids = index.search(queries, fetch)
+    out_d = np.full((len(queries), k), np.inf, dtype='float32')
+    out_i = np.full((len(queries), k), -1, dtype='int64')
+    for row, (query, cand_i, cand_d) in enumerate(zip(queries, ids, distances)):
+        d, i = exact.rerank(query, cand_i, cand_d, k)
+        out_d[row, :len(d)] = d
+        out_i[row, :len(i)] = i
+    return out_d, out_i
+
+
+# -- benchmark ---------------------------------------------------------
+
+
+def synthetic_vectors(n, dim=384, clusters=200, latent=32, seed=0):
+    """
+    Clustered unit vectors that vary mostly along a few latent directions:
+    closer to sentence embeddings than isotropic noise, which no ANN index handles well.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype('float32')
+    basis = rng.standard_normal((latent, dim)).astype('float32')
+    vectors = centers[rng.integers(0, clusters, n)]
+    vectors += 0.1 * rng.standard_normal((n, latent)).astype('float32') @ basis
+    vectors += 0.02 * rng.standard_normal((n, dim)).astype('float32')
+    return normalize(vectors)
+
+
+def _timed_search(index, queries, k):
+    t0 = time.perf_counter()
+    _, found = index.search(queries, k)
+    return found, (time.perf_counter() - t0) * 1000 / len(queries)
+
+
+def _sample_queries(vectors, queries, seed):
+    """Perturbed corpus vectors, like questions phrased close to a passage"""
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(vectors), min(queries, len(vectors)), replace=False)
+    return normalize(vectors[picks] + 0.3 * rng.standard_normal((len(picks), vectors.shape[1])).astype('float32'))
+
+
+def _recall(found, truth, k):
+    return round(float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])), 4)
+
+
+def benchmark(vectors, k=5, queries=200, policy=None, seed=1):
+    """Recall@k and per-query latency of IVF and HNSW settings against exact search"""
+    policy = policy or Policy()
+    n = len(vectors)
+    ids = np.arange(n, dtype='int64')
+    q = _sample_queries(vectors, queries, seed)
+
+    exact = build_index('flat', ids, vectors, replace(policy, encoding='float32'))
+    truth, flat_ms = _timed_search(exact, q, k)
+    rows = [{"index": "flat", "recall": 1.0, "ms_per_query": round(flat_ms, 3)}]
+
+    def recall(found):
+        return _recall(found, truth, k)
+
+    t0 = time.perf_counter()
+    ivf = build_index('ivf', ids, vectors, policy)
+    build_s = time.perf_counter() - t0
+    for nprobe in sorted({1, 4, 8, 16, 32, 64, policy.nprobe}):
+        if nprobe > ivf.nlist:
+            continue
+        ivf.nprobe = nprobe
+        found, ms = _timed_search(ivf, q, k)
+        rows.append({"index": "ivf", "nlist": ivf.nlist, "nprobe": nprobe, "recall": recall(found),
+                     "ms_per_query": round(ms, 3), "build_s": round(build_s, 2)})
+
+    t0 = time.perf_counter()
+    hnsw = build_index('hnsw', ids, vectors, policy)
+    build_s = time.perf_counter() - t0
+    inner = faiss.downcast_index(hnsw.index)
+    for ef in sorted({16, 32, 64, 128, 256, policy.ef_search}):
+        inner.hnsw.efSearch = ef
+        found, ms = _timed_search(hnsw, q, k)
+        rows.append({"index": "hnsw", "M": policy.hnsw_m, "efSearch": ef, "recall": recall(found),
+                     "ms_per_query": round(ms, 3), "build_s": round(build_s, 2)})
+    return {"vectors": n, "dim": vectors.shape[1], "k": k, "queries": len(q),
+            "policy": policy.__dict__, "results": rows}
+
+
+class _ArrayVectors:
+    """In-memory stand-in for ExactVectors (ids are row numbers)"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def rerank(self, query, ids, approx_distances, k):
+        import exact_vectors
+        ids = np.asarray(ids, dtype='int64')
+        valid = ids >= 0
+        return exact_vectors.rerank(query, ids[valid], np.asarray(approx_distances)[valid], k,
+                                    self.vectors[ids[valid]])
+
+
+def compare_encodings(vectors, kind='flat', k=5, queries=200, policy=None, seed=1):
+    """Index bytes, recall@k and latency of every encoding, with and without exact re-ranking"""
+    policy = policy or Policy()
+    n = len(vectors)
+    ids = np.arange(n, dtype='int64')
+    q = _sample_queries(vectors, queries, seed)
+    truth, _ = _timed_search(build_index('flat', ids, vectors, replace(policy, encoding='float32')), q, k)
+    exact = _ArrayVectors(vectors)
+
+    rows = []
+    for encoding in ENCODINGS:
+        enc_policy = replace(policy, encoding=encoding)
+        t0 = time.perf_counter()
+        index = build_index(kind, ids, vectors, enc_policy)
+        build_s = time.perf_counter() - t0
+        nbytes = len(faiss.serialize_index(index))
+        found, ms = _timed_search(index, q, k)
+        row = {"encoding": describe(index)[1], "kind": kind, "bytes": nbytes,
+               "bytes_per_vector": round(nbytes / n, 1), "recall": _recall(found, truth, k),
+               "ms_per_query": round(ms, 3), "build_s": round(build_s, 2)}
+        if encoding != 'float32':
+            t0 = time.perf_counter()
+            _, found = search(index, q, k, enc_policy, exact)
+            row["rerank_recall"] = _recall(found, truth, k)
+            row["rerank_ms_per_query"] = round((time.perf_counter() - t0) * 1000 / len(q), 3)
+        rows.append(row)
+    return {"vectors": n, "dim": vectors.shape[1], "k": k, "queries": len(q),
+            "rerank_factor": policy.rerank_factor, "results": rows}
+
+
+def convert_report(report_name, **settings):
+    """Save settings for a report and rebuild its index to match them"""
+    import exact_vectors
+    import ingest_pdf
+    import query_cache
+
+    path = os.path.join(INDEX_DIR, f"{report_name}.index")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f'No index for report {report_name}')
+    with ingest_pdf.report_lock(report_name):
+        settings = save_report_settings(report_name, **settings)
+        policy = Policy.for_report(report_name)
+        index = ingest_pdf.load_id_index(path)
+        exact = exact_vectors.ExactVectors(report_name) if policy.rerank else None
+        if exact is not None:
+            backfill_exact(index, exact)
+        elif exact_vectors.exists(report_name):
+            os.remove(exact_vectors.vectors_path(report_name))
+        before = describe(index)
+        index = apply(index, policy, exact)
+        # Rewritten even when unchanged so cached handles and retrievals see the new settings
+        ingest_pdf.write_index_atomic(index, path)
+    query_cache.invalidate_report(report_name)
+    return {"report": report_name, "settings": settings, "before": "/".join(before),
+            "after": "/".join(describe(index)), "vectors": index.ntotal,
+            "index_bytes": os.path.getsize(path)}
+
+
+def _load_vectors(args, parser):
+    if args.report:
+        index = faiss.read_index(os.path.join(INDEX_DIR, f"{args.report}.index"))
+        vectors = normalize(index_contents(index)[1])
+    else:
+        vectors = synthetic_vectors(args.synthetic)
+    if len(vectors) < args.k:
+        parser.error('not enough vectors to benchmark')
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Index policy tools')
+    sub = parser.add_subparsers(dest='command', required=True)
+    bench = sub.add_parser('benchmark', help='Recall@k vs latency of ANN settings against the exact index')
+    source = bench.add_mutually_exclusive_group(required=True)
+    source.add_argument('--report', help='Use the vectors of this report index')
+    source.add_argument('--synthetic', type=int, help='Use this many synthetic clustered vectors')
+    bench.add_argument('--k', type=int, default=5)
+    bench.add_argument('--queries', type=int, default=200)
+    enc = sub.add_parser('encodings', help='Memory and recall@k of each vector encoding')
+    source = enc.add_mutually_exclusive_group(required=True)
+    source.add_argument('--report', help='Use the vectors of this report index')
+    source.add_argument('--synthetic', type=int, help='Use this many synthetic clustered vectors')
+    enc.add_argument('--kind', choices=['flat', 'ivf', 'hnsw'], default='flat')
+    enc.add_argument('--k', type=int, default=5)
+    enc.add_argument('--queries', type=int, default=200)
+    conv = sub.add_parser('convert', help="Set a report's index settings and rebuild its index")
+    conv.add_argument('report')
+    conv.add_argument('--encoding', choices=ENCODINGS)
+    conv.add_argument('--kind', choices=['auto', 'flat', 'ivf', 'hnsw'])
+    conv.add_argument('--rerank', action=argparse.BooleanOptionalAction, default=None,
+                      help='Keep exact vectors and re-rank quantized search results')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        settings = {name: getattr(args, name) for name in ('encoding', 'kind', 'rerank')
+                    if getattr(args, name) is not None}
+        try:
+            print(json.dumps(convert_report(args.report, **settings), indent=2))
+        except FileNotFoundError as e:
+            safe_print_err(str(e))
+            return 1
+        return 0
+
+    vectors = _load_vectors(args, parser)
+    if args.command == 'encodings':
+        print(json.dumps(compare_encodings(vectors, args.kind, args.k, args.queries), indent=2))
+    else:
+        print(json.dumps(benchmark(vectors, args.k, args.queries), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,17 +2,55 @@
 """
 Simple ingestion script for local FAISS index.
 Reads JSON from stdin: {"text": "...", "reportName": "..."
-Splits text into chunks, embeds with sentence-transformers, stores FAISS index and metadata.
+Splits text into chunks, embeds with sentence-transformers, stores FAISS index and
+chunk texts (chunk_store.py; legacy <report>_meta.json files are migrated on first ingest).
+Chunks are content-addressed: re-ingesting a report only embeds chunks whose text
+is new, and (unless "mode": "append") removes chunks missing from the new version.
+New chunks are looked up in the cross-report embedding cache (embedding_cache.py)
+before the model is called.
+With "chunker": "structured" whole paragraphs are packed into chunks instead
+of fixed windows (structured_chunker.py); pass the "blocks" from
+pdf_process.py --structure to chunk along the PDF's own paragraphs and record
+each chunk's pages. KILIK_CHUNKER sets the default chunker.
 Only the final JSON result is printed to stdout. All logs/errors go to stderr.
+If KILIK_WORKER_ADDRESS is set the request is forwarded to the resident worker
+(worker.py) instead of loading the model in this process.
+
+Streaming mode reads raw text (or NDJSON pages with --format ndjson) from stdin
+and embeds it in batches with bounded memory (see stream_ingest.py):
+    python ingest_pdf.py --stream --report <reportName> [--format ndjson] [--resume]
+
+Chunks are accepted or rejected by chunk_validation.py; after changing its
+rules run `npm run check:chunk-validation` (check_chunk_validation.py), which
+fails unless every decision matches the original per-character rules.
 """
+import argparse
 import sys
 import os
 import json
+import hashlib
+import threading
 import traceback
-from sentence_transformers import SentenceTransformer
 import faiss
 import numpy as np
 
+from chunk_store import ChunkStore
+from chunk_validation import validate_chunks
+import chunk_store
+from embeddings import MODEL_NAME, get_model
+import embedding_cache
+import exact_vectors
+import index_policy
+import query_cache
+import worker_client
+
+CHUNKERS = ('fixed', 'structured')
+CHUNKER = os.environ.get('KILIK_CHUNKER', 'fixed')
+
+# Serializes ingests of the same report inside one (worker) process
+_report_locks = {}
+_report_locks_guard = threading.Lock()
+
 
 def chunk_text(text, chunk_size=1000, overlap=200):
     chunks = []
@@ -28,196 +66,381 @@ def chunk_text(text, chunk_size=1000, overlap=200):
     return chunks
 
 
+def chunk_document(text, blocks=None, chunker=None):
+    """Chunks of text: fixed windows, or paragraphs packed by structured_chunker"""
+    if (chunker or CHUNKER) == 'structured':
+        import structured_chunker
+        return structured_chunker.chunk_structured(text, blocks)
+    return chunk_text(text)
+
+
 def safe_print_err(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
 
-def main():
+def report_lock(report):
+    with _report_locks_guard:
+        lock = _report_locks.get(report)
+        if lock is None:
+            lock = _report_locks[report] = threading.Lock()
+        return lock
+
+
+def write_index_atomic(index, index_path):
+    """Write the index beside its final path and swap it in so readers never see a partial file"""
+    tmp_path = f"{index_path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, index_path)
+
+
+def chunk_hash(text):
+    """Content address of a chunk: SHA-256 of the stripped text that gets embedded"""
+    return hashlib.sha256(text.strip().encode('utf-8')).hexdigest()
+
+
+def load_id_index(index_path):
+    """
+    Read a report index whose vectors are addressed by chunk id (IndexIDMap2, or
+    IVF which keeps ids itself). Indexes written before ids were explicit are
+    converted (id = position). Returns None if there is no readable index.
+    """
+    if not os.path.exists(index_path):
+        return None
     try:
-        try:
-            data = json.load(sys.stdin)
-        except Exception as e:
-            safe_print_err('Failed to read JSON from stdin:', str(e))
-            raise
+        index = faiss.read_index(index_path)
+    except Exception:
+        safe_print_err('Failed reading existing index, creating new one')
+        return None
+    if isinstance(index, (faiss.IndexIDMap2, faiss.IndexIVF)):
+        return index
+    if not index.ntotal:
+        return index_policy.new_index(index.d)
+    vectors = index_policy.normalize(index.reconstruct_n(0, index.ntotal))
+    return index_policy.build_index('flat', np.arange(index.ntotal, dtype='int64'), vectors)
 
-        text = data.get("text", "")
-        report = data.get("reportName", "report")
-        if not text:
-            safe_print_err('No text provided in input')
-            print(json.dumps({"error": "no text provided"}))
-            sys.exit(1)
-
-        chunks = chunk_text(text)
-        if len(chunks) == 0:
-            safe_print_err('Chunking produced 0 chunks')
-            print(json.dumps({"error": "no chunks created"}))
-            sys.exit(1)
-
-        # Load embedding model
-        safe_print_err('Loading embedding model...', flush=True)
-        try:
-            model = SentenceTransformer('all-MiniLM-L6-v2')
-        except Exception as e:
-            safe_print_err('Failed to load embedding model:', str(e))
-            safe_print_err(traceback.format_exc())
-            sys.exit(2)
-
-        # Filter and validate chunks before embedding
-        valid_chunks = []
-        valid_texts = []
-        
-        for i, chunk in enumerate(chunks):
-            text = chunk['text']
-            
-            # Skip if not a string
-            if not isinstance(text, str):
-                safe_print_err(f'Skipping chunk {i}: not a string (type: {type(text)})')
-                continue
-                
-            # Skip if empty or too short
-            if not text.strip() or len(text.strip()) < 10:
-                safe_print_err(f'Skipping chunk {i}: too short or empty (len={len(text.strip())})')
-                continue
-            
-            # Check for binary/PDF content patterns
-            if any(pattern in text for pattern in ['%PDF-', 'obj\n<<', 'endobj', '/Type ', '/Length ']):
-                safe_print_err(f'Skipping chunk {i}: contains PDF structure')
-                continue
-                
-            # Check for excessive binary content (null bytes, control chars)
-            binary_chars = sum(1 for c in text if ord(c) < 32 and c not in '\n\r\t ')
-            if binary_chars > len(text) * 0.1:  # More than 10% binary chars
-                safe_print_err(f'Skipping chunk {i}: too many binary characters ({binary_chars}/{len(text)})')
-                continue
-            
-            # Check for reasonable text ratio
-            printable_chars = sum(1 for c in text if c.isprintable() or c in '\n\r\t')
-            if printable_chars < len(text) * 0.8:  # Less than 80% printable
-                safe_print_err(f'Skipping chunk {i}: insufficient printable characters ({printable_chars}/{len(text)})')
-                continue
-                
-            # Check for meaningful alphanumeric content
-            alnum_chars = sum(1 for c in text if c.isalnum())
-            if alnum_chars < 20:  # At least 20 alphanumeric characters
-                safe_print_err(f'Skipping chunk {i}: insufficient alphanumeric content ({alnum_chars})')
-                continue
-            
-            # Additional validation: ensure text can be encoded/decoded properly
-            try:
-                text.encode('utf-8').decode('utf-8')
-            except UnicodeError:
-                safe_print_err(f'Skipping chunk {i}: unicode encoding issues')
-                continue
-            
-            # If we made it here, the chunk is valid
-            valid_chunks.append(chunk)
-            valid_texts.append(text.strip())
-        
-        if len(valid_texts) == 0:
-            safe_print_err('No valid chunks found after filtering')
-            print(json.dumps({"error": "no valid chunks after filtering"}))
-            sys.exit(1)
-        
-        safe_print_err(f'Computing embeddings for {len(valid_texts)} valid chunks (filtered from {len(chunks)} total)...')
-        
-        # Final safety check: ensure all texts are strings and clean them
-        cleaned_texts = []
-        for i, text in enumerate(valid_texts):
-            if not isinstance(text, str):
-                safe_print_err(f'Warning: text {i} is not a string, converting')
-                text = str(text)
-            
-            # Clean the text to ensure it's safe for tokenization
-            text = text.strip()
-            if not text:
-                safe_print_err(f'Warning: text {i} became empty after cleaning, skipping')
-                continue
-                
-            cleaned_texts.append(text)
-        
-        if len(cleaned_texts) == 0:
-            safe_print_err('No texts remaining after final cleaning')
-            print(json.dumps({"error": "no texts after final cleaning"}))
-            sys.exit(1)
-        
-        # Update valid_chunks to match cleaned_texts
-        valid_chunks = valid_chunks[:len(cleaned_texts)]
-        
+
+def open_chunk_store(report, out_dir):
+    """Chunk store of a report; reports ingested before the store existed are migrated first"""
+    if not chunk_store.exists(report, out_dir) and os.path.exists(chunk_store.legacy_meta_path(report, out_dir)):
         try:
-            embeddings = model.encode(cleaned_texts, show_progress_bar=False, convert_to_numpy=True)
-            embeddings = np.array(embeddings, dtype='float32')
+            migrated = chunk_store.migrate_report(report, out_dir)
+            safe_print_err(f'Migrated {migrated} chunks from legacy meta file')
         except Exception as e:
-            safe_print_err('Embedding computation failed:', str(e))
-            safe_print_err(traceback.format_exc())
-            # Debug: print first few problematic texts
-            safe_print_err('First few texts that failed:')
-            for i, text in enumerate(cleaned_texts[:5]):
-                safe_print_err(f'  [{i}]: {repr(text[:100])}...')
-            sys.exit(3)
-
-        if embeddings.ndim != 2:
-            safe_print_err('Embeddings have unexpected shape:', embeddings.shape)
-            sys.exit(4)
+            safe_print_err('Failed to migrate existing meta file, starting fresh:', str(e))
+    return ChunkStore(report, out_dir)
+
+
+def existing_chunk_hashes(index, store, pending_ids=()):
+    """
+    Map chunk hash -> {"id", "start", "end", "page", "page_end"} for every chunk present in both the index and the store.
+    Also returns ids to drop: duplicates of an already seen hash, and ids present in only one
+    of the two (left behind by an interrupted ingest). `pending_ids` are embedded chunks not
+    yet added to the index (a resumable streaming ingest) and count as present.
+    """
+    index_ids = set(index_policy.index_ids(index).tolist()) if index is not None else set()
+    index_ids.update(pending_ids)
+    by_hash = {}
+    drop = []
+    for chunk_id in store.live_ids().tolist():
+        if chunk_id not in index_ids:
+            drop.append(chunk_id)
+            continue
+        index_ids.discard(chunk_id)
+        chunk = store.get(chunk_id)
+        h = chunk_hash(chunk["text"])
+        if h in by_hash:
+            drop.append(chunk_id)
+        else:
+            by_hash[h] = {"id": chunk["id"], "start": chunk["start"], "end": chunk["end"],
+                          "page": chunk.get("page"), "page_end": chunk.get("page_end")}
+    # Vectors whose chunk text was never written
+    drop.extend(index_ids.difference(pending_ids))
+    return by_hash, drop
+
+
+def plan_ingest(hashes, chunks, existing, replace=True):
+    """
+    Decide what to do with each chunk of the new document version.
+    Returns {"new": positions to embed, "skipped": count already indexed (or repeated),
+             "moved": [(id, position)] whose offsets or pages changed, "stale": ids to remove}.
+    """
+    new, moved = [], []
+    skipped = 0
+    seen = set()
+    for i, h in enumerate(hashes):
+        if h in seen:
+            skipped += 1
+            continue
+        seen.add(h)
+        chunk = existing.get(h)
+        if chunk is None:
+            new.append(i)
+            continue
+        skipped += 1
+        if _span(chunk) != _span(chunks[i]):
+            moved.append((chunk["id"], i))
+    stale = [c["id"] for h, c in existing.items() if h not in seen] if replace else []
+    return {"new": new, "skipped": skipped, "moved": moved, "stale": stale}
+
+
+def _span(chunk):
+    return chunk["start"], chunk["end"], chunk.get("page"), chunk.get("page_end")
+
+
+class ModelLoadError(Exception):
+    pass
+
+
+def load_model():
+    # Load embedding model (cached for the lifetime of the process)
+    safe_print_err('Loading embedding model...', flush=True)
+    try:
+        return get_model()
+    except Exception as e:
+        raise ModelLoadError(str(e)) from e
+
+
+def embed_texts(texts, cache_stats=None):
+    """
+    Returns (float32 embeddings, None) or (None, (error_result, exit_code)).
+    Cache hits/misses are added to `cache_stats` when given.
+    """
+    try:
+        if embedding_cache.enabled():
+            embeddings, stats = embedding_cache.get_cache(MODEL_NAME).encode(texts, load_model)
+            if cache_stats is not None:
+                for name, count in stats.items():
+                    cache_stats[name] = cache_stats.get(name, 0) + count
+        else:
+            embeddings = load_model().encode(texts, show_progress_bar=False, convert_to_numpy=True)
+        embeddings = np.array(embeddings, dtype='float32')
+    except ModelLoadError as e:
+        safe_print_err('Failed to load embedding model:', str(e))
+        safe_print_err(traceback.format_exc())
+        return None, ({"error": "model_load_failed", "detail": str(e)}, 2)
+    except Exception as e:
+        safe_print_err('Embedding computation failed:', str(e))
+        safe_print_err(traceback.format_exc())
+        # Debug: print first few problematic texts
+        safe_print_err('First few texts that failed:')
+        for i, text in enumerate(texts[:5]):
+            safe_print_err(f'  [{i}]: {repr(text[:100])}...')
+        return None, ({"error": "embedding_failed", "detail": str(e)}, 3)
+
+    if embeddings.ndim != 2:
+        safe_print_err('Embeddings have unexpected shape:', embeddings.shape)
+        return None, ({"error": "bad_embedding_shape", "detail": str(embeddings.shape)}, 4)
+    # Unit vectors: L2 search then ranks by cosine similarity (index_policy.py)
+    return index_policy.normalize(embeddings), None
+
 
+def run_ingest(data):
+    """
+    Ingest one {"text": ..., "reportName": ..., "mode": "replace" | "append",
+    "chunker": "fixed" | "structured", "blocks": [[start, end, page], ...]} request.
+    Returns (result, exit_code); on failure result carries an "error" key.
+    """
+    text = data.get("text", "")
+    report = data.get("reportName", "report")
+    replace = data.get("mode", "replace") != "append"
+    chunker = data.get("chunker") or CHUNKER
+    if not text:
+        safe_print_err('No text provided in input')
+        return {"error": "no text provided"}, 1
+    if chunker not in CHUNKERS:
+        return {"error": "unknown_chunker", "detail": f"chunker must be one of {', '.join(CHUNKERS)}"}, 1
+
+    with report_lock(report):
+        return ingest_text(text, report, replace, data.get("blocks"), chunker)
+
+
+def ingest_text(text, report, replace=True, blocks=None, chunker=None):
+    """
+    Chunk `text` and bring the report's index and chunk store in line with it.
+    Only chunks whose content hash is not indexed yet are embedded; with `replace`
+    the report's chunks that no longer occur in `text` are removed.
+    """
+    chunks = chunk_document(text, blocks, chunker)
+    if len(chunks) == 0:
+        safe_print_err('Chunking produced 0 chunks')
+        return {"error": "no chunks created"}, 1
+
+    # Filter and validate all chunks in one vectorized pass before embedding
+    reasons = validate_chunks([chunk['text'] for chunk in chunks])
+    valid_chunks = []
+    cleaned_texts = []
+    rejected = {}
+    for i, (chunk, reason) in enumerate(zip(chunks, reasons)):
+        if reason is not None:
+            safe_print_err(f'Skipping chunk {i}: {reason}')
+            rejected[reason] = rejected.get(reason, 0) + 1
+            continue
+        valid_chunks.append(chunk)
+        # Accepted chunks have at least 10 characters left after stripping
+        cleaned_texts.append(chunk['text'].strip())
+
+    if len(cleaned_texts) == 0:
+        safe_print_err('No valid chunks found after filtering')
+        return {"error": "no valid chunks after filtering", "rejected": rejected}, 1
+
+    safe_print_err(f'{len(cleaned_texts)} valid chunks (filtered from {len(chunks)} total)')
+
+    hashes = [chunk_hash(t) for t in cleaned_texts]
+
+    out_dir = chunk_store.INDEX_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    index_path = os.path.join(out_dir, f"{report}.index")
+    store = open_chunk_store(report, out_dir)
+    # A full ingest supersedes any interrupted streaming ingest of this report
+    import stream_ingest
+    stream_ingest.discard_staging(report, out_dir)
+
+    policy = index_policy.Policy.for_report(report)
+    exact = exact_vectors.ExactVectors(report, out_dir) if policy.rerank else None
+
+    # Load or create index
+    try:
+        index = load_id_index(index_path)
+        existing, drop = existing_chunk_hashes(index, store)
+        if exact is not None and index is not None:
+            index_policy.backfill_exact(index, exact)
+    except Exception as e:
+        safe_print_err('FAISS index operation failed:', str(e))
+        safe_print_err(traceback.format_exc())
+        return {"error": "faiss_index_failed", "detail": str(e)}, 5
+
+    plan = plan_ingest(hashes, valid_chunks, existing, replace)
+    safe_print_err(f'{len(plan["new"])} new chunks, {plan["skipped"]} already indexed, {len(plan["stale"])} stale')
+
+    embeddings = None
+    cache_stats = {"hits": 0, "misses": 0}
+    if plan["new"]:
+        safe_print_err(f'Computing embeddings for {len(plan["new"])} chunks...')
+        embeddings, error = embed_texts([cleaned_texts[i] for i in plan["new"]], cache_stats)
+        if error:
+            return error
         dim = embeddings.shape[1]
+        if index is not None and index.d != dim:
+            safe_print_err(f'Existing index dim {index.d} != embedding dim {dim}, recreating index')
+            if index.ntotal:
+                # Nothing indexed so far is comparable with the new model: embed everything
+                drop = drop + [c["id"] for c in existing.values()]
+                plan = plan_ingest(hashes, valid_chunks, {}, replace)
+                embeddings, error = embed_texts([cleaned_texts[i] for i in plan["new"]], cache_stats)
+                if error:
+                    return error
+            index = None
+            if exact is not None and os.path.exists(exact.path):
+                os.remove(exact.path)
+        if index is None:
+            index = index_policy.new_index(dim)
+    if drop:
+        safe_print_err(f'Dropping {len(drop)} duplicate or orphaned chunk ids')
 
-        out_dir = os.path.join(os.path.dirname(__file__), 'faiss_indices')
-        os.makedirs(out_dir, exist_ok=True)
-        index_path = os.path.join(out_dir, f"{report}.index")
-        meta_path = os.path.join(out_dir, f"{report}_meta.json")
+    # Append only the new chunks; their store rows become their FAISS ids
+    try:
+        new_ids = store.append([valid_chunks[i] for i in plan["new"]]) if plan["new"] else []
+        if plan["moved"]:
+            ids, spans = zip(*plan["moved"])
+            store.set_spans(ids, [valid_chunks[i]['start'] for i in spans], [valid_chunks[i]['end'] for i in spans],
+                            [(valid_chunks[i].get('page'), valid_chunks[i].get('page_end')) for i in spans])
+    except Exception as e:
+        safe_print_err('Failed to write chunk store:', str(e))
+        safe_print_err(traceback.format_exc())
+        return {"error": "meta_write_failed", "detail": str(e)}, 6
 
-        # Load or create index
-        try:
-            if os.path.exists(index_path):
-                try:
-                    index = faiss.read_index(index_path)
-                    existing_count = index.ntotal
-                    # if dim mismatch, recreate
-                    if index.d != dim:
-                        safe_print_err(f'Existing index dim {index.d} != embedding dim {dim}, recreating index')
-                        index = faiss.IndexFlatL2(dim)
-                        existing_count = 0
-                except Exception:
-                    safe_print_err('Failed reading existing index, creating new one')
-                    index = faiss.IndexFlatL2(dim)
-                    existing_count = 0
-            else:
-                index = faiss.IndexFlatL2(dim)
-                existing_count = 0
-
-            index.add(embeddings)
-            faiss.write_index(index, index_path)
-        except Exception as e:
-            safe_print_err('FAISS index operation failed:', str(e))
-            safe_print_err(traceback.format_exc())
-            sys.exit(5)
-
-        # Update metadata file with only valid chunks
-        meta = []
-        if os.path.exists(meta_path):
-            try:
-                with open(meta_path, 'r', encoding='utf-8') as f:
-                    meta = json.load(f)
-            except Exception:
-                safe_print_err('Failed to load existing meta file, starting fresh')
-                meta = []
-
-        for i, c in enumerate(valid_chunks):
-            meta.append({"id": existing_count + i, "text": c['text'], "start": c['start'], "end": c['end']})
+    # Chunks are written before the index so readers never see ids without text
+    removed = plan["stale"] + drop
+    changed = bool(new_ids or removed)
+    try:
+        if new_ids:
+            if exact is not None:
+                exact.write(new_ids, embeddings)
+            index = index_policy.add_vectors(index, embeddings, np.asarray(new_ids, dtype='int64'), policy)
+        if removed:
+            index = index_policy.remove_vectors(index, removed, policy, exact)
+        if index is not None:
+            # Switch index type / encoding as the report crosses the policy's size thresholds
+            before = index_policy.describe(index)
+            index = index_policy.apply(index, policy, exact)
+            changed = changed or index_policy.describe(index) != before
+        if changed:
+            write_index_atomic(index, index_path)
+    except Exception as e:
+        safe_print_err('FAISS index operation failed:', str(e))
+        safe_print_err(traceback.format_exc())
+        return {"error": "faiss_index_failed", "detail": str(e)}, 5
+
+    try:
+        store.delete(removed)
+        store.close()
+    except Exception as e:
+        safe_print_err('Failed to mark stale chunks in chunk store:', str(e))
+
+    # Cached retrievals/summaries for this report refer to the old index
+    if changed:
+        query_cache.invalidate_report(report)
+
+    result = {"added": len(new_ids), "skipped": plan["skipped"], "removed": len(plan["stale"]),
+              "rejected": rejected, "total": index.ntotal if index is not None else 0,
+              "index_path": index_path, "chunks_path": store.table_path}
+    lookups = cache_stats["hits"] + cache_stats["misses"]
+    result["embedding_cache"] = dict(cache_stats, hit_ratio=round(cache_stats["hits"] / lookups, 4) if lookups else 0.0)
+    return result, 0
+
+
+def run_stream(args):
+    """Streaming ingest of stdin; runs in this process (stdin cannot be forwarded to the worker)"""
+    import stream_ingest
+    if args.format == 'ndjson':
+        pieces = stream_ingest.read_ndjson_pages(sys.stdin)
+    else:
+        pieces = stream_ingest.read_raw_text(sys.stdin)
+    with report_lock(args.report):
+        return stream_ingest.stream_ingest(pieces, args.report, replace=args.mode != 'append',
+                                           batch_size=max(1, args.batch_size), resume=args.resume)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Ingest report text into its FAISS index')
+    parser.add_argument('--stream', action='store_true', help='Read the document from stdin incrementally')
+    parser.add_argument('--report', help='Report name (streaming mode)')
+    parser.add_argument('--format', choices=['text', 'ndjson'], default='text',
+                        help='Raw text, or one {"page", "text"} JSON object per line')
+    parser.add_argument('--batch-size', type=int, default=256, help='Chunks embedded per batch')
+    parser.add_argument('--mode', choices=['replace', 'append'], default='replace')
+    parser.add_argument('--resume', action='store_true', help='Continue from the last checkpoint')
+    args = parser.parse_args(argv)
+    if args.stream and not args.report:
+        parser.error('--stream requires --report')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    try:
+        if args.stream:
+            result, code = run_stream(args)
+            sys.stdout.write(json.dumps(result))
+            sys.stdout.flush()
+            return code
 
         try:
-            with open(meta_path, 'w', encoding='utf-8') as f:
-                json.dump(meta, f, ensure_ascii=False, indent=2)
+            data = json.load(sys.stdin)
         except Exception as e:
-            safe_print_err('Failed to write meta file:', str(e))
-            safe_print_err(traceback.format_exc())
-            sys.exit(6)
+            safe_print_err('Failed to read JSON from stdin:', str(e))
+            raise
+
+        forwarded = worker_client.forward('ingest', data)
+        if forwarded is not None:
+            result, code = forwarded
+        else:
+            result, code = run_ingest(data)
 
         # Print final JSON result to stdout ONLY
-        result = {"added": len(valid_chunks), "total": index.ntotal, "index_path": index_path, "meta_path": meta_path}
         sys.stdout.write(json.dumps(result))
         sys.stdout.flush()
-        return 0
+        return code
 
     except SystemExit as se:
         # allow sys.exit codes propagated
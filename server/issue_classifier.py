@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Keyword classifier shared by text_summarizer.py and simple_summarizer.py.
+Decides whether a sentence describes an issue and whether it is major or minor.
+
+All issue, major and minor keywords are compiled into one regex (a prefix
+trie, so matching does not slow down keyword by keyword), and each
+sentence is lowercased once and scanned in a single pass. Keywords match
+whole words with their common inflections (see inflections): "repair" finds
+"repairs", "repaired" and "repairing", but "lead" does not match "mislead"
+and "fix" does not match "fixture". The words of a phrase may be separated
+by any whitespace.
+
+Both summarizers' results differ from their previous matching.
+simple_summarizer.py searched substrings, so it no longer counts keywords
+inside longer words; text_summarizer.py matched exact whole words, so it now
+also finds plurals and past tenses. "Repairs needed." is an issue for both.
+`benchmark` reports how many sentences change.
+
+The match is a lookahead at each word start, so overlapping keywords are
+all found: "water damage" counts as both major ("water damage") and an issue
+("damage"). At one word start the regex reports only the longest keyword, so
+the classes of shorter keywords matching there too are merged into it when
+compiling. No keyword in the shipped lists is a whole-word prefix of another,
+so this only matters for override lists: if one added, say, "water" as a
+minor keyword, a "water damage" match would count as minor too.
+
+Keywords come from issue_keywords.json next to this file. Point
+KILIK_ISSUE_KEYWORDS at another JSON file to override any of its
+"issue" / "major" / "minor" lists.
+
+Throughput against the previous per-keyword matching:
+    python issue_classifier.py benchmark [report.txt] [--sentences 100000]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+KEYWORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'issue_keywords.json')
+CLASSES = ("issue", "major", "minor")
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+WORD_CHAR = re.compile(r'\w')
+# Generated inflections that are nearly always another word ("leading to", trim
+# "molding"); they still match when a keyword list names them
+NOT_INFLECTED = frozenset({"leading", "leads", "molding", "moldings"})
+
+
+def load_keywords(path=None):
+    """{"issue": [...], "major": [...], "minor": [...]}, defaults overridden by KILIK_ISSUE_KEYWORDS"""
+    with open(KEYWORDS_PATH, 'r', encoding='utf-8') as f:
+        keywords = json.load(f)
+    path = path or os.environ.get('KILIK_ISSUE_KEYWORDS')
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            overrides = json.load(f)
+        unknown = set(overrides) - set(CLASSES)
+        if unknown:
+            raise ValueError(f"Unknown keyword lists in {path}: {', '.join(sorted(unknown))}")
+        keywords.update(overrides)
+    return {name: [" ".join(word.lower().split()) for word in keywords.get(name, []) if word.strip()]
+            for name in CLASSES}
+
+
+def trie_regex(words):
+    """
+    Alternation of words factored into a prefix trie ("mi(?:nor|nimal|ssing)"),
+    so the regex engine tests each character once instead of every keyword in
+    turn. Longer words are tried first; spaces match any whitespace.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [(r'\s+' if ch == ' ' else re.escape(ch)) + build(child)
+                    for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            return '(?:' + body + ')?'
+        return body
+    return build(trie)
+
+
+def inflections(word):
+    """
+    word with the plural, past and -ing endings of its last word ("repairs",
+    "noted", "fixes", "replacing"); forms that are not English are harmless,
+    since they never occur in a report
+    """
+    forms = {word}
+    if not WORD_CHAR.match(word[-1]):
+        return forms
+    stem = word[:-1] if word.endswith('e') else word
+    forms.update((word + 's', word + ('d' if word.endswith('e') else 'ed'), stem + 'ing'))
+    if word.endswith(('s', 'x', 'z', 'ch', 'sh')):
+        forms.add(word + 'es')
+    return forms
+
+
+def keyword_forms(keywords):
+    """{form: set of classes} for every keyword and its inflections, less NOT_INFLECTED"""
+    forms = {}
+    for name in CLASSES:
+        for word in keywords.get(name, []):
+            for form in inflections(word):
+                if form == word or form not in NOT_INFLECTED:
+                    forms.setdefault(form, set()).add(name)
+    return forms
+
+
+def boundary_prefixes(word, words):
+    """
+    Words that are a prefix of word ending at a word boundary, e.g. "water"
+    of "water damage" if "water" were a keyword (the shipped lists have none)
+    """
+    return [word[:i] for i in range(1, len(word))
+            if word[:i] in words and bool(WORD_CHAR.match(word[i - 1])) != bool(WORD_CHAR.match(word[i]))]
+
+
+class IssueClassifier:
+    def __init__(self, keywords):
+        classes = keyword_forms(keywords)
+        # Where a keyword matches, so do its boundary prefixes; the regex only reports the longest
+        self.classes = {word: frozenset(names.union(*(classes[p] for p in boundary_prefixes(word, classes))))
+                        for word, names in classes.items()}
+        self.pattern = re.compile(r'\b(?=(' + trie_regex(self.classes) + r')\b)') if self.classes else None
+
+    def classify(self, sentence):
+        """Set of classes ("issue", "major", "minor") whose keywords occur in the sentence"""
+        found = set()
+        if self.pattern is None:
+            return found
+        for m in self.pattern.finditer(sentence.lower()):
+            found |= self.classes[" ".join(m.group(1).split())]
+            if len(found) == len(CLASSES):
+                break
+        return found
+
+    def severity(self, sentence):
+        """"Major" or "Minor" for an issue sentence, None if it does not describe an issue"""
+        found = self.classify(sentence)
+        if "issue" not in found:
+            return None
+        return "Major" if "major" in found else "Minor"
+
+
+_classifier = None
+
+
+def get_classifier():
+    """Classifier for the configured keywords, compiled once per process"""
+    global _classifier
+    if _classifier is None:
+        _classifier = IssueClassifier(load_keywords())
+    return _classifier
+
+
+# -- benchmark ----------------------------------------------------------
+
+
+def _legacy_simple(sentence, keywords):
+    """simple_summarizer's previous matching: substring search, lowercasing per keyword"""
+    if not any(word in sentence.lower() for word in keywords["issue"]):
+        return None
+    return "Major" if any(word in sentence.lower() for word in keywords["major"]) else "Minor"
+
+
+def _legacy_patterns(keywords):
+    """text_summarizer's previous matching: three case-insensitive regexes per sentence"""
+    patterns = [re.compile(r'\b(?:' + '|'.join(keywords[name]) + r')\b', re.IGNORECASE) for name in CLASSES]
+
+    def severity(sentence):
+        if not patterns[0].search(sentence):
+            return None
+        if patterns[1].search(sentence):
+            return "Major"
+        patterns[2].search(sentence)
+        return "Minor"
+    return severity
+
+
+def _per_keyword(keywords):
+    """Whole-word search for every keyword form on its own: the classes the classifier must find"""
+    patterns = [(name, re.compile(r'\b' + r'\s+'.join(map(re.escape, form.split())) + r'\b'))
+                for form, names in keyword_forms(keywords).items() for name in names]
+
+    def classify(sentence):
+        lowered = sentence.lower()
+        return {name for name, pattern in patterns if pattern.search(lowered)}
+    return classify
+
+
+def _synthetic_sentences(count, seed=0):
+    rng = random.Random(seed)
+    filler = ("the roof gutter flashing was inspected and the timber frame subfloor footing switchboard "
+              "downpipe window door wall ceiling area appears in a condition consistent with age and "
+              "misleading fixture noted reasonable").split()
+    keywords = load_keywords()
+    # Keywords and their inflections ("repairs", "noted")
+    terms = sorted(keyword_forms(keywords))
+    sentences = []
+    for _ in range(count):
+        words = [rng.choice(filler) for _ in range(rng.randint(8, 24))]
+        for _ in range(rng.choice((0, 0, 1, 1, 2, 3))):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(terms))
+        sentences.append(" ".join(words).capitalize() + ".")
+    return sentences
+
+
+def benchmark(text=None, sentences=100000):
+    """Sentences/second of the previous matchers and the shared classifier on the same sentences"""
+    if text:
+        items = [s.strip() for s in SENTENCE_END.split(text) if len(s.strip()) >= 10]
+    else:
+        items = _synthetic_sentences(sentences)
+    keywords = load_keywords()
+    classifier = get_classifier()
+    legacy_patterns = _legacy_patterns(keywords)
+    report = {"sentences": len(items), "chars": sum(len(s) for s in items)}
+    results = {}
+    for name, fn in (("simple_substring", lambda s: _legacy_simple(s, keywords)),
+                     ("text_regex", legacy_patterns),
+                     ("classifier", classifier.severity)):
+        started = time.perf_counter()
+        results[name] = [fn(s) for s in items]
+        elapsed = time.perf_counter() - started
+        report[name] = {"seconds": round(elapsed, 3),
+                        "sentences_per_s": round(len(items) / elapsed) if elapsed else None,
+                        "issues": sum(r is not None for r in results[name])}
+    per_keyword = _per_keyword(keywords)
+    report["agrees_with_per_keyword"] = all(classifier.classify(s) == per_keyword(s) for s in items)
+    # Results that changed for each summarizer (whole words plus inflections, see the module docstring)
+    for name in ("simple_substring", "text_regex"):
+        report["differs_from_" + name] = sum(a != b for a, b in zip(results["classifier"], results[name]))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Issue keyword classifier tools')
+    sub = parser.add_subparsers(dest='command', required=True)
+    bench = sub.add_parser('benchmark', help='Throughput against the previous keyword matching')
+    bench.add_argument('file', nargs='?', help='Report text to split into sentences (default: synthetic)')
+    bench.add_argument('--sentences', type=int, default=100000, help='Synthetic sentence count')
+    args = parser.parse_args()
+    if args.command == 'benchmark':
+        text = None
+        if args.file:
+            with open(args.file, 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read()
+        print(json.dumps(benchmark(text, args.sentences), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Shared client for the OpenAI-compatible chat completions endpoint (DeepInfra).
+One process-wide requests.Session keeps connections alive between calls, a
+semaphore caps concurrent requests, and 429/5xx responses or connection
+errors are retried with exponential backoff and full jitter (Retry-After is
+honoured). `chat(..., on_token=fn)` streams the completion (server-sent
+events) and calls fn with each text delta as it arrives.
+
+Configuration:
+    DEEPINFRA_API_KEY        API key (required unless api_key is passed)
+    DEEPINFRA_BASE_URL       https://api.deepinfra.com/v1/openai
+    KILIK_LLM_CONCURRENCY    concurrent requests per process (4)
+    KILIK_LLM_TIMEOUT        seconds to connect / between streamed bytes (60)
+    KILIK_LLM_RETRIES        retries after the first attempt (3)
+
+Self-test against a local stand-in server (no network needed):
+    python llm_client.py selftest
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_BASE_URL = "https://api.deepinfra.com/v1/openai"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+
+
+def safe_print_err(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMClient:
+    def __init__(self, base_url=None, api_key=None, max_concurrency=None, timeout=None, max_retries=None):
+        self.base_url = (base_url or os.environ.get('DEEPINFRA_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+        self.api_key = api_key or os.environ.get('DEEPINFRA_API_KEY')
+        if not self.api_key:
+            raise LLMError("DeepInfra API key not configured: set DEEPINFRA_API_KEY")
+        self.max_concurrency = max_concurrency or int(os.environ.get('KILIK_LLM_CONCURRENCY', '4'))
+        self.timeout = timeout or float(os.environ.get('KILIK_LLM_TIMEOUT', '60'))
+        self.max_retries = int(os.environ.get('KILIK_LLM_RETRIES', '3')) if max_retries is None else max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({"Content-Type": "application/json",
+                                     "Authorization": f"Bearer {self.api_key}"})
+        self.slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.counts = {"requests": 0, "retries": 0, "failures": 0}
+        self._counts_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._counts_lock:
+            self.counts[name] += 1
+
+    def chat(self, model, messages, max_tokens=2000, temperature=0.3, on_token=None):
+        """
+        Run one chat completion; returns (content, error). With on_token the
+        completion is streamed and on_token(text) is called for every delta.
+        """
+        payload = {"model": model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+        if on_token is not None:
+            payload["stream"] = True
+        url = f"{self.base_url}/chat/completions"
+
+        for attempt in range(self.max_retries + 1):
+            streamed = []
+            try:
+                with self.slots:
+                    self._count("requests")
+                    with self.session.post(url, json=payload, timeout=self.timeout,
+                                           stream=on_token is not None) as response:
+                        if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                            delay = self._backoff(attempt, response.headers.get('Retry-After'))
+                            safe_print_err(f'LLM request got {response.status_code}, retrying in {delay:.2f}s')
+                            retry_after = delay
+                        else:
+                            retry_after = None
+                            response.raise_for_status()
+                            if on_token is None:
+                                return _message_content(response.json())
+                            for delta in _iter_sse_deltas(response):
+                                streamed.append(delta)
+                                on_token(delta)
+                            return "".join(streamed), None
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                # Tokens already relayed cannot be taken back, so only retry before the first one
+                if streamed or attempt >= self.max_retries:
+                    self._count("failures")
+                    return None, f"DeepInfra API error: {str(e)}"
+                retry_after = self._backoff(attempt)
+                safe_print_err(f'LLM request failed ({e}), retrying in {retry_after:.2f}s')
+            except requests.exceptions.RequestException as e:
+                self._count("failures")
+                return None, f"DeepInfra API error: {str(e)}"
+            except LLMError as e:
+                self._count("failures")
+                return None, str(e)
+            except Exception as e:
+                self._count("failures")
+                return None, f"Unexpected error: {str(e)}"
+            self._count("retries")
+            time.sleep(retry_after)
+        self._count("failures")
+        return None, "DeepInfra API error: retries exhausted"
+
+    @staticmethod
+    def _backoff(attempt, retry_after=None):
+        """Full-jitter exponential backoff; a server-provided Retry-After wins when it is longer"""
+        delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+        try:
+            return max(delay, min(BACKOFF_CAP, float(retry_after))) if retry_after else delay
+        except ValueError:
+            return delay
+
+    def stats(self):
+        with self._counts_lock:
+            return dict(self.counts, max_concurrency=self.max_concurrency)
+
+
+def _message_content(result):
+    if "choices" in result and len(result["choices"]) > 0:
+        return result["choices"][0]["message"]["content"], None
+    return None, "No response from DeepInfra"
+
+
+def _iter_sse_deltas(response):
+    """Text deltas from an OpenAI-style server-sent event stream"""
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith('data:'):
+            continue
+        data = line[len('data:'):].strip()
+        if data == '[DONE]':
+            return
+        try:
+            event = json.loads(data)
+        except ValueError:
+            raise LLMError(f"DeepInfra API error: bad stream event {data[:100]!r}")
+        if "error" in event:
+            raise LLMError(f"DeepInfra API error: {event['error']}")
+        for choice in event.get("choices", []):
+            text = (choice.get("delta") or {}).get("content")
+            if text:
+                yield text
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Process-wide client (shared connection pool and concurrency limit);
+    raises LLMError when no API key is configured
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
+
+
+# -- stand-in server for tests ----------------------------------------
+
+
+class StandInServer:
+    """
+    Local OpenAI-compatible /chat/completions endpoint. Fails the first
+    `fail_first` requests with `fail_status`, echoes the last user message
+    word by word, and records peak concurrency.
+    """
+
+    def __init__(self, fail_first=0, fail_status=503, delay=0.05, token_delay=0.01):
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.delay = delay
+        self.token_delay = token_delay
+        self.requests = 0
+        self.active = 0
+        self.peak = 0
+        self.connections = set()
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1/openai"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with server._lock:
+                    server.requests += 1
+                    number = server.requests
+                    server.connections.add(self.client_address)
+                    server.active += 1
+                    server.peak = max(server.peak, server.active)
+                try:
+                    time.sleep(server.delay)
+                    if not self.path.endswith('/chat/completions'):
+                        return self._send(404, {"error": "not found"})
+                    if number <= server.fail_first:
+                        return self._send(server.fail_status, {"error": "try again"}, {"Retry-After": "0"})
+                    words = (body.get("messages") or [{}])[-1].get("content", "").split()
+                    reply = " ".join(reversed(words)) or "empty"
+                    if body.get("stream"):
+                        return self._stream(reply)
+                    self._send(200, {"choices": [{"message": {"role": "assistant", "content": reply}}]})
+                finally:
+                    with server._lock:
+                        server.active -= 1
+
+            def _send(self, status, payload, headers=None):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, reply):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                pieces = [w + (" " if i < len(reply.split()) - 1 else "") for i, w in enumerate(reply.split())]
+                events = [{"choices": [{"delta": {"content": p}}]} for p in pieces]
+                for event in [json.dumps(e) for e in events] + ['[DONE]']:
+                    data = f"data: {event}\n\n".encode('utf-8')
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                    time.sleep(server.token_delay)
+                self.wfile.write(b"0\r\n\r\n")
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def selftest():
+    """Exercise pooling, concurrency limit, retries and streaming against StandInServer"""
+    from concurrent.futures import ThreadPoolExecutor
+    checks = {}
+    messages = [{"role": "user", "content": "one two three four five"}]
+
+    with StandInServer() as server:
+        client = LLMClient(base_url=server.base_url, api_key="test", max_concurrency=2, max_retries=0)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            replies = list(pool.map(lambda _: client.chat("m", messages), range(8)))
+        checks["plain_reply"] = all(r == ("five four three two one", None) for r in replies)
+        checks["concurrency_limited"] = server.peak <= 2
+        # Keep-alive: 8 sequential-ish requests over at most 2 pooled connections
+        checks["connections_reused"] = len(server.connections) <= 2
+
+    with StandInServer(fail_first=2, fail_status=429) as server:
+        client = LLMClient(base_url=server.base_url, api_key="test", max_retries=3)
+        reply = client.chat("m", messages)
+        checks["retried_429"] = reply == ("five four three two one", None) and client.counts["retries"] == 2
+
+    with StandInServer(fail_first=5, fail_status=503) as server:
+        client = LLMClient(base_url=server.base_url, api_key="test", max_retries=1)
+        content, error = client.chat("m", messages)
+        checks["gives_up"] = content is None and "503" in (error or "") and server.requests == 2
+
+    with StandInServer(delay=0.0, token_delay=0.05) as server:
+        client = LLMClient(base_url=server.base_url, api_key="test")
+        tokens, first = [], []
+        started = time.perf_counter()
+
+        def on_token(text):
+            if not first:
+                first.append(time.perf_counter() - started)
+            tokens.append(text)
+
+        content, error = client.chat("m", messages, on_token=on_token)
+        total = time.perf_counter() - started
+        checks["streamed"] = error is None and content == "five four three two one" and len(tokens) == 5
+        checks["first_token_early"] = bool(first) and first[0] < total / 2
+
+    saved_key = os.environ.pop('DEEPINFRA_API_KEY', None)
+    try:
+        LLMClient(base_url="http://127.0.0.1:9")
+        checks["requires_api_key"] = False
+    except LLMError:
+        checks["requires_api_key"] = True
+    finally:
+        if saved_key is not None:
+            os.environ['DEEPINFRA_API_KEY'] = saved_key
+
+    ok = all(checks.values())
+    print(json.dumps({"ok": ok, "checks": checks}, indent=2))
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LLM client tools')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('selftest', help='Run the client against a local stand-in server')
+    args = parser.parse_args()
+    if args.command == 'selftest':
+        return selftest()
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
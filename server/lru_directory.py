@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Size-bounded directory of cache files, shared by image_store.py and
+pdf_cache.py. Files are written atomically (temp file + rename), hits bump
+their mtime at most once per TOUCH_INTERVAL, and pruning deletes the least
+recently used files until the directory fits its byte cap.
+
+Pruning walks the whole directory, so it is not done on every write: a
+process walks once on its first write to learn the directory's size, then
+adds the bytes it writes and walks again only when that tracked size crosses
+the cap, or every PRUNE_EVERY writes to pick up what other processes wrote.
+A prune frees the directory down to PRUNE_TARGET of the cap, so a full
+directory is not walked again on the very next write. There is one
+LRUDirectory per root and process (lru_directory), so the tracked size
+outlives the short-lived ImageStore and PDFCache objects.
+
+Temp files (*.tmp.*) may belong to a write in progress in another process,
+so pruning neither counts nor evicts them; it only removes those older than
+STALE_TMP_AGE, left behind by a writer that died.
+"""
+import os
+import sys
+import threading
+import time
+
+# Don't bump mtimes on every hit; LRU order at this granularity is good enough
+TOUCH_INTERVAL = 3600
+# Walk the directory again after this many writes, even under the cap
+PRUNE_EVERY = 256
+# Fraction of the cap a prune frees the directory down to
+PRUNE_TARGET = 0.9
+# Marks temp files in their names; older ones than this were abandoned by their writer
+TMP_MARKER = '.tmp.'
+STALE_TMP_AGE = 3600
+
+
+def safe_print_err(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+class LRUDirectory:
+    def __init__(self, root, max_bytes, label):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.label = label
+        self._lock = threading.Lock()
+        # Bytes under root at the last walk plus those written since; None until the first walk
+        self._size = None
+        self._writes = 0
+
+    def write(self, path, data):
+        """Write bytes to path atomically, pruning when the directory may be over its cap"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}{TMP_MARKER}{os.getpid()}.{threading.get_ident()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._writes += 1
+            if self._size is not None:
+                self._size += len(data)
+            due = self._size is None or self._size > self.max_bytes or self._writes >= PRUNE_EVERY
+        if due:
+            self.prune()
+
+    @staticmethod
+    def touch(path):
+        try:
+            if time.time() - os.stat(path).st_mtime > TOUCH_INTERVAL:
+                os.utime(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def prune(self):
+        """
+        Over max_bytes, delete least recently used files down to PRUNE_TARGET
+        of it, leaving temp files of writes in progress alone; returns the count removed
+        """
+        with self._lock:
+            entries = []
+            total = 0
+            stale_before = time.time() - STALE_TMP_AGE
+            for dirpath, _, filenames in os.walk(self.root):
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    if TMP_MARKER in name:
+                        if st.st_mtime < stale_before:
+                            self.remove(path)
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+                    total += st.st_size
+            removed = 0
+            if total > self.max_bytes:
+                target = self.max_bytes * PRUNE_TARGET
+                for _, size, path in sorted(entries):
+                    if total <= target:
+                        break
+                    try:
+                        os.remove(path)
+                        total -= size
+                        removed += 1
+                    except OSError:
+                        pass
+                safe_print_err(f'{self.label} pruned: {removed} files removed')
+            self._size = total
+            self._writes = 0
+            return removed
+
+
+_directories = {}
+_directories_lock = threading.Lock()
+
+
+def lru_directory(root, max_bytes, label):
+    """The LRUDirectory of this process for root"""
+    with _directories_lock:
+        directory = _directories.get(root)
+        if directory is None:
+            directory = _directories[root] = LRUDirectory(root, max_bytes, label)
+        directory.max_bytes = max_bytes
+        return directory
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Extractive LSA summarizer for summarize_gensim.py that scales to long reports.
+sumy's LsaSummarizer builds a dense, smoothed term x sentence matrix and takes
+its full SVD, so time and memory grow much faster than the document. Here
+sentences become rows of a sparse term-frequency matrix, and a randomized
+truncated SVD keeps only the top topics: KILIK_LSA_COMPONENTS (100), but no
+more than an eighth of the sentences. Sentences are ranked by the norm of
+their row in U x Sigma, which is sumy's rank sqrt(sum(sigma^2 * v^2))
+restricted to those topics. As in sumy, terms are weighted by frequency
+alone: rows are not length-normalized (with unit rows and nearly as many
+topics as sentences every score is about 1) and there is no IDF (which
+would rank sentences of one-off words first). The summary keeps the chosen
+sentences in document order.
+
+A report of more than KILIK_LSA_MAX_SENTENCES (5000) sentences is summarized
+hierarchically: each section of that many sentences is reduced to
+KILIK_LSA_SECTION_SUMMARY (20) sentences, and the section summaries are
+summarized again, repeating until one pass fits under the cap.
+
+Benchmark against the sumy path on synthetic reports:
+    python lsa_summarizer.py benchmark [--words 10000 100000 1000000] [--sumy-max-words 100000]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+COMPONENTS = int(os.environ.get('KILIK_LSA_COMPONENTS', '100'))
+MAX_SENTENCES = int(os.environ.get('KILIK_LSA_MAX_SENTENCES', '5000'))
+SECTION_SUMMARY = int(os.environ.get('KILIK_LSA_SECTION_SUMMARY', '20'))
+# Shorter sentences (headings, table cells) are not summary material
+MIN_SENTENCE_WORDS = 4
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n\s*\n')
+WORD = re.compile(r"\w+")
+
+
+def safe_print_err(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def split_sentences(text):
+    return [s.strip() for s in SENTENCE_END.split(text) if len(WORD.findall(s)) >= MIN_SENTENCE_WORDS]
+
+
+def rank_sentences(sentences, components=None):
+    """LSA score of every sentence: the norm of its row of U x Sigma over the top topics"""
+    import numpy as np
+    from sklearn.decomposition import TruncatedSVD
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    try:
+        # Sublinear term frequency only, like sumy's weighting
+        matrix = TfidfVectorizer(stop_words='english', sublinear_tf=True, use_idf=False, norm=None,
+                                 dtype=np.float32).fit_transform(sentences)
+    except ValueError:
+        # Nothing but stop words
+        return np.zeros(len(sentences), dtype=np.float32)
+    # Well below the sentence count, or each sentence gets a topic of its own
+    rank = min(components or COMPONENTS, max(1, matrix.shape[0] // 8), matrix.shape[1] - 1)
+    if rank < 1:
+        return np.asarray(matrix.sum(axis=1)).ravel()
+    topics = TruncatedSVD(n_components=rank, algorithm='randomized', n_iter=5,
+                          random_state=0).fit_transform(matrix)
+    return np.linalg.norm(topics, axis=1)
+
+
+def _select(sentences, count, components):
+    """Indices of the `count` best sentences, in document order"""
+    if len(sentences) <= count:
+        return list(range(len(sentences)))
+    scores = rank_sentences(sentences, components)
+    # Stable sort: ties go to the earlier sentence
+    best = sorted(range(len(sentences)), key=lambda i: -scores[i])[:count]
+    return sorted(best)
+
+
+def summarize(text, count=3, max_sentences=None, section_summary=None, components=None):
+    """
+    The `count` most representative sentences of text, in document order,
+    and stats {"sentences", "levels", "sections"}.
+    """
+    max_sentences = max_sentences or MAX_SENTENCES
+    section_summary = min(section_summary or SECTION_SUMMARY, max_sentences)
+    sentences = split_sentences(text)
+    stats = {"sentences": len(sentences), "levels": 1, "sections": 0}
+    while len(sentences) > max_sentences:
+        # Summarize sections, then summarize the summaries
+        reduced = []
+        for start in range(0, len(sentences), max_sentences):
+            section = sentences[start:start + max_sentences]
+            reduced.extend(section[i] for i in _select(section, section_summary, components))
+            stats["sections"] += 1
+        if len(reduced) >= len(sentences):
+            break
+        sentences = reduced
+        stats["levels"] += 1
+    return [sentences[i] for i in _select(sentences, count, components)], stats
+
+
+# -- benchmark ----------------------------------------------------------
+
+
+def synthetic_report(words, seed=0):
+    """Inspection-report-like text of about `words` words: topical sentences over a Zipf-ish vocabulary"""
+    rng = random.Random(seed)
+    topics = [("roof", "gutter", "flashing", "tiles", "downpipe", "valley", "ridge"),
+              ("termite", "timber", "subfloor", "bearer", "joist", "moisture", "decay"),
+              ("switchboard", "breaker", "wiring", "outlet", "earth", "circuit", "fuse"),
+              ("footing", "slab", "crack", "settlement", "wall", "brick", "mortar"),
+              ("plumbing", "leak", "pipe", "valve", "drain", "tap", "pressure")]
+    common = ("the was noted and a of in to area inspected condition observed appears with at "
+              "visible further investigation recommended by licensed contractor near").split()
+    rare = [f"item{i}" for i in range(5000)]
+    out = []
+    total = 0
+    while total < words:
+        topic = topics[rng.randrange(len(topics))]
+        length = rng.randint(8, 24)
+        sentence = [rng.choice(topic) if rng.random() < 0.35 else
+                    rng.choice(rare) if rng.random() < 0.1 else rng.choice(common) for _ in range(length)]
+        out.append(" ".join(sentence).capitalize() + ".")
+        total += length
+    return " ".join(out)
+
+
+class _RegexTokenizer:
+    """sumy tokenizer interface on the regex splitter (sumy's default needs NLTK punkt)"""
+    language = "english"
+
+    def to_sentences(self, paragraph):
+        return split_sentences(paragraph)
+
+    def to_words(self, sentence):
+        return WORD.findall(sentence)
+
+
+def _sumy_summary(text, count):
+    from sumy.parsers.plaintext import PlaintextParser
+    from sumy.summarizers.lsa import LsaSummarizer
+    parser = PlaintextParser.from_string(text, _RegexTokenizer())
+    return [str(s) for s in LsaSummarizer()(parser.document, count)]
+
+
+def _peak_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _run(engine, words, count, queue):
+    text = synthetic_report(words)
+    # Library imports (about a second for scikit-learn) are not part of the timing
+    if engine == "sumy":
+        import sumy.summarizers.lsa  # noqa: F401
+    else:
+        import sklearn.decomposition  # noqa: F401
+        import sklearn.feature_extraction.text  # noqa: F401
+    started = time.perf_counter()
+    if engine == "sumy":
+        summary = _sumy_summary(text, count)
+        stats = {}
+    else:
+        summary, stats = summarize(text, count)
+    queue.put(dict(stats, seconds=round(time.perf_counter() - started, 3), peak_mb=_peak_mb(), summary=summary))
+
+
+def benchmark(word_counts=(10000, 100000, 1000000), sumy_max_words=100000, count=3):
+    """Time and peak memory of the sumy and sparse LSA paths, each run in a fresh process"""
+    from multiprocessing import get_context
+    ctx = get_context('spawn')
+    report = []
+    for words in word_counts:
+        row = {"words": words}
+        for engine in ("sumy", "lsa"):
+            if engine == "sumy" and words > sumy_max_words:
+                row[engine] = "skipped (dense term x sentence matrix too large)"
+                continue
+            queue = ctx.Queue()
+            process = ctx.Process(target=_run, args=(engine, words, count, queue))
+            process.start()
+            result = queue.get()
+            process.join()
+            row[engine] = result
+        if isinstance(row.get("sumy"), dict):
+            summary = row["lsa"]["summary"]
+            row["overlap"] = len(set(summary) & set(row["sumy"]["summary"])) / max(1, len(summary))
+        report.append(row)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sparse LSA summarizer tools')
+    sub = parser.add_subparsers(dest='command', required=True)
+    bench = sub.add_parser('benchmark', help='Compare with the sumy LSA path on synthetic reports')
+    bench.add_argument('--words', type=int, nargs='+', default=[10000, 100000, 1000000])
+    bench.add_argument('--sumy-max-words', type=int, default=100000,
+                       help='Skip the sumy path above this size (its memory grows quadratically)')
+    bench.add_argument('--sentences', type=int, default=3)
+    args = parser.parse_args()
+    if args.command == 'benchmark':
+        print(json.dumps(benchmark(args.words, args.sumy_max_words, args.sentences), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
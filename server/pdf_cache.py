@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of pdf_process.process_pdf results, so a PDF that is
+processed again (re-upload, process-pdf followed by ingest-pdf, page views)
+is answered from disk instead of being parsed again.
+
+    <dir>/v<N>/<aa>/<pdf sha256>-<options digest>.json
+
+Entries are keyed by the SHA-256 of the PDF bytes and a digest of everything
+that changes the output (structure flag, inline images or image store
+location, text/image limits and filters), so an edited file or different
+options never hit a stale entry. N is the result format version; bump
+RESULT_VERSION when process_pdf changes its output. Results that reference
+images in an ImageStore are only served while those images still exist.
+The cache is pruned to KILIK_PDF_CACHE_MB (512), least recently used first
+(lru_directory.py).
+
+    KILIK_PDF_CACHE       0 disables the cache (as does pdf_process.py --no-cache)
+    KILIK_PDF_CACHE_DIR   cache location (default: <KILIK_CACHE_DIR>/pdf)
+"""
+import hashlib
+import json
+import os
+import sys
+
+from lru_directory import lru_directory
+from query_cache import CACHE_DIR
+
+RESULT_VERSION = 1
+PDF_CACHE_DIR = os.environ.get('KILIK_PDF_CACHE_DIR') or os.path.join(CACHE_DIR, 'pdf')
+MAX_BYTES = int(os.environ.get('KILIK_PDF_CACHE_MB', '512')) * 1024 * 1024
+HASH_BLOCK = 1024 * 1024
+
+
+def safe_print_err(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def enabled():
+    return os.environ.get('KILIK_PDF_CACHE', '1') not in ('0', 'false', 'off')
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def options_digest(options):
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+class PDFCache:
+    def __init__(self, root=None, max_bytes=MAX_BYTES):
+        self.root = os.path.join(os.path.abspath(root or PDF_CACHE_DIR), f"v{RESULT_VERSION}")
+        self.files = lru_directory(self.root, max_bytes, 'PDF cache')
+
+    def _path(self, digest, options):
+        return os.path.join(self.root, digest[:2], f"{digest}-{options_digest(options)}.json")
+
+    def get(self, digest, options):
+        """Cached result for a PDF digest and options, or None"""
+        path = self._path(digest, options)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            safe_print_err(f'Dropping unreadable PDF cache entry {path}: {e}')
+            self.files.remove(path)
+            return None
+        # Image references are only good while the image store still has them
+        for image in result.get("images", []):
+            if isinstance(image, dict) and not os.path.exists(image.get("path", "")):
+                self.files.remove(path)
+                return None
+        self.files.touch(path)
+        return result
+
+    def put(self, digest, options, result):
+        self.files.write(self._path(digest, options), json.dumps(result).encode('utf-8'))
+
+    def prune(self):
+        """Delete least recently used results until the cache fits its cap; returns the count removed"""
+        return self.files.prune()
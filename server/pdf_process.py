@@ -1,17 +1,57 @@
 #!/usr/bin/env python3
 # PDF processing script for extracting text, metadata, and images from PDFs
+#
+# Large documents are split into page ranges extracted by a process pool, each
+# worker opening its own document; results are merged in page order and match
+# the serial output exactly. KILIK_PDF_WORKERS (or --workers) sets the pool
+# size: 0 = automatic (one per core, from KILIK_PDF_PARALLEL_MIN_PAGES pages,
+# default 64), 1 = serial.
+#
+# Images are filtered cheapest check first (repeated xrefs and tiny images from
+# metadata, byte-identical and then perceptually near-identical images), with
+# per-stage counts in "imageStats".
+#
+# With --image-store images go to a content-addressed store (image_store.py) and
+# the JSON carries references with dimensions instead of base64 data URIs.
+#
+# --stream writes NDJSON instead, one record per page as soon as it is
+# extracted, with document offsets and no truncation (see iter_pages); the
+# page records can be piped into `ingest_pdf.py --stream --format ndjson`.
+#
+# Results are cached by the PDF's SHA-256 and the options (pdf_cache.py), so
+# processing the same file again skips extraction; --no-cache or
+# KILIK_PDF_CACHE=0 bypasses the cache.
+#
+# The JSON (non-stream) mode is forwarded to the resident worker (worker.py)
+# when KILIK_WORKER_ADDRESS is set; --stream always runs here, since the worker
+# answers with one response rather than a stream of records.
+#
+# Scaling benchmark on a generated document (or a given PDF):
+#   python pdf_process.py --benchmark [file.pdf] [--pages 400] [--workers 4]
+# Serial vs parallel image filtering across range boundaries (exits 1 on a mismatch):
+#   python pdf_process.py --dedup-check [--workers 2]
+# Both, image counts included, on PDFs past the image cap: npm run check:pdf-process
 
 import argparse
+import hashlib
 import json
 import os
 import sys
 import base64
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from io import BytesIO
+from multiprocessing import get_context
 from pathlib import Path
 
 # Try to import required libraries
 try:
-    import fitz  # PyMuPDF
+    try:
+        import pymupdf as fitz  # PyMuPDF >= 1.24 warns on stdout when imported as fitz
+    except ImportError:
+        import fitz  # PyMuPDF
     from PIL import Image
 except ImportError:
     print(json.dumps({
@@ -19,11 +59,384 @@ except ImportError:
     }))
     sys.exit(1)
 
-def process_pdf(file_path):
+import pdf_cache
+import worker_client
+from image_store import ENCODING_VERSION, ImageStore, MISS, IMAGE_DIR
+
+MAX_TEXT_LENGTH = 2 * 1024 * 1024  # Limit text to 2MB to prevent huge outputs
+MAX_IMAGES = 50  # Limit to 50 images to allow more content
+PDF_WORKERS = int(os.environ.get('KILIK_PDF_WORKERS', '0'))
+PARALLEL_MIN_PAGES = int(os.environ.get('KILIK_PDF_PARALLEL_MIN_PAGES', '64'))
+# Fewer pages per range than this are not worth a process
+MIN_PAGES_PER_WORKER = 16
+MIN_IMAGE_SIDE = 100  # pixels; smaller images are icons, bullets and logos
+# Perceptual hashes this many bits apart or closer are the same photo (-1 disables)
+NEAR_DUPLICATE_DISTANCE = int(os.environ.get('KILIK_IMAGE_NEAR_DUPLICATE_BITS', '6'))
+# Per-stage image counts reported in "imageStats"
+IMAGE_STAGES = ("scanned", "repeated_xref", "too_small", "duplicate", "near_duplicate", "rejected",
+                "encoded", "store_hits")
+# Perceptual hash a scan did not compute (hashes are non-negative); survives pickling, unlike MISS
+UNHASHED = -1
+IMAGE_THREADS = int(os.environ.get('KILIK_IMAGE_THREADS', str(min(4, os.cpu_count() or 1))))
+
+_image_pool = None
+_image_pool_lock = threading.Lock()
+
+def page_blocks(page, page_text, base):
+    """
+    [start, end, page] of each text block (paragraph) of a page, as offsets
+    into the document text, where page_text starts at offset base
+    """
+    blocks = []
+    cursor = 0
+    for block in page.get_text("blocks"):
+        if block[6] != 0:  # image block
+            continue
+        text = block[4].strip()
+        if not text:
+            continue
+        pos = page_text.find(text, cursor)
+        if pos < 0:
+            continue
+        cursor = pos + len(text)
+        blocks.append([base + pos, base + cursor, page.number + 1])
+    return blocks
+
+def encode_image(image_bytes):
+    """JPEG bytes for an embedded image, downscaled; None if it is too small or too large to keep"""
+    image = Image.open(BytesIO(image_bytes))
+    if image.width < MIN_IMAGE_SIDE or image.height < MIN_IMAGE_SIDE:
+        return None
+
+    # Resize large images to reduce output size
+    max_dimension = 800
+    if image.width > max_dimension or image.height > max_dimension:
+        ratio = min(max_dimension / image.width, max_dimension / image.height)
+        new_size = (int(image.width * ratio), int(image.height * ratio))
+        image = image.resize(new_size, Image.Resampling.LANCZOS)
+
+    buffered = BytesIO()
+    # Use lower quality for smaller file sizes
+    quality = 50 if image.width > 400 else 70
+    image.convert("RGB").save(buffered, format="JPEG", quality=quality)
+
+    # Check if the base64 string would be too large
+    img_data = buffered.getvalue()
+    if len(img_data) > 2 * 1024 * 1024:  # Skip images larger than 2MB
+        return None
+    return img_data
+
+def image_pool():
+    """Threads for decode/resize/encode (Pillow releases the GIL while it works)"""
+    global _image_pool
+    with _image_pool_lock:
+        if _image_pool is None:
+            _image_pool = ThreadPoolExecutor(max_workers=max(1, IMAGE_THREADS), thread_name_prefix='kilik-image')
+        return _image_pool
+
+def _encode_entry(image_bytes, img_hash, store):
+    img_data = encode_image(image_bytes)
+    if store is not None:
+        return store.put(img_hash, img_data)
+    return img_data
+
+class SeenImages:
+    """What a scan has already taken: xrefs, image byte hashes and perceptual hashes"""
+
+    def __init__(self):
+        self.xrefs = set()
+        self.hashes = set()
+        self.phashes = []
+
+    def near_duplicate(self, phash):
+        if phash is None or NEAR_DUPLICATE_DISTANCE < 0:
+            return False
+        return any((phash ^ other).bit_count() <= NEAR_DUPLICATE_DISTANCE for other in self.phashes)
+
+def perceptual_hash(image_bytes):
+    """
+    64-bit difference hash from a thumbnail decode (JPEGs are decoded at reduced
+    scale); None for near-uniform images, which the hash cannot tell apart
+    """
+    image = Image.open(BytesIO(image_bytes))
+    image.draft('L', (64, 64))
+    small = image.convert('L').resize((9, 8), Image.Resampling.BILINEAR)
+    pixels = list(small.getdata())
+    if max(pixels) - min(pixels) < 8:
+        return None
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] < pixels[row * 9 + col + 1])
+    return bits
+
+def _perceptual_hash(image_bytes):
+    try:
+        return perceptual_hash(image_bytes)
+    except Exception:
+        return None
+
+def _count(stats, name, n=1):
+    stats[name] = stats.get(name, 0) + n
+
+def scan_images(doc, start, stop, seen, max_images, resume=None, store=None, stats=None, log=None):
+    """
+    Walk the images of pages [start, stop) in order and encode up to
+    max_images of them on the image thread pool. Cheapest checks first:
+    xrefs already seen and images under MIN_IMAGE_SIDE pixels (both from
+    get_images metadata) are skipped without extracting anything, then
+    byte-identical duplicates by SHA-256, then near-duplicates by a perceptual
+    hash of a thumbnail decode. `seen` is a SeenImages and `stats` counts
+    each stage. With an ImageStore, images found in the store are not decoded
+    again and new ones are written to it.
+    Returns (images, resume): images are (hash, jpeg bytes / store reference
+    or None, perceptual hash) in page order; resume is the (page, image index)
+    scanning stopped at, or None. A log list receives one entry per scanned
+    image, in order, with what the scan learned about it so a merge can
+    replay the scan against another SeenImages (see _replay_log):
+    (xref, too small, hash or None if not extracted, perceptual hash or
+    UNHASHED if not computed, position in images or None, "encoded" / "store_hits").
+    """
+    images = []
+    kept = 0
+    pending = []  # (position in images, image bytes) waiting to be encoded
+    stats = stats if stats is not None else {}
+
+    def flush():
+        nonlocal kept
+        futures = [image_pool().submit(_encode_entry, image_bytes, images[pos][0], store)
+                   for pos, image_bytes in pending]
+        for (pos, _), future in zip(pending, futures):
+            try:
+                img_data = future.result()
+            except Exception:
+                img_data = None
+            images[pos] = (images[pos][0], img_data, images[pos][2])
+            if img_data is not None:
+                kept += 1
+            else:
+                _count(stats, "rejected")
+        _count(stats, "encoded", len(pending))
+        pending.clear()
+
+    for page_num in range(start, stop):
+        image_list = doc[page_num].get_images(full=True)
+        first = resume[1] if resume and page_num == resume[0] else 0
+        for img_index in range(first, len(image_list)):
+            if kept + len(pending) >= max_images:
+                # Encode what we have to learn how many of them are kept
+                flush()
+                if kept >= max_images:
+                    return images, (page_num, img_index)
+            _count(stats, "scanned")
+            xref, width, height = image_list[img_index][0], image_list[img_index][2], image_list[img_index][3]
+            small = width < MIN_IMAGE_SIDE or height < MIN_IMAGE_SIDE
+            if xref in seen.xrefs:
+                # Same image object placed again (logos, page furniture)
+                _count(stats, "repeated_xref")
+                if log is not None:
+                    log.append((xref, small, None, UNHASHED, None, None))
+                continue
+            seen.xrefs.add(xref)
+            if small:
+                _count(stats, "too_small")
+                if log is not None:
+                    log.append((xref, small, None, UNHASHED, None, None))
+                continue
+            try:
+                image_bytes = doc.extract_image(xref)["image"]
+
+                # Hash the image bytes to detect duplicates
+                img_hash = hashlib.sha256(image_bytes).hexdigest()
+                if img_hash in seen.hashes:
+                    _count(stats, "duplicate")
+                    if log is not None:
+                        log.append((xref, small, img_hash, UNHASHED, None, None))
+                    continue  # skip duplicate
+                seen.hashes.add(img_hash)
+                phash = _perceptual_hash(image_bytes)
+                if seen.near_duplicate(phash):
+                    _count(stats, "near_duplicate")
+                    if log is not None:
+                        log.append((xref, small, img_hash, phash, None, None))
+                    continue
+                if phash is not None:
+                    seen.phashes.append(phash)
+            except Exception:
+                _count(stats, "rejected")
+                if log is not None:
+                    log.append((xref, small, None, UNHASHED, None, None))
+                continue
+            if store is not None:
+                cached = store.lookup(img_hash)
+                if cached is not MISS:
+                    _count(stats, "store_hits")
+                    images.append((img_hash, cached, phash))
+                    if log is not None:
+                        log.append((xref, small, img_hash, phash, len(images) - 1, "store_hits"))
+                    if cached is not None:
+                        kept += 1
+                    else:
+                        _count(stats, "rejected")
+                    continue
+            images.append((img_hash, None, phash))
+            pending.append((len(images) - 1, image_bytes))
+            if log is not None:
+                log.append((xref, small, img_hash, phash, len(images) - 1, "encoded"))
+    flush()
+    return images, None
+
+def extract_range(file_path, start, stop, structure=False, max_images=MAX_IMAGES, image_dir=None):
+    """
+    Worker for one page range, opening its own document: page texts, block
+    spans relative to each page (with structure) and scan_images results
+    """
+    doc = fitz.open(file_path)
+    try:
+        pages = []
+        for page_num in range(start, stop):
+            page = doc[page_num]
+            page_text = page.get_text()
+            pages.append((page_text, page_blocks(page, page_text, 0) if structure else None))
+        log = []
+        store = ImageStore(image_dir) if image_dir else None
+        images, resume = scan_images(doc, start, stop, SeenImages(), max_images, store=store, log=log)
+        return {"start": start, "stop": stop, "pages": pages, "images": images, "resume": resume,
+                "log": log}
+    finally:
+        doc.close()
+
+def _replay_log(doc, part, seen, max_images, store, stats):
+    """
+    Replay a range's scan log in page order against the images of earlier
+    ranges (`seen`), counting each stage as scan_images would have on one
+    pass over the document, and stop before the image after the max_images-th
+    kept one. Returns the kept images' data; images the range did not encode
+    (it dropped them as duplicates of its own) are encoded here.
+    """
+    kept = []
+    for xref, small, img_hash, phash, pos, via in part["log"]:
+        if len(kept) >= max_images:
+            break
+        _count(stats, "scanned")
+        if xref in seen.xrefs:
+            _count(stats, "repeated_xref")
+            continue
+        seen.xrefs.add(xref)
+        if small:
+            _count(stats, "too_small")
+            continue
+        if img_hash is None:
+            # Its range could not extract it (an xref it had seen is always seen here too)
+            _count(stats, "rejected")
+            continue
+        if img_hash in seen.hashes:
+            _count(stats, "duplicate")
+            continue
+        seen.hashes.add(img_hash)
+        if phash == UNHASHED:
+            phash = _perceptual_hash(doc.extract_image(xref)["image"])
+        if seen.near_duplicate(phash):
+            _count(stats, "near_duplicate")
+            continue
+        # Recorded before the rejected check, as in scan_images
+        if phash is not None:
+            seen.phashes.append(phash)
+        if pos is None:
+            img_data = _encode_late(doc, xref, img_hash, store, stats)
+        else:
+            img_data = part["images"][pos][1]
+            _count(stats, via)
+            if img_data is None:
+                _count(stats, "rejected")
+        if img_data is not None:
+            kept.append(img_data)
+    return kept
+
+def _encode_late(doc, xref, img_hash, store, stats):
+    """Encode an image its range dropped as a duplicate but the merge keeps"""
+    if store is not None:
+        cached = store.lookup(img_hash)
+        if cached is not MISS:
+            _count(stats, "store_hits")
+            if cached is None:
+                _count(stats, "rejected")
+            return cached
+    try:
+        img_data = _encode_entry(doc.extract_image(xref)["image"], img_hash, store)
+    except Exception:
+        img_data = None
+    _count(stats, "encoded")
+    if img_data is None:
+        _count(stats, "rejected")
+    return img_data
+
+def choose_workers(page_count, workers=None):
+    """
+    Process count for a document. Automatic (0): one per core, serial for short
+    documents or a single core; an explicit count is used as given
+    """
+    workers = PDF_WORKERS if workers is None else workers
+    if workers == 1 or page_count < 2:
+        return 1
+    if workers <= 0:
+        if page_count < PARALLEL_MIN_PAGES:
+            return 1
+        return max(1, min(os.cpu_count() or 1, page_count // MIN_PAGES_PER_WORKER))
+    return min(workers, page_count)
+
+def page_ranges(page_count, workers):
+    """Contiguous ranges, two per worker so a slow range does not hold up the pool"""
+    parts = min(page_count, workers * 2) if workers > 1 else 1
+    size, extra = divmod(page_count, parts)
+    ranges = []
+    start = 0
+    for i in range(parts):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+def process_pdf(file_path, structure=False, workers=None, image_dir=None, use_cache=None):
     """
     Process a PDF file to extract text, metadata, and images
-    Returns a JSON object with the extracted data
+    Returns a JSON object with the extracted data; with structure it also
+    carries "blocks", the paragraph spans for the structured chunker.
+    With image_dir images are written to that ImageStore and returned as
+    {"id", "path", "width", "height", "bytes"} references instead of data URIs.
+    Results are cached by the PDF's SHA-256 (pdf_cache.py) unless use_cache
+    is False; "cached" says whether this one came from the cache.
     """
+    if use_cache is None:
+        use_cache = pdf_cache.enabled()
+    if not use_cache:
+        return _extract_pdf(file_path, structure, workers, image_dir)
+    try:
+        digest = pdf_cache.file_digest(file_path)
+    except OSError:
+        return _extract_pdf(file_path, structure, workers, image_dir)
+    options = {
+        "structure": bool(structure),
+        "image_store": ImageStore(image_dir).root if image_dir else None,
+        "image_encoding": ENCODING_VERSION,
+        "max_text_length": MAX_TEXT_LENGTH,
+        "max_images": MAX_IMAGES,
+        "min_image_side": MIN_IMAGE_SIDE,
+        "near_duplicate_bits": NEAR_DUPLICATE_DISTANCE,
+    }
+    cache = pdf_cache.PDFCache()
+    result = cache.get(digest, options)
+    if result is not None:
+        return dict(result, cached=True)
+    result = _extract_pdf(file_path, structure, workers, image_dir)
+    if not result.get("error"):
+        try:
+            cache.put(digest, options, result)
+        except OSError as e:
+            pdf_cache.safe_print_err(f'Could not cache PDF result: {e}')
+    return dict(result, cached=False)
+
+def _extract_pdf(file_path, structure, workers, image_dir):
     result = {
         "text": "",
         "metadata": {},
@@ -32,82 +445,64 @@ def process_pdf(file_path):
     }
     try:
         doc = fitz.open(file_path)
-        result["metadata"] = {
-            "title": doc.metadata.get("title", ""),
-            "author": doc.metadata.get("author", ""),
-            "subject": doc.metadata.get("subject", ""),
-            "keywords": doc.metadata.get("keywords", ""),
-            "creator": doc.metadata.get("creator", ""),
-            "producer": doc.metadata.get("producer", ""),
-            "creationDate": doc.metadata.get("creationDate", ""),
-            "modDate": doc.metadata.get("modDate", ""),
-            "pageCount": len(doc)
-        }
+        result["metadata"] = document_metadata(doc)
+        workers = choose_workers(len(doc), workers)
+        ranges = page_ranges(len(doc), workers)
+        if workers > 1:
+            # spawn: the resident worker process has threads, which fork does not mix with
+            with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn')) as pool:
+                parts = list(pool.map(extract_range, [file_path] * len(ranges), [r[0] for r in ranges],
+                                      [r[1] for r in ranges], [structure] * len(ranges),
+                                      [MAX_IMAGES] * len(ranges), [image_dir] * len(ranges)))
+        else:
+            parts = [extract_range(file_path, 0, len(doc), structure, MAX_IMAGES, image_dir)]
+
+        # Merge in page order
         text_content = []
-        for page_num, page in enumerate(doc):
-            text_content.append(page.get_text())
-        
+        blocks = []
+        offset = 0
+        for part in parts:
+            for page_text, page_spans in part["pages"]:
+                text_content.append(page_text)
+                if structure:
+                    blocks.extend([start + offset, end + offset, page] for start, end, page in page_spans)
+                offset += len(page_text) + 1
+
         full_text = "\n".join(text_content)
-        # Limit text to 2MB to prevent huge outputs
-        max_text_length = 2 * 1024 * 1024  # 2MB
-        if len(full_text) > max_text_length:
-            result["text"] = full_text[:max_text_length] + "\n\n[Text truncated - PDF contains more content...]"
+        if len(full_text) > MAX_TEXT_LENGTH:
+            result["text"] = full_text[:MAX_TEXT_LENGTH] + "\n\n[Text truncated - PDF contains more content...]"
         else:
             result["text"] = full_text
-        
-        # Remove duplicate images by hashing image bytes
-        import hashlib
-        seen_hashes = set()
+        if structure:
+            result["blocks"] = [b for b in blocks if b[1] <= MAX_TEXT_LENGTH]
+
+        # Remove duplicate images by hashing image bytes; a range only knows its own
+        # duplicates, so each range's scan log is replayed in order against the xrefs
+        # and hashes of earlier ranges. Stages are counted during the replay only, so
+        # "imageStats" is the serial scan's, whatever the ranges did past the cap.
+        store = ImageStore(image_dir) if image_dir else None
+        image_stats = dict.fromkeys(IMAGE_STAGES, 0)
+        seen = SeenImages()
         image_count = 0
-        max_images = 50  # Limit to 50 images to allow more content
-        
-        for page_num, page in enumerate(doc):
-            if image_count >= max_images:
+        for part in parts:
+            if image_count >= MAX_IMAGES:
                 break
-                
-            image_list = page.get_images(full=True)
-            for img_index, img in enumerate(image_list):
-                if image_count >= max_images:
-                    break
-                    
-                try:
-                    xref = img[0]
-                    base_image = doc.extract_image(xref)
-                    image_bytes = base_image["image"]
-                    
-                    # Hash the image bytes to detect duplicates
-                    img_hash = hashlib.sha256(image_bytes).hexdigest()
-                    if img_hash in seen_hashes:
-                        continue  # skip duplicate
-                    seen_hashes.add(img_hash)
-                    
-                    image = Image.open(BytesIO(image_bytes))
-                    if image.width < 100 or image.height < 100:
-                        continue
-                    
-                    # Resize large images to reduce output size
-                    max_dimension = 800
-                    if image.width > max_dimension or image.height > max_dimension:
-                        ratio = min(max_dimension / image.width, max_dimension / image.height)
-                        new_size = (int(image.width * ratio), int(image.height * ratio))
-                        image = image.resize(new_size, Image.Resampling.LANCZOS)
-                    
-                    buffered = BytesIO()
-                    # Use lower quality for smaller file sizes
-                    quality = 50 if image.width > 400 else 70
-                    image.convert("RGB").save(buffered, format="JPEG", quality=quality)
-                    
-                    # Check if the base64 string would be too large
-                    img_data = buffered.getvalue()
-                    if len(img_data) > 2 * 1024 * 1024:  # Skip images larger than 2MB
-                        continue
-                        
-                    img_base64 = base64.b64encode(img_data).decode('utf-8')
-                    result["images"].append(f"data:image/jpeg;base64,{img_base64}")
-                    image_count += 1
-                    
-                except Exception as e:
-                    continue
+            for img_data in _replay_log(doc, part, seen, MAX_IMAGES - image_count, store, image_stats):
+                result["images"].append(_image_output(img_data))
+                image_count += 1
+            if image_count < MAX_IMAGES and part["resume"] is not None:
+                # The range stopped at its own cap but some of its images were duplicates of earlier ranges
+                more, _ = scan_images(doc, part["start"], part["stop"], seen,
+                                      MAX_IMAGES - image_count, part["resume"], store, image_stats)
+                for img_hash, img_data, phash in more:
+                    if img_data is not None:
+                        result["images"].append(_image_output(img_data))
+                        image_count += 1
+        image_stats["kept"] = image_count
+        result["imageStats"] = {name: image_stats[name] for name in IMAGE_STAGES + ("kept",)}
+        if store is not None:
+            result["imageStore"] = {"dir": store.root, "encoded": image_stats["encoded"],
+                                    "store_hits": image_stats["store_hits"]}
         return result
     except Exception as e:
         return {
@@ -121,15 +516,253 @@ def process_pdf(file_path):
         if 'doc' in locals():
             doc.close()
 
+def document_metadata(doc):
+    return {
+        "title": doc.metadata.get("title", ""),
+        "author": doc.metadata.get("author", ""),
+        "subject": doc.metadata.get("subject", ""),
+        "keywords": doc.metadata.get("keywords", ""),
+        "creator": doc.metadata.get("creator", ""),
+        "producer": doc.metadata.get("producer", ""),
+        "creationDate": doc.metadata.get("creationDate", ""),
+        "modDate": doc.metadata.get("modDate", ""),
+        "pageCount": len(doc)
+    }
+
+def iter_pages(file_path, structure=False, image_dir=None, images=True):
+    """
+    Stream a PDF as records, each yielded as soon as its page is extracted:
+    {"type": "metadata", "metadata"}, then for every page
+    {"type": "page", "page", "text", "start", "end"[, "blocks"]} followed by
+    {"type": "image", "page", "image"} for the images kept from that page, and
+    finally {"type": "end", "pages", "chars", "imageStats"}. Offsets and
+    blocks refer to the whole document text (pages joined by newlines, as in
+    process_pdf) but nothing is truncated, and only one page is held at a time.
+    Images are filtered and capped exactly as in process_pdf.
+    """
+    doc = fitz.open(file_path)
+    try:
+        yield {"type": "metadata", "metadata": document_metadata(doc)}
+        store = ImageStore(image_dir) if image_dir else None
+        seen = SeenImages()
+        stats = dict.fromkeys(IMAGE_STAGES, 0)
+        image_count = 0
+        offset = 0
+        for page_num in range(len(doc)):
+            page = doc[page_num]
+            page_text = page.get_text()
+            record = {"type": "page", "page": page_num + 1, "text": page_text,
+                      "start": offset, "end": offset + len(page_text)}
+            if structure:
+                record["blocks"] = page_blocks(page, page_text, offset)
+            yield record
+            offset += len(page_text) + 1
+            if images and image_count < MAX_IMAGES:
+                found, _ = scan_images(doc, page_num, page_num + 1, seen, MAX_IMAGES - image_count,
+                                       store=store, stats=stats)
+                for _, img_data, _ in found:
+                    if img_data is not None:
+                        yield {"type": "image", "page": page_num + 1, "image": _image_output(img_data)}
+                        image_count += 1
+        stats["kept"] = image_count
+        yield {"type": "end", "pages": len(doc), "chars": max(0, offset - 1),
+               "imageStats": {name: stats[name] for name in IMAGE_STAGES + ("kept",)}}
+    finally:
+        doc.close()
+
+def write_stream(records, out):
+    """Write records as NDJSON, flushing after each; returns 1 if extraction failed"""
+    try:
+        for record in records:
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+    except Exception as e:
+        out.write(json.dumps({"type": "error", "error": str(e)}) + "\n")
+        out.flush()
+        return 1
+    return 0
+
+def _image_output(img_data):
+    """Store reference as is; JPEG bytes as a data URI"""
+    if isinstance(img_data, dict):
+        return img_data
+    img_base64 = base64.b64encode(img_data).decode('utf-8')
+    return f"data:image/jpeg;base64,{img_base64}"
+
+def generate_pdf(path, pages, images_every=5, seed=0):
+    """Synthetic inspection report: paragraphs of text on every page, a photo every few pages"""
+    import random
+    rng = random.Random(seed)
+    words = ("roof gutter flashing moisture termite subfloor footing timber cracked leaking "
+             "switchboard breaker inspection defect repair damage water access recommend").split()
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_text((50, 50), f"Section {page_num + 1}. Inspection findings", fontsize=14)
+        y = 80
+        if images_every and page_num % images_every == 0:
+            image = Image.new("RGB", (320, 240), tuple(rng.randrange(256) for _ in range(3)))
+            buffered = BytesIO()
+            image.save(buffered, format="PNG")
+            page.insert_image(fitz.Rect(50, y, 290, y + 180), stream=buffered.getvalue())
+            y += 190
+        while y < 720:
+            sentences = [" ".join(rng.choice(words) for _ in range(rng.randint(6, 14))).capitalize() + "."
+                         for _ in range(rng.randint(2, 5))]
+            used = page.insert_textbox(fitz.Rect(50, y, 550, y + 150), " ".join(sentences), fontsize=10)
+            if used < 0:
+                break
+            y += (150 - used) + 10
+    doc.save(path)
+    doc.close()
+
+def benchmark(file_path=None, pages=400, workers=None):
+    """Time serial vs parallel extraction for 1, 2, 4, ... workers and check the outputs match"""
+    tmp_dir = None
+    if file_path is None:
+        tmp_dir = tempfile.mkdtemp(prefix='kilik-pdf-bench-')
+        file_path = os.path.join(tmp_dir, 'generated.pdf')
+        generate_pdf(file_path, pages)
+    try:
+        cores = os.cpu_count() or 1
+        counts = [1]
+        while counts[-1] * 2 <= (workers or max(cores, 2)):
+            counts.append(counts[-1] * 2)
+        if workers and workers not in counts:
+            counts.append(workers)
+        runs = []
+        baseline = None
+        for count in counts:
+            started = time.perf_counter()
+            out = process_pdf(file_path, structure=True, workers=count, use_cache=False)
+            elapsed = time.perf_counter() - started
+            if baseline is None:
+                baseline = (out, elapsed)
+            runs.append({"workers": count, "seconds": round(elapsed, 3),
+                         "speedup": round(baseline[1] / elapsed, 2) if elapsed else None,
+                         "identical": out == baseline[0]})
+        return {"file": file_path, "pages": baseline[0]["metadata"].get("pageCount"), "cores": cores,
+                "images": len(baseline[0]["images"]), "chars": len(baseline[0]["text"]), "runs": runs}
+    finally:
+        if tmp_dir is not None:
+            import shutil
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def _pattern_image(bits):
+    """PNG whose perceptual hash is `bits`: a 9x8 grid of brightness steps, scaled up"""
+    grid = Image.new("L", (9, 8))
+    for row in range(8):
+        value = 128
+        grid.putpixel((0, row), value)
+        for col in range(8):
+            value += 12 if bits >> (63 - (row * 8 + col)) & 1 else -12
+            grid.putpixel((col + 1, row), value)
+    buffered = BytesIO()
+    grid.resize((360, 320), Image.Resampling.NEAREST).convert("RGB").save(buffered, format="PNG")
+    return buffered.getvalue()
+
+def dedup_check(workers=2):
+    """
+    Compare serial and parallel image filtering on a generated PDF whose
+    range boundaries (with `workers` processes) split the cases the merge
+    has to replay: a near-duplicate of an image rejected earlier (recorded
+    in the image store), and a range whose first image is a near-duplicate
+    of an earlier range's while a later image is only near the first one.
+    """
+    import random
+    import shutil
+    rng = random.Random(0)
+
+    def flip(bits, count):
+        for bit in rng.sample(range(64), count):
+            bits ^= 1 << bit
+        return bits
+
+    rejected, first = rng.getrandbits(64), rng.getrandbits(64)
+    second = flip(first, 5)
+    third = flip(second, 5)
+    # Page of each image; with 2 workers the ranges are pages 0-1, 2-3, 4-5 and 6-7
+    layout = [(0, rejected), (1, first), (2, flip(rejected, 3)), (4, second), (5, third),
+              (6, rng.getrandbits(64))]
+    tmp_dir = tempfile.mkdtemp(prefix='kilik-pdf-dedup-')
+    try:
+        path = os.path.join(tmp_dir, 'dedup.pdf')
+        doc = fitz.open()
+        for _ in range(workers * 4):
+            doc.new_page()
+        for page_num, bits in layout:
+            doc[page_num].insert_image(fitz.Rect(50, 80, 410, 400), stream=_pattern_image(bits))
+        doc.save(path)
+        # The first image was rejected by an earlier run; each run gets its own
+        # store, so the second does not find the first one's images in it
+        xref = doc[0].get_images(full=True)[0][0]
+        rejected_hash = hashlib.sha256(doc.extract_image(xref)["image"]).hexdigest()
+        doc.close()
+        runs = []
+        for count in (1, workers):
+            image_dir = os.path.join(tmp_dir, f'images-{len(runs)}')
+            ImageStore(image_dir).put(rejected_hash, None)
+            runs.append(_extract_pdf(path, False, count, image_dir))
+        serial, parallel = runs
+        return {"workers": workers, "serial_images": len(serial["images"]),
+                "parallel_images": len(parallel["images"]),
+                "serial_stats": serial["imageStats"], "parallel_stats": parallel["imageStats"],
+                "identical": ([i["id"] for i in serial["images"]] == [i["id"] for i in parallel["images"]]
+                              and serial["imageStats"] == parallel["imageStats"])}
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
 def main():
     parser = argparse.ArgumentParser(description='Process PDF files')
-    parser.add_argument('file', help='Path to the PDF file')
+    parser.add_argument('file', nargs='?', help='Path to the PDF file')
     parser.add_argument('--output', help='Path to save the output JSON')
+    parser.add_argument('--structure', action='store_true',
+                        help='Include paragraph block offsets and page numbers for structured chunking')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Extraction processes (0 = one per core, 1 = serial; default KILIK_PDF_WORKERS)')
+    parser.add_argument('--image-store', nargs='?', const=IMAGE_DIR, default=None, metavar='DIR',
+                        help='Write images to the content-addressed store and return references '
+                             '(default dir: KILIK_IMAGE_DIR or the cache dir)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Write NDJSON records page by page (no truncation, no result cache)')
+    parser.add_argument('--no-images', action='store_true', help='Leave images out of the --stream output')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Extract again instead of using (or filling) the result cache')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Measure extraction time by worker count (generates a PDF if no file is given)')
+    parser.add_argument('--pages', type=int, default=400, help='Pages of the generated benchmark PDF')
+    parser.add_argument('--dedup-check', action='store_true',
+                        help='Check that parallel image filtering matches the serial scan on a generated PDF')
     args = parser.parse_args()
+    if args.benchmark:
+        print(json.dumps(benchmark(args.file, args.pages, args.workers), indent=2))
+        return 0
+    if args.dedup_check:
+        report = dedup_check(max(2, args.workers or 2))
+        print(json.dumps(report, indent=2))
+        return 0 if report["identical"] else 1
+    if not args.file:
+        parser.error('file is required')
     if not os.path.exists(args.file):
         print(json.dumps({"error": f"File not found: {args.file}"}))
         return 1
-    result = process_pdf(args.file)
+    if args.stream:
+        records = iter_pages(args.file, structure=args.structure, image_dir=args.image_store,
+                             images=not args.no_images)
+        if args.output:
+            with open(args.output, 'w') as f:
+                return write_stream(records, f)
+        return write_stream(records, sys.stdout)
+    forwarded = worker_client.forward('process_pdf', {
+        # The worker may run in another directory
+        "file": os.path.abspath(args.file), "structure": args.structure, "workers": args.workers,
+        "imageStore": os.path.abspath(args.image_store) if args.image_store else None,
+        "cache": not args.no_cache})
+    if forwarded is not None:
+        result = forwarded[0]
+    else:
+        result = process_pdf(args.file, structure=args.structure, workers=args.workers,
+                             image_dir=args.image_store, use_cache=False if args.no_cache else None)
     if args.output:
         with open(args.output, 'w') as f:
             json.dump(result, f)
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Layered cache used by query_chunks.py:
+    normalized query               -> query embedding
+    (report, index version, k, embedding) -> retrieved chunk ids/scores
+    (report, index version, chunk ids, query, model) -> generated summary
+
+Each layer is an in-process LRU with TTL in front of a persistent SQLite
+tier (server/cache/query_cache.sqlite, override with KILIK_CACHE_DIR).
+Keys that depend on a report include its index version, derived from the
+index file's size and mtime, so entries go stale as soon as ingest_pdf.py
+rewrites the index; ingest also calls `invalidate_report` to drop them from disk.
+Set KILIK_QUERY_CACHE=0 to bypass the cache entirely.
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+CACHE_DIR = os.environ.get('KILIK_CACHE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache')
+DB_PATH = os.path.join(CACHE_DIR, 'query_cache.sqlite')
+
+# (memory entries, memory/disk TTL in seconds, disk rows) per namespace
+LAYER_LIMITS = {
+    "embedding": (2048, 7 * 24 * 3600, 100000),
+    "retrieval": (2048, 24 * 3600, 100000),
+    "summary": (512, 24 * 3600, 20000),
+}
+# Prune the disk tier once every this many writes
+PRUNE_EVERY = 500
+
+
+def safe_print_err(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def enabled():
+    return os.environ.get('KILIK_QUERY_CACHE', '1') not in ('0', 'false', 'off')
+
+
+def normalize_query(text):
+    """Lowercase and collapse whitespace (all-MiniLM-L6-v2 is uncased, so embeddings are unchanged)"""
+    return " ".join(text.lower().split())
+
+
+def digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            part = np.ascontiguousarray(part, dtype='float32').tobytes()
+        elif not isinstance(part, bytes):
+            part = str(part).encode('utf-8')
+        h.update(len(part).to_bytes(8, 'little'))
+        h.update(part)
+    return h.hexdigest()
+
+
+def index_version(index_path):
+    """Version stamp for a report index; changes whenever the file is rewritten"""
+    try:
+        st = os.stat(index_path)
+    except OSError:
+        return None
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU with per-entry TTL"""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def discard_report(self, report):
+        with self._lock:
+            for key in [k for k in self._data if k[0] == report]:
+                del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DiskTier:
+    """SQLite-backed persistent tier shared by all cache layers and processes"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                ' layer TEXT NOT NULL, key TEXT NOT NULL, report TEXT,'
+                ' value BLOB NOT NULL, expires REAL NOT NULL, last_access REAL NOT NULL,'
+                ' PRIMARY KEY (layer, key))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_report ON entries (report)')
+            self._local.conn = conn
+        return conn
+
+    def get(self, layer, key):
+        conn = self._conn()
+        row = conn.execute('SELECT value, expires FROM entries WHERE layer = ? AND key = ?', (layer, key)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row[1] < now:
+            conn.execute('DELETE FROM entries WHERE layer = ? AND key = ?', (layer, key))
+            conn.commit()
+            return None
+        conn.execute('UPDATE entries SET last_access = ? WHERE layer = ? AND key = ?', (now, layer, key))
+        conn.commit()
+        return row[0]
+
+    def set(self, layer, key, report, value, ttl):
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            'INSERT OR REPLACE INTO entries (layer, key, report, value, expires, last_access) VALUES (?, ?, ?, ?, ?, ?)',
+            (layer, key, report, value, now + ttl, now)
+        )
+        conn.commit()
+        with self._writes_lock:
+            self._writes += 1
+            prune = self._writes % PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """Drop expired rows, then least recently used rows beyond each layer's limit"""
+        conn = self._conn()
+        conn.execute('DELETE FROM entries WHERE expires < ?', (time.time(),))
+        for layer, (_, _, max_rows) in LAYER_LIMITS.items():
+            conn.execute(
+                'DELETE FROM entries WHERE layer = ? AND key IN ('
+                ' SELECT key FROM entries WHERE layer = ? ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+                (layer, layer, max_rows)
+            )
+        conn.commit()
+
+    def invalidate_report(self, report):
+        conn = self._conn()
+        cur = conn.execute('DELETE FROM entries WHERE report = ?', (report,))
+        conn.commit()
+        return cur.rowcount
+
+
+class CacheLayer:
+    """One memory LRU + the shared disk tier, with hit/miss counters"""
+
+    def __init__(self, name, disk, encode, decode):
+        max_entries, ttl, _ = LAYER_LIMITS[name]
+        self.name = name
+        self.ttl = ttl
+        self.memory = LRUCache(max_entries, ttl)
+        self.disk = disk
+        self.encode = encode
+        self.decode = decode
+        self.counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, what):
+        with self._lock:
+            self.counts[what] += 1
+
+    def get(self, report, key):
+        value = self.memory.get((report, key))
+        if value is not None:
+            self._count("memory_hits")
+            return value
+        try:
+            raw = self.disk.get(self.name, key)
+        except sqlite3.Error as e:
+            safe_print_err(f'Query cache read failed ({self.name}): {e}')
+            raw = None
+        if raw is not None:
+            value = self.decode(raw)
+            self.memory.set((report, key), value)
+            self._count("disk_hits")
+            return value
+        self._count("misses")
+        return None
+
+    def set(self, report, key, value):
+        self.memory.set((report, key), value)
+        try:
+            self.disk.set(self.name, key, report, self.encode(value), self.ttl)
+        except sqlite3.Error as e:
+            safe_print_err(f'Query cache write failed ({self.name}): {e}')
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        counts["hits"] = counts["memory_hits"] + counts["disk_hits"]
+        counts["resident"] = len(self.memory)
+        return counts
+
+
+def _encode_vector(vec):
+    return np.ascontiguousarray(vec, dtype='float32').tobytes()
+
+
+def _decode_vector(raw):
+    return np.frombuffer(raw, dtype='float32').copy()
+
+
+def _encode_json(value):
+    return json.dumps(value).encode('utf-8')
+
+
+def _decode_json(raw):
+    return json.loads(raw)
+
+
+_disk = DiskTier()
+embeddings = CacheLayer("embedding", _disk, _encode_vector, _decode_vector)
+retrievals = CacheLayer("retrieval", _disk, _encode_json, _decode_json)
+summaries = CacheLayer("summary", _disk, _encode_json, _decode_json)
+
+
+def embedding_key(model_name, query):
+    return digest(model_name, normalize_query(query))
+
+
+def retrieval_key(report, version, k, query_embedding):
+    return digest(report, version, k, query_embedding)
+
+
+def summary_key(report, version, chunk_ids, query, model_name):
+    return digest(report, version, ",".join(str(i) for i in chunk_ids), normalize_query(query), model_name)
+
+
+def invalidate_report(report):
+    """Drop every cached retrieval/summary for a report (called after its index changes)"""
+    for layer in (retrievals, summaries):
+        layer.memory.discard_report(report)
+    try:
+        return _disk.invalidate_report(report)
+    except sqlite3.Error as e:
+        safe_print_err(f'Query cache invalidation failed for {report}: {e}')
+        return 0
+
+
+def stats():
+    return {layer.name: layer.stats() for layer in (embeddings, retrievals, summaries)}
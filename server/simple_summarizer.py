@@ -7,25 +7,18 @@ import re
 import json
 import sys
 
+import worker_client
+from issue_classifier import get_classifier
+
+MAX_ISSUES = 20
+
 def simple_extract_issues(text):
     """Extract issues from text using regex patterns only without NLTK."""
     # Split text into sentences (simple approach)
     sentences = re.split(r'(?<=[.!?])\s+', text)
     
-    # Define keyword patterns for issues, major and minor problems
-    issue_words = ['issue', 'problem', 'damage', 'defect', 'concern', 'attention', 'repair', 
-                  'replace', 'fix', 'broken', 'cracked', 'leaking', 'missing', 'failing', 
-                  'inadequate', 'improper', 'deteriorating', 'worn', 'loose', 'recommendation']
-    
-    major_words = ['significant', 'major', 'serious', 'critical', 'severe', 'hazardous', 
-                  'dangerous', 'safety concern', 'immediate attention', 'structural', 
-                  'foundation', 'electrical hazard', 'fire hazard', 'health hazard', 
-                  'water damage', 'mold', 'asbestos', 'lead', 'code violation']
-    
-    minor_words = ['minor', 'cosmetic', 'aesthetic', 'small', 'slight', 'minimal', 
-                  'maintenance', 'recommend', 'consider', 'monitor', 'observe', 'note', 
-                  'paint', 'clean', 'adjust', 'tighten', 'caulk']
-    
+    classifier = get_classifier()
+
     # Find potential issue sentences
     issues = []
     for sentence in sentences:
@@ -33,16 +26,11 @@ def simple_extract_issues(text):
         if not sentence or len(sentence) < 10:
             continue
             
-        # Check if sentence contains issue words
-        has_issue = any(word in sentence.lower() for word in issue_words)
-        if not has_issue:
+        # Issue keywords decide whether it is an issue, major keywords its severity
+        severity = classifier.severity(sentence)
+        if severity is None:
             continue
             
-        # Determine severity
-        severity = "Minor"  # Default
-        if any(word in sentence.lower() for word in major_words):
-            severity = "Major"
-            
         # Create simple title from first few words
         words = sentence.split()
         title = " ".join(words[:min(7, len(words))])
@@ -54,10 +42,10 @@ def simple_extract_issues(text):
             "severity": severity,
             "description": sentence
         })
-    
-    # Limit to most important issues (simple approach)
-    if len(issues) > 20:
-        issues = issues[:20]
+
+        # Limit to most important issues (simple approach): the first 20, so stop there
+        if len(issues) == MAX_ISSUES:
+            break
         
     return issues
 
@@ -70,6 +58,12 @@ if __name__ == "__main__":
             print(json.dumps({"issues": [], "error": "Text is too short to process"}))
             sys.exit(0)
         
+        # Served by the resident worker when one is running
+        forwarded = worker_client.forward('summarize', {"text": text, "mode": "simple"})
+        if forwarded is not None:
+            print(json.dumps(forwarded[0]))
+            sys.exit(0)
+
         # Process the text with the simple extractor
         issues = simple_extract_issues(text)
         
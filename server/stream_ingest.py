@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Streaming ingestion for ingest_pdf.py --stream.
+Text is read from stdin incrementally (raw text, or NDJSON pages
+{"page": n, "text": "..."} as written by pdf_process.py --stream), chunked
+with the same windows as ingest_pdf.chunk_text, and embedded in fixed-size
+batches. While one batch is being embedded, the previous one is appended to
+the chunk store and to a staging file of vectors on a writer thread, then a
+checkpoint is saved.
+
+Staging files next to the index:
+    <report>.ingest.f32   - float32 vectors of chunks embedded so far
+    <report>.ingest.ids   - int64 chunk store ids of those vectors
+    <report>.ingest.json  - checkpoint {"version", "staged", "dim"}
+The staged vectors are added to the FAISS index once the stream ends, so
+readers keep seeing the previous version until the ingest completes. After a
+crash, re-running with --resume and the same input skips embedding every
+chunk up to the last checkpoint.
+"""
+import os
+import sys
+import json
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from chunk_validation import validate_chunks
+import chunk_store
+import exact_vectors
+import index_policy
+import ingest_pdf
+import query_cache
+
+CHECKPOINT_VERSION = 1
+DEFAULT_BATCH_SIZE = 256
+READ_BLOCK = 65536
+# Staged vectors are added to the index this many rows at a time
+ADD_ROWS = 8192
+
+
+def safe_print_err(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def staging_paths(report, out_dir=chunk_store.INDEX_DIR):
+    base = os.path.join(out_dir, f"{report}.ingest")
+    return f"{base}.f32", f"{base}.ids", f"{base}.json"
+
+
+def discard_staging(report, out_dir=chunk_store.INDEX_DIR):
+    for path in staging_paths(report, out_dir):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def read_raw_text(stream, block_size=READ_BLOCK):
+    return iter(lambda: stream.read(block_size), '')
+
+
+def read_ndjson_pages(stream):
+    """Page texts from NDJSON lines, separated by newlines like pdf_process joins them"""
+    first = True
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            page = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f'line {line_no}: {e}') from e
+        if isinstance(page, dict) and page.get("type", "page") != "page":
+            if page["type"] == "error":
+                raise ValueError(f'line {line_no}: extraction failed: {page.get("error")}')
+            continue  # pdf_process.py --stream metadata/image/end records
+        text = page.get("text", "") if isinstance(page, dict) else page
+        if not isinstance(text, str):
+            raise ValueError(f'line {line_no}: page text is not a string')
+        if not first:
+            yield "\n"
+        first = False
+        yield text
+
+
+def iter_text_chunks(pieces, chunk_size=1000, overlap=200):
+    """
+    Incremental chunk_text: yields the same {"text", "start", "end"} windows for
+    the concatenation of `pieces`, holding only about one chunk of text at a time.
+    """
+    pieces = iter(pieces)
+    buf = ""
+    buf_start = 0  # document offset of buf[0]
+    start = 0
+    exhausted = False
+    while True:
+        # Read past the window end so we know whether the window is the last one
+        while not exhausted and buf_start + len(buf) <= start + chunk_size:
+            piece = next(pieces, None)
+            if piece is None:
+                exhausted = True
+            else:
+                buf += piece
+        known = buf_start + len(buf)
+        if start >= known:
+            break
+        end = min(start + chunk_size, known)
+        yield {"text": buf[start - buf_start:end - buf_start], "start": start, "end": end}
+        if exhausted and end == known:
+            break
+        start = max(0, end - overlap)
+        if start - buf_start > len(buf) // 2:
+            buf = buf[start - buf_start:]
+            buf_start = start
+
+
+def _batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Staging:
+    """Append-only vector staging files plus the checkpoint describing them"""
+
+    def __init__(self, report, out_dir):
+        self.vec_path, self.ids_path, self.checkpoint_path = staging_paths(report, out_dir)
+        self.staged = 0
+        self.dim = None
+
+    def load(self):
+        """Restore from the last checkpoint; rows written after it are cut off. Returns staged ids."""
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return np.zeros(0, dtype='int64')
+        if checkpoint.get("version") != CHECKPOINT_VERSION or not checkpoint.get("dim"):
+            return np.zeros(0, dtype='int64')
+        self.dim = int(checkpoint["dim"])
+        self.staged = int(checkpoint.get("staged", 0))
+        for path, row_bytes in ((self.vec_path, self.dim * 4), (self.ids_path, 8)):
+            with open(path, 'r+b') as f:
+                f.truncate(self.staged * row_bytes)
+        return np.fromfile(self.ids_path, dtype='<i8', count=self.staged)
+
+    def append(self, ids, vectors):
+        for path, data in ((self.vec_path, vectors.astype('<f4').tobytes()),
+                           (self.ids_path, np.asarray(ids, dtype='<i8').tobytes())):
+            with open(path, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        self.staged += len(ids)
+        self.dim = int(vectors.shape[1])
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": CHECKPOINT_VERSION, "staged": self.staged, "dim": self.dim}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def iter_rows(self, rows=ADD_ROWS):
+        """(ids, vectors) slices of everything staged, read through a memory map"""
+        if not self.staged:
+            return
+        vectors = np.memmap(self.vec_path, dtype='<f4', mode='r', shape=(self.staged, self.dim))
+        ids = np.memmap(self.ids_path, dtype='<i8', mode='r', shape=(self.staged,))
+        for start in range(0, self.staged, rows):
+            yield np.array(ids[start:start + rows]), np.array(vectors[start:start + rows])
+        del vectors, ids
+
+
+def stream_ingest(pieces, report, replace=True, batch_size=DEFAULT_BATCH_SIZE, resume=False):
+    """
+    Ingest a document given as an iterable of text pieces, batch by batch.
+    Same result keys and exit codes as ingest_pdf.ingest_text, plus "batches" and "resumed".
+    """
+    out_dir = chunk_store.INDEX_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    index_path = os.path.join(out_dir, f"{report}.index")
+    store = ingest_pdf.open_chunk_store(report, out_dir)
+    staging = Staging(report, out_dir)
+
+    try:
+        if resume:
+            staged_ids = staging.load()
+        else:
+            discard_staging(report, out_dir)
+            staged_ids = np.zeros(0, dtype='int64')
+        # Staged chunks deleted since the checkpoint (e.g. by a regular ingest) must not be indexed
+        dead = np.setdiff1d(staged_ids, store.live_ids())
+        staged_ids = np.setdiff1d(staged_ids, dead)
+        index = ingest_pdf.load_id_index(index_path)
+        existing, drop = ingest_pdf.existing_chunk_hashes(index, store, staged_ids.tolist())
+        drop.extend(dead.tolist())
+    except Exception as e:
+        safe_print_err('FAISS index operation failed:', str(e))
+        safe_print_err(traceback.format_exc())
+        return {"error": "faiss_index_failed", "detail": str(e)}, 5
+    if len(staged_ids):
+        safe_print_err(f'Resuming: {len(staged_ids)} chunks already embedded')
+
+    dim = staging.dim
+    if index is not None and dim is not None and index.d != dim:
+        return {"error": "faiss_index_failed", "detail": f"staged dim {dim} != index dim {index.d}"}, 5
+
+    resumed_ids = set(staged_ids.tolist())
+    seen = set()
+    moved = []
+    rejected = {}
+    counts = {"chunks": 0, "valid": 0, "skipped": 0, "added": 0, "batches": 0}
+    cache_stats = {"hits": 0, "misses": 0}
+
+    def write_batch(chunks, vectors):
+        ids = store.append(chunks)
+        staging.append(ids, vectors)
+        return len(ids)
+
+    # One write in flight: batch k is written while batch k+1 is embedded
+    writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='kilik-ingest-writer')
+    pending = None
+    try:
+        for batch in _batched(iter_text_chunks(pieces), batch_size):
+            counts["batches"] += 1
+            reasons = validate_chunks([chunk['text'] for chunk in batch])
+            new_chunks, new_texts = [], []
+            for i, (chunk, reason) in enumerate(zip(batch, reasons)):
+                if reason is not None:
+                    safe_print_err(f'Skipping chunk {counts["chunks"] + i}: {reason}')
+                    rejected[reason] = rejected.get(reason, 0) + 1
+                    continue
+                counts["valid"] += 1
+                text = chunk['text'].strip()
+                h = ingest_pdf.chunk_hash(text)
+                if h in seen:
+                    counts["skipped"] += 1
+                    continue
+                seen.add(h)
+                known = existing.get(h)
+                if known is not None:
+                    if known["id"] not in resumed_ids:
+                        counts["skipped"] += 1
+                    if ingest_pdf._span(known) != ingest_pdf._span(chunk):
+                        moved.append((known["id"], chunk["start"], chunk["end"]))
+                    continue
+                new_chunks.append(chunk)
+                new_texts.append(text)
+            counts["chunks"] += len(batch)
+            if not new_texts:
+                continue
+
+            embeddings, error = ingest_pdf.embed_texts(new_texts, cache_stats)
+            if error:
+                return error
+            if dim is None:
+                dim = embeddings.shape[1]
+            if embeddings.shape[1] != dim or (index is not None and index.d != dim):
+                detail = f"embedding dim {embeddings.shape[1]} != index dim {index.d if index is not None else dim}"
+                safe_print_err(f'{detail}; run a regular ingest to rebuild the index')
+                return {"error": "faiss_index_failed", "detail": detail}, 5
+
+            if pending is not None:
+                counts["added"] += pending.result()
+            pending = writer.submit(write_batch, new_chunks, embeddings)
+            safe_print_err(f'Batch {counts["batches"]}: {len(new_texts)} new chunks embedded', flush=True)
+
+        if pending is not None:
+            counts["added"] += pending.result()
+            pending = None
+    except ValueError as e:
+        safe_print_err('Failed to read input stream:', str(e))
+        return {"error": "bad_input", "detail": str(e)}, 1
+    except OSError as e:
+        safe_print_err('Failed to write chunk store:', str(e))
+        safe_print_err(traceback.format_exc())
+        return {"error": "meta_write_failed", "detail": str(e)}, 6
+    finally:
+        # Whatever was written is covered by the checkpoint, so a failed ingest can resume
+        if pending is not None:
+            try:
+                pending.result()
+            except Exception as e:
+                safe_print_err('Failed to write last batch:', str(e))
+        writer.shutdown(wait=True)
+
+    if counts["chunks"] == 0:
+        safe_print_err('Chunking produced 0 chunks')
+        return {"error": "no chunks created"}, 1
+    if counts["valid"] == 0:
+        safe_print_err('No valid chunks found after filtering')
+        return {"error": "no valid chunks after filtering", "rejected": rejected}, 1
+    safe_print_err(f'{counts["valid"]} valid chunks (filtered from {counts["chunks"]} total) in {counts["batches"]} batches')
+
+    stale = [c["id"] for h, c in existing.items() if h not in seen] if replace else []
+    removed = stale + drop
+    removed_ids = np.asarray(removed, dtype='int64')
+    added = 0
+    try:
+        if moved:
+            ids, starts, ends = zip(*moved)
+            # Streamed chunks carry no page numbers
+            store.set_spans(ids, starts, ends, [(None, None)] * len(ids))
+    except Exception as e:
+        safe_print_err('Failed to write chunk store:', str(e))
+        return {"error": "meta_write_failed", "detail": str(e)}, 6
+
+    policy = index_policy.Policy.for_report(report)
+    exact = exact_vectors.ExactVectors(report, out_dir) if policy.rerank else None
+    try:
+        if exact is not None and index is not None:
+            index_policy.backfill_exact(index, exact)
+        if index is None and staging.staged:
+            index = index_policy.new_index(staging.dim)
+        for ids, vectors in staging.iter_rows():
+            keep = ~np.isin(ids, removed_ids)
+            vectors = index_policy.normalize(vectors[keep])
+            if exact is not None:
+                exact.write(ids[keep], vectors)
+            index = index_policy.add_vectors(index, vectors, ids[keep], policy)
+            added += len(ids[keep])
+        if removed and index is not None:
+            index = index_policy.remove_vectors(index, removed_ids, policy, exact)
+        changed = bool(added or removed)
+        if index is not None:
+            before = index_policy.describe(index)
+            index = index_policy.apply(index, policy, exact)
+            changed = changed or index_policy.describe(index) != before
+        if changed:
+            ingest_pdf.write_index_atomic(index, index_path)
+    except Exception as e:
+        safe_print_err('FAISS index operation failed:', str(e))
+        safe_print_err(traceback.format_exc())
+        return {"error": "faiss_index_failed", "detail": str(e)}, 5
+
+    try:
+        store.delete(removed)
+        store.close()
+    except Exception as e:
+        safe_print_err('Failed to mark stale chunks in chunk store:', str(e))
+    discard_staging(report, out_dir)
+
+    if changed:
+        query_cache.invalidate_report(report)
+
+    result = {"added": added, "skipped": counts["skipped"], "removed": len(stale),
+              "rejected": rejected, "total": index.ntotal if index is not None else 0,
+              "index_path": index_path, "chunks_path": store.table_path,
+              "batches": counts["batches"], "resumed": int(len(staged_ids))}
+    lookups = cache_stats["hits"] + cache_stats["misses"]
+    result["embedding_cache"] = dict(cache_stats, hit_ratio=round(cache_stats["hits"] / lookups, 4) if lookups else 0.0)
+    return result, 0
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Structure-aware chunker. Instead of fixed 1000-character windows with 200
+characters of overlap (ingest_pdf.chunk_text), whole paragraphs are packed
+into chunks of up to KILIK_CHUNK_TOKENS tokens. Paragraphs are the text blocks
+PyMuPDF reports (pdf_process.py --structure), or blank-line separated
+paragraphs for plain text. A paragraph that is too long on its own, or that
+would otherwise leave a chunk less than half full, is split between
+sentences. Consecutive chunks share at most the last sentence of the
+previous chunk (KILIK_CHUNK_OVERLAP_TOKENS), so little text is embedded twice. Every chunk is an exact [start, end) span of the document text and
+records the pages it covers.
+
+    KILIK_CHUNK_TOKENS           chunk size (256, about the fixed chunker's 1000 characters)
+    KILIK_CHUNK_OVERLAP_TOKENS   longest sentence repeated at the next chunk's start (32)
+
+Benchmark against the fixed chunker (chunk count, embedding time, hit rate
+of sentences drawn from the document used as queries):
+    python structured_chunker.py benchmark <file.pdf> [--queries 200] [--k 5]
+"""
+import argparse
+import bisect
+import json
+import os
+import random
+import re
+import sys
+import time
+from collections import deque
+
+from context_packer import estimate_tokens
+
+CHUNK_TOKENS = int(os.environ.get('KILIK_CHUNK_TOKENS', '256'))
+OVERLAP_TOKENS = int(os.environ.get('KILIK_CHUNK_OVERLAP_TOKENS', '32'))
+# context_packer.estimate_tokens counts 4 characters per token
+CHARS_PER_TOKEN = 4
+
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def text_units(text, blocks=None):
+    """(start, end, page) of every paragraph, in document order"""
+    units = []
+    if blocks:
+        for start, end, page in sorted(blocks):
+            if end > start and text[start:end].strip():
+                units.append((start, end, page))
+        return units
+    start = 0
+    for m in PARAGRAPH_BREAK.finditer(text):
+        if text[start:m.start()].strip():
+            units.append((start, m.start(), None))
+        start = m.end()
+    if text[start:].strip():
+        units.append((start, len(text), None))
+    return units
+
+
+def split_unit(text, start, end, page, max_chars):
+    """Split a paragraph longer than max_chars between sentences (or, failing that, words)"""
+    pieces = []
+    cursor = start
+    for m in SENTENCE_END.finditer(text, start, end):
+        if m.start() > cursor:
+            pieces.append((cursor, m.start()))
+        cursor = m.end()
+    if cursor < end:
+        pieces.append((cursor, end))
+    units = []
+    for s, e in pieces:
+        while e - s > max_chars:
+            cut = text.rfind(' ', s + 1, s + max_chars)
+            cut = cut if cut > s + max_chars // 2 else s + max_chars
+            units.append((s, cut, page))
+            s = cut
+            while s < e and text[s].isspace():
+                s += 1
+        if e > s:
+            units.append((s, e, page))
+    return units
+
+
+def _overlap_start(text, start, end, overlap_chars):
+    """Start of the last sentence of text[start:end] if it is at most overlap_chars long"""
+    last = None
+    for m in SENTENCE_END.finditer(text, max(start + 1, end - overlap_chars), end):
+        last = m.end()
+    return last if last is not None and last < end else None
+
+
+def chunk_structured(text, blocks=None, max_tokens=None, overlap_tokens=None):
+    """
+    Chunks {"text", "start", "end"[, "page", "page_end"]} packing whole
+    paragraphs up to max_tokens; blocks are [start, end, page] paragraph spans
+    from pdf_process.process_pdf(structure=True).
+    """
+    max_chars = (max_tokens or CHUNK_TOKENS) * CHARS_PER_TOKEN
+    overlap_chars = (OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens) * CHARS_PER_TOKEN
+    units = []
+    for start, end, page in text_units(text, blocks):
+        if end - start > max_chars:
+            units.extend(split_unit(text, start, end, page, max_chars))
+        else:
+            units.append((start, end, page))
+    if not units:
+        return []
+    unit_starts = [u[0] for u in units]
+
+    def page_at(offset):
+        return units[max(0, bisect.bisect_right(unit_starts, offset) - 1)][2]
+
+    chunks = []
+
+    def emit(start, end):
+        chunk = {"text": text[start:end], "start": start, "end": end}
+        page = page_at(start)
+        if page is not None:
+            chunk["page"] = page
+            chunk["page_end"] = page_at(end - 1)
+        chunks.append(chunk)
+
+    current_start = current_end = None
+    pending = deque(units)
+    while pending:
+        start, end, page = pending.popleft()
+        if current_start is not None and end - current_start > max_chars:
+            if current_end - current_start < max_chars // 2:
+                # Mostly empty chunk: take the paragraph's leading sentences rather than cut here
+                sentences = split_unit(text, start, end, page, max_chars)
+                if len(sentences) > 1 and sentences[0][1] - current_start <= max_chars:
+                    pending.extendleft(reversed(sentences))
+                    continue
+            emit(current_start, current_end)
+            overlap = _overlap_start(text, current_start, current_end, overlap_chars) if overlap_chars else None
+            current_start = overlap if overlap is not None and end - overlap <= max_chars else None
+        if current_start is None:
+            current_start = start
+        current_end = end
+    emit(current_start, current_end)
+    return chunks
+
+
+def _coverage(chunks):
+    """Characters of the document covered by at least one chunk"""
+    covered = 0
+    reach = 0
+    for chunk in sorted(chunks, key=lambda c: c["start"]):
+        if chunk["end"] > reach:
+            covered += chunk["end"] - max(chunk["start"], reach)
+            reach = chunk["end"]
+    return covered
+
+
+def benchmark(pdf_path, queries=200, k=5, seed=0):
+    """Fixed vs structured chunking of one PDF: chunk count, embedding time, hit rate"""
+    import faiss
+    import numpy as np
+    import pdf_process
+    from embeddings import get_model
+    from ingest_pdf import chunk_text
+
+    t0 = time.perf_counter()
+    extracted = pdf_process.process_pdf(pdf_path, structure=True, use_cache=False)
+    if extracted.get("error"):
+        raise RuntimeError(extracted["error"])
+    text = extracted["text"]
+    extract_s = time.perf_counter() - t0
+
+    # Queries: sentences of the document; a hit is a top-k chunk that contains the whole sentence
+    rng = random.Random(seed)
+    sentences = []
+    for unit_start, unit_end, _ in text_units(text, extracted["blocks"]):
+        for s, e, _ in split_unit(text, unit_start, unit_end, None, 10 ** 9):
+            if len(text[s:e].split()) >= 8:
+                sentences.append((s, e))
+    sample = rng.sample(sentences, min(queries, len(sentences)))
+    model = get_model()
+    query_vectors = model.encode([text[s:e] for s, e in sample], show_progress_bar=False, convert_to_numpy=True)
+    query_vectors = np.asarray(query_vectors, dtype='float32')
+    faiss.normalize_L2(query_vectors)
+
+    report = {"pdf": pdf_path, "pages": extracted["metadata"].get("pageCount"), "chars": len(text),
+              "blocks": len(extracted["blocks"]), "extract_s": round(extract_s, 3), "queries": len(sample)}
+    for name, chunker in (("fixed", lambda: chunk_text(text)),
+                          ("structured", lambda: chunk_structured(text, extracted["blocks"]))):
+        t0 = time.perf_counter()
+        chunks = [c for c in chunker() if c["text"].strip()]
+        chunk_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        vectors = model.encode([c["text"].strip() for c in chunks], show_progress_bar=False, convert_to_numpy=True)
+        embed_s = time.perf_counter() - t0
+        vectors = np.asarray(vectors, dtype='float32')
+        faiss.normalize_L2(vectors)
+        index = faiss.IndexFlatIP(vectors.shape[1])
+        index.add(vectors)
+        _, found = index.search(query_vectors, k)
+        hit1 = hitk = 0
+        for (s, e), row in zip(sample, found):
+            contains = [i >= 0 and chunks[i]["start"] <= s and e <= chunks[i]["end"] for i in row]
+            hit1 += contains[0]
+            hitk += any(contains)
+        embedded = sum(len(c["text"]) for c in chunks)
+        report[name] = {
+            "chunks": len(chunks),
+            "embedded_chars": embedded,
+            "redundant_chars": embedded - _coverage(chunks),
+            "mean_tokens": round(sum(estimate_tokens(c["text"]) for c in chunks) / max(1, len(chunks)), 1),
+            "chunk_ms": round(chunk_s * 1000, 1),
+            "embed_s": round(embed_s, 3),
+            "hit@1": round(hit1 / max(1, len(sample)), 3),
+            f"hit@{k}": round(hitk / max(1, len(sample)), 3),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Structure-aware chunker tools')
+    sub = parser.add_subparsers(dest='command', required=True)
+    bench = sub.add_parser('benchmark', help='Compare with the fixed-window chunker on a PDF')
+    bench.add_argument('pdf')
+    bench.add_argument('--queries', type=int, default=200)
+    bench.add_argument('--k', type=int, default=5)
+    args = parser.parse_args()
+    if args.command == 'benchmark':
+        print(json.dumps(benchmark(args.pdf, args.queries, args.k), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
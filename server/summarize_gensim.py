@@ -1,26 +1,46 @@
 #!/usr/bin/env python3
+# Extractive summary of {"text"[, "sentences": 3][, "engine": "lsa" | "sumy"]} on stdin.
+# The default engine is the sparse term-frequency + truncated SVD summarizer in
+# lsa_summarizer.py, which handles long reports; "sumy" runs sumy's
+# LsaSummarizer (dense matrix, full SVD) on the whole document as before.
+# Forwarded to the resident worker (worker.py) when KILIK_WORKER_ADDRESS is set.
 import sys
 import json
-from sumy.parsers.plaintext import PlaintextParser
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.summarizers.lsa import LsaSummarizer
 
-def main():
-    input_data = sys.stdin.read()
+import worker_client
+
+def summarize(data):
+    """{"summary"[, "error"]} for the request object read from stdin"""
     try:
-        data = json.loads(input_data)
         text = data.get('text', '')
         if not text or len(text.split()) < 30:
-            print(json.dumps({'summary': '', 'error': 'Text too short for summarization'}))
-            return
-        parser = PlaintextParser.from_string(text, Tokenizer("english"))
-        summarizer = LsaSummarizer()
+            return {'summary': '', 'error': 'Text too short for summarization'}
         # Summarize to 3 sentences or less if text is short
-        summary_sentences = summarizer(parser.document, 3)
-        summary = " ".join(str(sentence) for sentence in summary_sentences)
-        print(json.dumps({'summary': summary}))
+        count = int(data.get('sentences') or 3)
+        if data.get('engine') == 'sumy':
+            from sumy.parsers.plaintext import PlaintextParser
+            from sumy.nlp.tokenizers import Tokenizer
+            from sumy.summarizers.lsa import LsaSummarizer
+            parser = PlaintextParser.from_string(text, Tokenizer("english"))
+            summarizer = LsaSummarizer()
+            summary_sentences = [str(sentence) for sentence in summarizer(parser.document, count)]
+        else:
+            from lsa_summarizer import summarize as lsa_summarize
+            summary_sentences, _ = lsa_summarize(text, count)
+        return {'summary': " ".join(summary_sentences)}
+    except Exception as e:
+        return {'summary': '', 'error': str(e)}
+
+def main():
+    input_data = sys.stdin.read()
+    try:
+        data = json.loads(input_data)
     except Exception as e:
         print(json.dumps({'summary': '', 'error': str(e)}))
+        return
+    forwarded = worker_client.forward('extractive_summary', data)
+    result = forwarded[0] if forwarded is not None else summarize(data)
+    print(json.dumps(result))
 
 if __name__ == '__main__':
     main()
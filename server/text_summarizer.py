@@ -1,164 +1,465 @@
 #!/usr/bin/env python3
+"""
+Issue extraction for inspection reports with NLTK sentence and word
+tokenization.
+
+NLTK is imported and its resources (Punkt tokenizer, stopwords) are loaded
+once per process, on first use, from the local nltk_data directories; nothing
+is downloaded while serving requests. When NLTK or a resource is missing, the
+regex sentence splitter and word tokenizer are used instead, so offline hosts
+still get results. Download the resources ahead of time with:
+    python text_summarizer.py --warmup [--no-download]
+which also measures the startup time of a fresh process against
+KILIK_SUMMARIZER_STARTUP_MS (2500) and exits 1 when it is over budget. The
+resident worker (worker.py) loads everything once at startup, and a
+single-report run is forwarded to it when KILIK_WORKER_ADDRESS is set.
+
+Many reports in one process (e.g. nightly re-analysis), NDJSON {"id", "text"}
+in and {"id", "issues"[, "error"]} out, one line per report:
+    python text_summarizer.py --batch < reports.ndjson
+
+Reports of KILIK_SUMMARIZER_PARALLEL_MIN_SENTENCES (20000) sentences or more
+are split into sentence shards that a process pool tokenizes, classifies and
+counts; word counts are merged and the top issues picked as in the serial
+path, so the output is identical. The pool is started once per process and
+never resized: KILIK_SUMMARIZER_WORKERS (or --workers) sets its size, 0 = one
+process per core, 1 = serial. A request's "workers" only sets how many
+processes its report is sharded for, capped at the pool size, so concurrent
+requests in the resident worker share the pool. Scaling benchmark, which
+also checks that concurrent requests get the serial result:
+    python text_summarizer.py --benchmark [report.txt] [--sentences 40000]
+"""
+import argparse
 import re
 import os
 import sys
 import json
-import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.corpus import stopwords
-from nltk.probability import FreqDist
+import subprocess
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
 from heapq import nlargest
 
-def extract_issues(text):
+import worker_client
+from issue_classifier import get_classifier
+
+NLTK_DATA_PATH = os.path.expanduser('~/nltk_data')
+# Importing NLTK alone takes about 1.5s (it pulls in scipy)
+STARTUP_BUDGET_MS = float(os.environ.get('KILIK_SUMMARIZER_STARTUP_MS', '2500'))
+# punkt_tab is what NLTK >= 3.8.2 loads; older releases use the punkt pickle
+NLTK_RESOURCES = ("punkt_tab", "punkt", "stopwords")
+
+# Longer reports are cut down to their highest-scoring issues
+MAX_ISSUES = 20
+# Pool processes for long reports: 0 = one per core, 1 = serial
+SUMMARIZER_WORKERS = int(os.environ.get('KILIK_SUMMARIZER_WORKERS', '0'))
+PARALLEL_MIN_SENTENCES = int(os.environ.get('KILIK_SUMMARIZER_PARALLEL_MIN_SENTENCES', '20000'))
+# Fewer sentences per process than this are not worth the pickling
+MIN_SENTENCES_PER_WORKER = 2000
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+WORD = re.compile(r"\w+(?:'\w+)?|[^\w\s]")
+
+# Fallback stopwords if NLTK data isn't properly loaded
+FALLBACK_STOPWORDS = frozenset([
+    'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', 'your', 'yours', 'yourself',
+    'yourselves', 'he', 'him', 'his', 'himself', 'she', 'her', 'hers', 'herself', 'it', 'its', 'itself',
+    'they', 'them', 'their', 'theirs', 'themselves', 'what', 'which', 'who', 'whom', 'this', 'that',
+    'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had',
+    'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the', 'and', 'but', 'if', 'or', 'because', 'as',
+    'until', 'while', 'of', 'at', 'by', 'for', 'with', 'about', 'against', 'between', 'into', 'through',
+    'during', 'before', 'after', 'above', 'below', 'to', 'from', 'up', 'down', 'in', 'out', 'on', 'off',
+    'over', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when', 'where', 'why', 'how',
+    'all', 'any', 'both', 'each', 'few', 'more', 'most', 'other', 'some', 'such', 'no', 'nor', 'not',
+    'only', 'own', 'same', 'so', 'than', 'too', 'very', 's', 't', 'can', 'will', 'just', 'don', 'should',
+    'now'
+])
+
+
+def safe_print_err(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+class Resources:
+    """Tokenizers and stopwords, NLTK's when available and regex-based otherwise"""
+
+    def __init__(self):
+        started = time.perf_counter()
+        self.sentence_tokenizer = None
+        self.word_tokenizer = None
+        self.stopwords = FALLBACK_STOPWORDS
+        self.missing = []
+        try:
+            import nltk
+        except ImportError:
+            nltk = None
+            self.missing.append("nltk")
+        if nltk is not None:
+            if NLTK_DATA_PATH not in nltk.data.path:
+                nltk.data.path.append(NLTK_DATA_PATH)
+            try:
+                self.sentence_tokenizer = _load_punkt(nltk)
+                from nltk.tokenize import NLTKWordTokenizer
+                self.word_tokenizer = NLTKWordTokenizer()
+            except LookupError:
+                self.missing.append("punkt")
+            try:
+                from nltk.corpus import stopwords
+                self.stopwords = frozenset(stopwords.words('english'))
+            except LookupError:
+                self.missing.append("stopwords")
+        self.tokenizer = "punkt" if self.sentence_tokenizer is not None else "regex"
+        self.load_ms = round((time.perf_counter() - started) * 1000, 1)
+        if self.missing:
+            safe_print_err(f"NLTK resources unavailable ({', '.join(self.missing)}), "
+                           f"using the regex tokenizer; run text_summarizer.py --warmup to install them")
+
+    def sentences(self, text):
+        if self.sentence_tokenizer is not None:
+            return self.sentence_tokenizer.tokenize(text)
+        return [s for s in SENTENCE_END.split(text) if s.strip()]
+
+    def words(self, text):
+        """word_tokenize: words of every sentence"""
+        if self.word_tokenizer is not None:
+            return [word for sentence in self.sentences(text) for word in self.word_tokenizer.tokenize(sentence)]
+        return WORD.findall(text)
+
+
+def _load_punkt(nltk):
+    try:
+        from nltk.tokenize.punkt import PunktTokenizer
+    except ImportError:
+        return nltk.data.load('tokenizers/punkt/english.pickle')
+    return PunktTokenizer('english')
+
+
+_resources = None
+_resources_lock = threading.Lock()
+
+
+def get_resources():
+    """Resources loaded once per process"""
+    global _resources
+    with _resources_lock:
+        if _resources is None:
+            _resources = Resources()
+        return _resources
+
+
+def warmup(download=True):
     """
-    Extract issues from inspection report text and categorize them
-    using keyword-based extraction and simple heuristics.
+    Download missing NLTK resources into ~/nltk_data (when online) and load
+    everything; returns a report with the load time against the startup budget
     """
+    global _resources
+    started = time.perf_counter()
+    downloaded = {}
+    if download:
+        try:
+            import nltk
+            os.makedirs(NLTK_DATA_PATH, exist_ok=True)
+            for name in NLTK_RESOURCES:
+                downloaded[name] = bool(nltk.download(name, download_dir=NLTK_DATA_PATH, quiet=True,
+                                                      raise_on_error=False))
+        except Exception as e:
+            safe_print_err(f"NLTK download warning: {str(e)}")
+    with _resources_lock:
+        _resources = None
+    download_ms = round((time.perf_counter() - started) * 1000, 1)
+    resources = get_resources()
+    startup_ms = startup_time()
+    return {
+        "tokenizer": resources.tokenizer,
+        "stopwords": len(resources.stopwords),
+        "missing": resources.missing,
+        "downloaded": downloaded,
+        "download_ms": download_ms,
+        "startup_ms": startup_ms,
+        "budget_ms": STARTUP_BUDGET_MS,
+        "within_budget": startup_ms is not None and startup_ms <= STARTUP_BUDGET_MS,
+    }
+
+
+def startup_time():
+    """
+    Milliseconds a fresh interpreter takes to import this module and load its
+    resources (importing NLTK dominates), which is what a spawned summarize call
+    pays on top of the work itself
+    """
+    code = ("import time; started = time.perf_counter(); import text_summarizer; "
+            "text_summarizer.get_resources(); print((time.perf_counter() - started) * 1000)")
     try:
-        # Download necessary NLTK data - specify download directory to ensure accessibility
-        nltk_data_path = os.path.expanduser('~/nltk_data')
-        os.makedirs(nltk_data_path, exist_ok=True)
-        nltk.data.path.append(nltk_data_path)
-        
-        nltk.download('punkt', download_dir=nltk_data_path, quiet=False)
-        nltk.download('stopwords', download_dir=nltk_data_path, quiet=False)
-    except Exception as e:
-        print(f"NLTK download warning: {str(e)}", file=sys.stderr)
-        # Continue anyway - the resources might already be available elsewhere
-    
-    # Define keyword patterns for major and minor issues
-    major_keywords = [
-        r'\b(?:significant|major|serious|critical|severe|hazardous|dangerous|safety concern|'
-        r'immediate attention|structural|foundation|electrical hazard|fire hazard|health hazard|'
-        r'water damage|mold|asbestos|lead|code violation)\b'
-    ]
-    
-    minor_keywords = [
-        r'\b(?:minor|cosmetic|aesthetic|small|slight|minimal|maintenance|recommend|consider|'
-        r'monitor|observe|note|paint|clean|adjust|tighten|caulk)\b'
-    ]
-    
-    # Split text into sentences
-    sentences = sent_tokenize(text)
-    
-    # Identify potential issue sentences (those that contain problems or recommendations)
-    issue_indicators = [
-        r'\b(?:issue|problem|damage|defect|concern|attention|repair|replace|fix|broken|'
-        r'cracked|leaking|missing|failing|inadequate|improper|deteriorating|worn|loose|recommendation)\b'
-    ]
-    
-    # Combine all patterns
-    issue_pattern = re.compile('|'.join(issue_indicators), re.IGNORECASE)
-    major_pattern = re.compile('|'.join(major_keywords), re.IGNORECASE)
-    minor_pattern = re.compile('|'.join(minor_keywords), re.IGNORECASE)
-    
-    # Extract and categorize issues
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=60,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return round(float(out.stdout.strip()), 1)
+    except (subprocess.SubprocessError, ValueError) as e:
+        safe_print_err(f"Could not measure startup time: {e}")
+        return None
+
+
+def analyze_sentences(sentences, base=0):
+    """
+    Classify, title and tokenize a run of sentences (a whole report, or one
+    shard of it in a pool process). Returns the issues as (sentence index,
+    issue, lowercased words) and the frequencies of non-stopwords.
+    """
+    resources = get_resources()
+    stop_words = resources.stopwords
+
+    # Issue, major and minor keywords are matched in one pass (issue_classifier.py)
+    classifier = get_classifier()
+
     issues = []
-    
-    for sentence in sentences:
-        # Skip if sentence doesn't indicate an issue
-        if not issue_pattern.search(sentence):
+    freq = Counter()
+    for offset, sentence in enumerate(sentences):
+        # Each sentence is split into words once, for the title and the scores
+        words = resources.words(sentence)
+        lowered = [word.lower() for word in words]
+        freq.update(word for word in lowered if word.isalnum() and word not in stop_words)
+
+        # Skip if sentence doesn't indicate an issue; major keywords make it Major
+        severity = classifier.severity(sentence)
+        if severity is None:
             continue
-        
-        # Determine severity based on keywords
-        severity = "Minor"  # Default
-        if major_pattern.search(sentence):
-            severity = "Major"
-        elif minor_pattern.search(sentence) or len(sentence) < 100:  # Short sentences about issues are often minor
-            severity = "Minor"
-            
+
         # Extract a meaningful title (first 5-7 words or use key phrases)
-        words = word_tokenize(sentence)
         title_words = words[:min(7, len(words))]
         issue_title = " ".join(title_words)
         if len(issue_title) > 50:
             issue_title = issue_title[:50] + "..."
-            
-        # Add to issues list
-        issues.append({
+
+        issues.append((base + offset, {
             "issue": issue_title,
             "severity": severity,
             "description": sentence.strip()
-        })
-      # Limit to most relevant issues (based on sentence scores)
-    if len(issues) > 20:
-        # Create a simplified summary to get most important sentences
-        try:
-            stop_words = set(stopwords.words('english'))
-        except:
-            # Fallback stopwords if NLTK data isn't properly loaded
-            stop_words = set(['i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', 'your', 'yours', 
-                             'yourself', 'yourselves', 'he', 'him', 'his', 'himself', 'she', 'her', 'hers', 
-                             'herself', 'it', 'its', 'itself', 'they', 'them', 'their', 'theirs', 'themselves', 
-                             'what', 'which', 'who', 'whom', 'this', 'that', 'these', 'those', 'am', 'is', 'are', 
-                             'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'having', 'do', 'does', 
-                             'did', 'doing', 'a', 'an', 'the', 'and', 'but', 'if', 'or', 'because', 'as', 'until', 
-                             'while', 'of', 'at', 'by', 'for', 'with', 'about', 'against', 'between', 'into', 
-                             'through', 'during', 'before', 'after', 'above', 'below', 'to', 'from', 'up', 'down', 
-                             'in', 'out', 'on', 'off', 'over', 'under', 'again', 'further', 'then', 'once', 'here', 
-                             'there', 'when', 'where', 'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 
-                             'most', 'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so', 
-                             'than', 'too', 'very', 's', 't', 'can', 'will', 'just', 'don', 'should', 'now'])
-            
-        word_tokens = word_tokenize(text.lower())
-        filtered_words = [word for word in word_tokens if word.isalnum() and word not in stop_words]
-        
-        # Calculate word frequencies
-        freq = FreqDist(filtered_words)
-        
-        # Score sentences based on word frequencies
-        sentence_scores = {}
-        for issue in issues:
-            sentence = issue["description"]
-            score = 0
-            for word in word_tokenize(sentence.lower()):
-                if word in freq:
-                    score += freq[word]
-            sentence_scores[sentence] = score
-        
-        # Get top 20 issues
-        top_sentences = nlargest(20, sentence_scores, key=sentence_scores.get)
-        issues = [issue for issue in issues if issue["description"] in top_sentences]
-    
+        }, lowered))
+    return issues, freq
+
+
+def extract_issues(text, workers=None):
+    """
+    Extract issues from inspection report text and categorize them
+    using keyword-based extraction and simple heuristics.
+    Long reports are analyzed in sentence shards on a process pool
+    (KILIK_SUMMARIZER_WORKERS); the result is the same as the serial one.
+    """
+    sentences = get_resources().sentences(text)
+    workers = choose_workers(len(sentences), workers)
+    if workers > 1:
+        shards = sentence_shards(len(sentences), workers)
+        parts = list(summarizer_pool().map(analyze_sentences, [sentences[a:b] for a, b in shards],
+                                           [a for a, _ in shards]))
+    else:
+        parts = [analyze_sentences(sentences)]
+
+    # Merge shards in order: issues in report order, word counts summed
+    found = []
+    freq = Counter()
+    for shard_issues, shard_freq in parts:
+        found.extend(shard_issues)
+        freq.update(shard_freq)
+    issues = [issue for _, issue, _ in found]
+
+    # Limit to most relevant issues: sentences whose words are frequent in the whole report
+    if len(issues) > MAX_ISSUES:
+        scores = [sum(freq[word] for word in lowered if word in freq) for _, _, lowered in found]
+
+        # Keep the top issues in report order; ties go to the earlier sentence
+        top = set(nlargest(MAX_ISSUES, range(len(issues)), key=scores.__getitem__))
+        issues = [issue for i, issue in enumerate(issues) if i in top]
+
     return issues
 
-if __name__ == "__main__":
+
+def pool_size():
+    """Processes of the summarizer pool: KILIK_SUMMARIZER_WORKERS (or --workers), else one per core"""
+    return SUMMARIZER_WORKERS if SUMMARIZER_WORKERS >= 1 else (os.cpu_count() or 1)
+
+
+def choose_workers(sentence_count, workers=None):
+    """
+    Pool processes a report is sharded for. Automatic (0): one per pool
+    process from PARALLEL_MIN_SENTENCES sentences, serial below that; an
+    explicit count is capped at the pool size
+    """
+    workers = SUMMARIZER_WORKERS if workers is None else int(workers)
+    size = pool_size()
+    if workers == 1 or size < 2 or sentence_count < 2:
+        return 1
+    if workers <= 0:
+        if sentence_count < PARALLEL_MIN_SENTENCES:
+            return 1
+        return max(1, min(size, sentence_count // MIN_SENTENCES_PER_WORKER))
+    return min(workers, size, sentence_count)
+
+
+def sentence_shards(sentence_count, workers):
+    """Contiguous [start, stop) sentence ranges, two per worker so a slow shard does not hold up the pool"""
+    parts = min(sentence_count, workers * 2)
+    size, extra = divmod(sentence_count, parts)
+    shards = []
+    start = 0
+    for i in range(parts):
+        stop = start + size + (1 if i < extra else 0)
+        shards.append((start, stop))
+        start = stop
+    return shards
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def summarizer_pool():
+    """
+    Process pool of pool_size() processes, started on first use and kept for
+    the life of the process (batch mode and the resident worker reuse it), so
+    each pool process imports NLTK and loads its data only once
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the resident worker process has threads, which fork does not mix with
+            _pool = ProcessPoolExecutor(max_workers=pool_size(), mp_context=get_context('spawn'),
+                                        initializer=get_resources)
+        return _pool
+
+
+def run_batch(stream, out, workers=None):
+    """
+    Summarize NDJSON reports {"id", "text"} from stream, writing one
+    {"id", "issues"[, "error"]} line per report as it finishes
+    """
+    failed = 0
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        report_id = None
+        try:
+            report = json.loads(line)
+            report_id = report.get("id", line_no)
+            text = report.get("text") or ""
+            if len(text.strip()) < 10:
+                result = {"id": report_id, "issues": [], "error": "Text is too short to process"}
+            else:
+                result = {"id": report_id, "issues": extract_issues(text, workers)}
+        except Exception as e:
+            failed += 1
+            safe_print_err(f"Error summarizing report on line {line_no}: {str(e)}")
+            result = {"id": report_id if report_id is not None else line_no, "issues": [], "error": str(e)}
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+    return failed
+
+def benchmark(text=None, sentences=40000, worker_counts=(1, 2, 4, 8), threads=4):
+    """
+    Time extract_issues by worker count on a report (default: synthetic) and
+    check every result matches the serial one. "cold_s" of the first parallel
+    run includes starting the pool, which imports NLTK in every process;
+    "warm_s" reuses it. Then `threads` requests with mixed worker counts run
+    at once, as in the resident worker, and must all get the serial result.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    if text is None:
+        from issue_classifier import _synthetic_sentences
+        text = " ".join(_synthetic_sentences(sentences))
+    resources = get_resources()
+    sentence_count = len(resources.sentences(text))
+    report = {"chars": len(text), "sentences": sentence_count, "tokenizer": resources.tokenizer,
+              "cores": os.cpu_count() or 1, "pool_size": pool_size(), "runs": []}
+    baseline = None
+    for count in worker_counts:
+        started = time.perf_counter()
+        issues = extract_issues(text, workers=count)
+        cold = time.perf_counter() - started
+        started = time.perf_counter()
+        issues = extract_issues(text, workers=count)
+        warm = time.perf_counter() - started
+        if baseline is None:
+            baseline = (issues, warm)
+        report["runs"].append({"workers": count, "sharded_for": choose_workers(sentence_count, count),
+                               "cold_s": round(cold, 3), "warm_s": round(warm, 3),
+                               "speedup": round(baseline[1] / warm, 2) if warm else None,
+                               "identical": issues == baseline[0]})
+
+    counts = [worker_counts[i % len(worker_counts)] for i in range(threads)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as requests:
+        futures = [requests.submit(extract_issues, text, count) for count in counts]
+    results, errors = [], []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            errors.append(repr(e))
+    report["concurrent"] = {"threads": threads, "workers": counts,
+                            "seconds": round(time.perf_counter() - started, 3), "errors": errors,
+                            "identical": not errors and all(issues == baseline[0] for issues in results)}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract issues from inspection report text on stdin')
+    parser.add_argument('--batch', action='store_true', help='NDJSON reports {"id", "text"} in, one result line out each')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Pool processes for long reports (0 = one per core, 1 = serial; default KILIK_SUMMARIZER_WORKERS)')
+    parser.add_argument('--warmup', action='store_true', help='Download and load NLTK resources, check startup time')
+    parser.add_argument('--no-download', action='store_true', help='With --warmup, only load what is installed')
+    parser.add_argument('--benchmark', nargs='?', const='', default=None, metavar='FILE',
+                        help='Time 1/2/4/8 workers on a report text file (default: synthetic report)')
+    parser.add_argument('--sentences', type=int, default=40000, help='Sentences of the synthetic benchmark report')
+    args = parser.parse_args()
+
+    global SUMMARIZER_WORKERS
+    if args.benchmark is not None:
+        text = None
+        if args.benchmark:
+            with open(args.benchmark, 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read()
+        counts = (1, 2, 4, 8) if args.workers is None else tuple(sorted({1, args.workers}))
+        # A pool big enough for the largest count, even on fewer cores
+        SUMMARIZER_WORKERS = max(counts)
+        report = benchmark(text, args.sentences, counts)
+        print(json.dumps(report, indent=2))
+        return 0 if report["concurrent"]["identical"] and all(run["identical"] for run in report["runs"]) else 1
+    if args.workers is not None:
+        # The pool this process starts is sized by --workers
+        SUMMARIZER_WORKERS = args.workers
+    if args.batch:
+        run_batch(sys.stdin, sys.stdout, args.workers)
+        return 0
+    if args.warmup:
+        report = warmup(download=not args.no_download)
+        print(json.dumps(report))
+        return 0 if report["within_budget"] else 1
     try:
         # Read input text from stdin
         text = sys.stdin.read()
-        
+
         if not text or len(text.strip()) < 10:
             print(json.dumps({"issues": [], "error": "Text is too short to process"}))
-            sys.exit(0)
-            
-        try:
-            # Try a simple test to make sure NLTK is working properly
-            test_sentence = "This is a test sentence for NLTK tokenization."
-            tokens = word_tokenize(test_sentence)
-            if not tokens:
-                raise Exception("NLTK tokenization failed")
-        except Exception as nltk_error:
-            sys.stderr.write(f"NLTK initialization error: {str(nltk_error)}\n")
-            
-            # Try to download resources one more time with more explicit config
-            try:
-                nltk.download('punkt')
-                nltk.download('stopwords')
-            except:
-                pass
-        
+            return 0
+
+        # Served by the resident worker when one is running (NLTK already loaded)
+        forwarded = worker_client.forward('summarize', {"text": text, "workers": args.workers})
+        if forwarded is not None:
+            print(json.dumps(forwarded[0]))
+            return 0
+
         # Process the text
-        issues = extract_issues(text)
-        
+        issues = extract_issues(text, args.workers)
+
         # Output JSON to stdout
         print(json.dumps({"issues": issues}))
     except Exception as e:
         # Handle exceptions and return error message
         error_msg = str(e)
         sys.stderr.write(f"Error during text summarization: {error_msg}\n")
-        
-        # If it's an NLTK resource error, provide more helpful message
-        if "Resource" in error_msg and "not found" in error_msg:
-            error_msg = "NLTK resource error: Please ensure NLTK data is properly installed. " + error_msg
-        
         print(json.dumps({"issues": [], "error": error_msg}))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
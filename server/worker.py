@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Long-lived worker that keeps the embedding model and recently used FAISS
+indexes resident, so ingest/query requests skip the multi-second
+torch + SentenceTransformer cold start paid by every spawned script.
+
+Speaks newline-delimited JSON-RPC 2.0, either over stdio:
+    python worker.py --stdio
+or over a local socket (unix socket path, or 127.0.0.1 TCP port on Windows):
+    python worker.py --socket /tmp/kilik-worker.sock
+    python worker.py --port 8765
+
+Methods: ping, stats, ingest, query, summarize, extractive_summary, process_pdf.
+`ingest` and `query` take the same params as the JSON read by ingest_pdf.py
+and query_chunks.py, and `extractive_summary` those of summarize_gensim.py;
+those scripts, the two issue summarizers and pdf_process.py forward to this
+worker when KILIK_WORKER_ADDRESS is set. Requests run on a bounded thread pool; when it
+is saturated, readers block instead of queueing without limit.
+"""
+import argparse
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INTERNAL_ERROR = -32603
+# Method ran but reported a failure; data carries {"result", "exit_code"}
+METHOD_FAILED = -32000
+
+
+def safe_print_err(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def _ingest(params):
+    import ingest_pdf
+    return ingest_pdf.run_ingest(params)
+
+
+def _query(params):
+    import query_chunks
+    return query_chunks.run_query(params)
+
+
+def _summarize(params):
+    """Issue extraction with the NLTK summarizer, falling back to the regex-only one"""
+    text = params.get("text", "")
+    if not text or len(text.strip()) < 10:
+        return {"issues": [], "error": "Text is too short to process"}, 0
+    if params.get("mode") != "simple":
+        try:
+            import text_summarizer
+            return {"issues": text_summarizer.extract_issues(text, params.get("workers"))}, 0
+        except Exception as e:
+            safe_print_err(f'NLTK summarizer failed, using simple summarizer: {e}')
+    import simple_summarizer
+    return {"issues": simple_summarizer.simple_extract_issues(text)}, 0
+
+
+def _extractive_summary(params):
+    import summarize_gensim
+    return summarize_gensim.summarize(params), 0
+
+
+def _process_pdf(params):
+    path = params.get("file", "")
+    if not path or not os.path.exists(path):
+        return {"error": f"File not found: {path}"}, 1
+    try:
+        import pdf_process
+    except SystemExit:
+        # pdf_process exits at import time when PyMuPDF/Pillow are missing
+        return {"error": "Required libraries not installed. Please run: pip install pymupdf pillow"}, 1
+    image_dir = params.get("imageStore")
+    if image_dir is True:
+        image_dir = pdf_process.IMAGE_DIR
+    result = pdf_process.process_pdf(path, structure=bool(params.get("structure")), workers=params.get("workers"),
+                                     image_dir=image_dir or None,
+                                     use_cache=False if params.get("cache") is False else None)
+    return result, (1 if result.get("error") else 0)
+
+
+class Worker:
+    def __init__(self, max_workers, max_pending=None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='kilik-worker')
+        self.slots = threading.BoundedSemaphore(max_pending or max_workers * 4)
+        self.started = time.time()
+        self.counts = {}
+        self.counts_lock = threading.Lock()
+        self.methods = {
+            "ping": lambda params: ({"pong": True}, 0),
+            "stats": lambda params: (self.stats(), 0),
+            "ingest": _ingest,
+            "query": _query,
+            "summarize": _summarize,
+            "extractive_summary": _extractive_summary,
+            "process_pdf": _process_pdf,
+        }
+
+    def stats(self):
+        with self.counts_lock:
+            counts = dict(self.counts)
+        stats = {"uptime_s": round(time.time() - self.started, 1), "requests": counts, "pid": os.getpid()}
+        if 'query_cache' in sys.modules:
+            stats["cache"] = sys.modules['query_cache'].stats()
+        if 'embedding_cache' in sys.modules:
+            stats["embedding_cache"] = {name: cache.stats() for name, cache in sys.modules['embedding_cache']._caches.items()}
+        if 'index_catalog' in sys.modules:
+            stats["indexes"] = sys.modules['index_catalog'].catalog.stats()
+        if 'llm_client' in sys.modules and sys.modules['llm_client']._client is not None:
+            stats["llm"] = sys.modules['llm_client']._client.stats()
+        return stats
+
+    def preload(self):
+        safe_print_err('Preloading embedding model...', flush=True)
+        from embeddings import get_model
+        get_model()
+        safe_print_err('Embedding model ready', flush=True)
+        import text_summarizer
+        text_summarizer.get_resources()
+
+    def handle(self, request):
+        """Run one decoded JSON-RPC request; returns the response dict (None for notifications)"""
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return _error_response(None, INVALID_REQUEST, "Invalid request")
+        req_id = request.get("id")
+        method = request["method"]
+        params = request.get("params") or {}
+        handler = self.methods.get(method)
+        if handler is None:
+            return _error_response(req_id, METHOD_NOT_FOUND, f"Unknown method: {method}")
+
+        with self.counts_lock:
+            self.counts[method] = self.counts.get(method, 0) + 1
+        try:
+            result, code = handler(params)
+        except Exception as e:
+            safe_print_err(f'Unhandled exception in {method}:', str(e))
+            safe_print_err(traceback.format_exc())
+            return _error_response(req_id, INTERNAL_ERROR, str(e))
+
+        if "id" not in request:
+            return None
+        if code != 0:
+            message = result.get("error", "failed") if isinstance(result, dict) else "failed"
+            return _error_response(req_id, METHOD_FAILED, message, {"result": result, "exit_code": code})
+        return {"jsonrpc": "2.0", "id": req_id, "result": result}
+
+    def submit(self, line, respond):
+        """Decode one request line and run it on the pool; `respond` is called with the response"""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            respond(_error_response(None, PARSE_ERROR, f"Parse error: {e}"))
+            return None
+
+        # Blocks the reader while the pool is saturated (backpressure)
+        self.slots.acquire()
+
+        def run():
+            try:
+                response = self.handle(request)
+                if response is not None:
+                    respond(response)
+            finally:
+                self.slots.release()
+
+        return self.executor.submit(run)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+def _error_response(req_id, code, message, data=None):
+    error = {"code": code, "message": message}
+    if data is not None:
+        error["data"] = data
+    return {"jsonrpc": "2.0", "id": req_id, "error": error}
+
+
+def serve_stdio(worker):
+    """Read requests from stdin; responses are written to stdout as they complete (matched by id)"""
+    out_lock = threading.Lock()
+
+    def respond(response):
+        payload = json.dumps(response)
+        with out_lock:
+            sys.stdout.write(payload + "\n")
+            sys.stdout.flush()
+
+    for line in sys.stdin:
+        if line.strip():
+            worker.submit(line, respond)
+    worker.shutdown()
+
+
+def serve_socket(worker, socket_path=None, port=None):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            write_lock = threading.Lock()
+            pending = []
+
+            def respond(response):
+                with write_lock:
+                    self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+                    self.wfile.flush()
+
+            for line in self.rfile:
+                if line.strip():
+                    future = worker.submit(line, respond)
+                    if future is not None:
+                        pending.append(future)
+            # Keep the connection open until every response has been written
+            for future in pending:
+                future.result()
+
+    if port is not None:
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        server = socketserver.ThreadingTCPServer(('127.0.0.1', port), Handler)
+        address = f'127.0.0.1:{port}'
+    else:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = socketserver.ThreadingUnixStreamServer(socket_path, Handler)
+        address = socket_path
+    server.daemon_threads = True
+
+    safe_print_err(f'Worker listening on {address} (pid {os.getpid()})', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if port is None and os.path.exists(socket_path):
+            os.unlink(socket_path)
+        worker.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Resident ingest/query/summarize worker')
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--stdio', action='store_true', help='Serve JSON-RPC over stdin/stdout')
+    mode.add_argument('--socket', help='Serve JSON-RPC on this unix socket path')
+    mode.add_argument('--port', type=int, help='Serve JSON-RPC on 127.0.0.1:PORT')
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1),
+                        help='Maximum requests processed concurrently')
+    parser.add_argument('--no-preload', action='store_true', help='Load the embedding model on first use')
+    args = parser.parse_args()
+
+    worker = Worker(max_workers=max(1, args.workers))
+    if not args.no_preload:
+        try:
+            worker.preload()
+        except Exception as e:
+            safe_print_err('Model preload failed, will retry on first request:', str(e))
+
+    if args.stdio:
+        serve_stdio(worker)
+    else:
+        serve_socket(worker, socket_path=args.socket, port=args.port)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Client side of the resident worker (worker.py).
+The CLI entry points (ingest_pdf.py, query_chunks.py, text_summarizer.py,
+simple_summarizer.py, summarize_gensim.py, pdf_process.py) call `forward`
+first; when KILIK_WORKER_ADDRESS points at a running worker the request is
+served there with the model and indexes already loaded. Only when the worker
+cannot be reached (nothing listening on the address) does the caller fall
+back to doing the work in-process: once a request has been sent, a timeout
+or a dropped connection is reported as an error, since the worker may still
+be running it and repeating it here would do the work (and write the index)
+twice.
+
+KILIK_WORKER_ADDRESS is either a unix socket path ("/tmp/kilik.sock",
+"unix:/tmp/kilik.sock") or a TCP address ("127.0.0.1:8765").
+"""
+import os
+import sys
+import json
+import socket
+import itertools
+
+ADDRESS_ENV = 'KILIK_WORKER_ADDRESS'
+DEFAULT_TIMEOUT = 600
+
+_ids = itertools.count(1)
+
+
+def safe_print_err(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def parse_address(address):
+    """Return (family, sockaddr) for a worker address string"""
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[len('unix:'):]
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and not address.startswith('/'):
+        return socket.AF_INET, (host or '127.0.0.1', int(port))
+    return socket.AF_UNIX, address
+
+
+def worker_address():
+    address = os.environ.get(ADDRESS_ENV, '').strip()
+    return address or None
+
+
+def call(method, params, address=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Send one JSON-RPC request to the worker and wait for its response.
+    Returns the decoded response object; raises OSError if the worker is unreachable.
+    """
+    address = address or worker_address()
+    if not address:
+        raise OSError('no worker address configured')
+    family, sockaddr = parse_address(address)
+    request = {"jsonrpc": "2.0", "id": next(_ids), "method": method, "params": params}
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(sockaddr)
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        with sock.makefile('rb') as reader:
+            line = reader.readline()
+    if not line:
+        raise OSError('worker closed the connection without responding')
+    return json.loads(line)
+
+
+def forward(method, params):
+    """
+    Run `method` on the worker if one is configured and reachable.
+    Returns (result, exit_code) in the same shape the in-process functions use,
+    or None when the caller should do the work itself.
+    """
+    if not worker_address():
+        return None
+    try:
+        response = call(method, params)
+    except (ConnectionRefusedError, FileNotFoundError) as e:
+        safe_print_err(f'Worker unavailable ({e}), running in-process')
+        return None
+    except socket.timeout:
+        safe_print_err(f'Worker did not respond to {method} within {DEFAULT_TIMEOUT}s')
+        return {"error": "worker_timeout", "detail": f"no response within {DEFAULT_TIMEOUT}s"}, 10
+    except (OSError, ValueError) as e:
+        safe_print_err(f'Worker request failed: {e}')
+        return {"error": "worker_error", "detail": str(e)}, 10
+
+    if "error" in response:
+        error = response["error"]
+        data = error.get("data") or {}
+        if "result" in data:
+            return data["result"], data.get("exit_code", 1)
+        return {"error": "worker_error", "detail": error.get("message", "")}, 10
+    return response.get("result"), 0